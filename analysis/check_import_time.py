@@ -0,0 +1,119 @@
+"""Fails if importing a module takes longer than a time budget.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter (several
+times, the fastest run counts) and additionally fails if any module which should
+only be imported on first use (plotly, statsmodels, ...) got imported.
+
+    python analysis/check_import_time.py --module oc_pmc.load --budget_ms 1000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from oc_pmc import get_logger
+
+log = get_logger(__name__)
+
+# heavy dependencies which oc_pmc.load must not import eagerly
+DEFERRED_MODULES = [
+    "plotly",
+    "kaleido",
+    "statsmodels",
+    "scipy.stats",
+    "sklearn",
+    "rich",
+    "torch",
+    "sentence_transformers",
+    "openai",
+]
+
+
+def measure_import_time(module: str) -> Dict[str, Tuple[int, int]]:
+    """Returns {module name: (self us, cumulative us)} of all modules imported by
+    `import module` in a fresh interpreter."""
+    env = dict(os.environ)
+    analysis_dir = str(Path(__file__).resolve().parent)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [analysis_dir] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else [])
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: Dict[str, Tuple[int, int]] = dict()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def check_import_time(
+    module: str,
+    budget_ms: float,
+    repeats: int = 3,
+    deferred_modules: List[str] = DEFERRED_MODULES,
+    n_top: int = 10,
+) -> bool:
+    """Returns whether `import module` is within budget_ms and imports none of
+    the deferred_modules."""
+    runs = [measure_import_time(module) for _ in range(repeats)]
+    times = min(runs, key=lambda run: run[module][1])
+    total_ms = times[module][1] / 1000
+
+    log.info(f"Slowest imports (self time) of {module}:")
+    for name, (self_us, cumulative_us) in sorted(
+        times.items(), key=lambda item: -item[1][0]
+    )[:n_top]:
+        log.info(f"  {self_us / 1000:8.1f}ms {cumulative_us / 1000:8.1f}ms  {name}")
+
+    passed = True
+    eager = [
+        name
+        for name in deferred_modules
+        if name in times and not name.startswith(module)
+    ]
+    if len(eager) > 0:
+        log.error(f"{module} imports deferred modules: {', '.join(eager)}")
+        passed = False
+    if total_ms > budget_ms:
+        log.error(f"import {module} took {total_ms:.0f}ms > {budget_ms:.0f}ms")
+        passed = False
+    else:
+        log.info(f"import {module} took {total_ms:.0f}ms <= {budget_ms:.0f}ms")
+    return passed
+
+
+if __name__ == "__main__":
+    args = argparse.ArgumentParser()
+    args.add_argument(
+        "-m", "--module", type=str, default="oc_pmc.load", help="Module to import."
+    )
+    args.add_argument(
+        "-b",
+        "--budget_ms",
+        type=float,
+        default=1000,
+        help="Maximum cumulative import time in ms.",
+    )
+    args.add_argument(
+        "-r",
+        "--repeats",
+        type=int,
+        default=3,
+        help="Number of runs, the fastest counts.",
+    )
+    args = args.parse_args()
+    passed = check_import_time(
+        module=args.module, budget_ms=args.budget_ms, repeats=args.repeats
+    )
+    sys.exit(0 if passed else 1)
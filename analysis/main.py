@@ -48,6 +48,7 @@ from oc_pmc.stat import (
 from oc_pmc.stat.difference_bin_means import test_difference_bin_means
 from oc_pmc.utils import cut_small_value, remove_words_in_sections
 from oc_pmc.utils.aggregator import aggregator
+from oc_pmc.utils.profiling import print_trace_summary, profiled, profiling_enabled
 from rich.table import Table
 
 # because: https://github.com/plotly/plotly.py/issues/3469
@@ -647,6 +648,7 @@ REPLACE_COLUMNS_STRATEGIES = {
 }
 
 
+@profiled(category="section")
 def stats_preview_intro():
     console.print("\nPreview: Introduction", style="red bold")
 
@@ -678,6 +680,7 @@ def stats_preview_intro():
     print(f"Number of participants: {n_participants}\n")
 
 
+@profiled(category="section")
 def stats_experiment_1_button_press():
     console.print("\nResults 1: Intact vs Scrambled: Statistics", style="red bold")
 
@@ -1097,6 +1100,7 @@ def stats_experiment_1_button_press():
     )
 
 
+@profiled(category="section")
 def plots_fig_1_paradigm_results1():
     """
     For final plot use ghostscript to avoid compatibility issues
@@ -1411,6 +1415,7 @@ def plots_fig_1_paradigm_results1():
     return
 
 
+@profiled(category="section")
 def stats_experiment_2_button_press_suppress():
     console.print("\n\n2. Volition: stats", style="red bold")
     print("\n\n## Narrative content persists without and against volition.")
@@ -1647,6 +1652,7 @@ def stats_experiment_2_button_press_suppress():
     # )
 
 
+@profiled(category="section")
 def plots_fig_2_results2():
     """
     For final plot use ghostscript to avoid compatibility issues
@@ -2021,6 +2027,7 @@ def plots_fig_2_results2():
     )
 
 
+@profiled(category="section")
 def stats_experiment_3_interference():
     console.print("\n3. Stats Interference", style="bold red")
 
@@ -2254,6 +2261,7 @@ def stats_experiment_3_interference():
     return
 
 
+@profiled(category="section")
 def plots_fig_3_results3():
     """
     For final plot use ghostscript to prevent compatibility issues with
@@ -2478,6 +2486,7 @@ def plots_fig_3_results3():
     )
 
 
+@profiled(category="section")
 def stats_experiment_4_continued_separated():
     console.print("\nStats Exp4 continued v separated", style="red bold")
     # correlation attempt integrate and story relatedness first bin
@@ -2735,6 +2744,7 @@ def stats_experiment_4_continued_separated():
     )
 
 
+@profiled(category="section")
 def plots_fig_4_results():
     """
     For final plot use ghostscript to avoid compatibility issues
@@ -2935,6 +2945,7 @@ def plots_fig_4_results():
     return
 
 
+@profiled(category="section")
 def suppl_stats_persistence_recency_correlations(multiple_comparisons: bool = False):
     # requires output from
     # python src/rate_word_position.py -m exact_match -s carver_original
@@ -3085,6 +3096,7 @@ def suppl_stats_persistence_recency_correlations(multiple_comparisons: bool = Fa
     print("    \\end{tabular}")
 
 
+@profiled(category="section")
 def suppl_stats_persistence_recency_correlations_difference(
     multiple_comparisons: bool = False,
 ):
@@ -3416,6 +3428,7 @@ def suppl_stats_persistence_recency_correlations_difference(
     return
 
 
+@profiled(category="section")
 def suppl_intuitive_meaning_match_scores():
     console.print(
         "\nSuppl: Intuitive meaning of exact match score (normalized):",
@@ -3515,6 +3528,7 @@ def suppl_intuitive_meaning_match_scores():
     )
 
 
+@profiled(category="section")
 def suppl_plots_persistence_recency_correlations():
     console.print(
         "\n\nSupplement: Plots: Recency / Separate story segments",
@@ -3704,6 +3718,7 @@ def suppl_plots_persistence_recency_correlations():
             )
 
 
+@profiled(category="section")
 def suppl_plots_persistence_recency_correlations_difference():
     console.print(
         "\n\nSupplement: Plots: Recency correlations DIFFERENCE",
@@ -3830,6 +3845,7 @@ def suppl_plots_persistence_recency_correlations_difference():
             )
 
 
+@profiled(category="section")
 def suppl_plots_recency_difference_across_conditions():
     console.print(
         "\n\nSupplement: Plots: Recency difference across conditions",
@@ -3910,6 +3926,7 @@ def suppl_plots_recency_difference_across_conditions():
             )
 
 
+@profiled(category="section")
 def suppl_stats_persistence_without_recency():
     console.print(
         "\n\nSupplement: Stats: Persistence without recency", style="red bold"
@@ -4057,6 +4074,7 @@ def suppl_stats_persistence_without_recency():
     # )
 
 
+@profiled(category="section")
 def suppl_plots_persistence_without_recency():
     console.print(
         "\nPlot main persistence curve without section 8 & 9", style="red bold"
@@ -4458,6 +4476,7 @@ def suppl_plots_persistence_without_recency():
     )
 
 
+@profiled(category="section")
 def suppl_plots_match_score_by_sections():
     for condition in [
         "neutralcue2",
@@ -4778,6 +4797,7 @@ def suppl_plots_match_score_by_sections():
         )
 
 
+@profiled(category="section")
 def suppl_stats_plots_new_story_separated_integrated():
     console.print("\n\nSupplement Separated/Integrated: stats", style="red bold")
 
@@ -4964,6 +4984,7 @@ def suppl_stats_plots_new_story_separated_integrated():
     )
 
 
+@profiled(category="section")
 def suppl_methods_experiment_overview():
     console.print("Supplemental Methods: Experiment Overview", style="blue")
 
@@ -4985,6 +5006,7 @@ def suppl_methods_experiment_overview():
     )
 
 
+@profiled(category="section")
 def suppl_methods_procedure_numbers():
     console.print(
         "\nSupplemental Methods: Experimental Procedure numbers", style="red bold"
@@ -5037,6 +5059,7 @@ def suppl_methods_procedure_numbers():
     )
 
 
+@profiled(category="section")
 def suppl_methods_stats_words_rated():
     console.print("\nSupplemental Methods: Words rated.", style="red bold")
 
@@ -5110,6 +5133,7 @@ def suppl_methods_stats_words_rated():
     )
 
 
+@profiled(category="section")
 def suppl_methods_stats_words_generated():
     console.print("\nSupplemental Methods: Words generated.", style="red bold")
 
@@ -5141,6 +5165,7 @@ def suppl_methods_stats_words_generated():
     )
 
 
+@profiled(category="section")
 def suppl_plots_stats_volition():
     console.print("\n Volition and persistent mental content", style="red bold")
     # Don't let the function name fool you, this just gets an output
@@ -5511,6 +5536,7 @@ def suppl_plots_stats_volition():
     )
 
 
+@profiled(category="section")
 def suppl_stats_unintentional():
     console.print("\nUnintentional persistence of mental content", style="red bold")
 
@@ -5621,6 +5647,7 @@ def suppl_stats_unintentional():
     )
 
 
+@profiled(category="section")
 def suppl_plots_stats_wcg_strategy():
     console.print("\nSupplement: Stats strategies", style="red bold")
 
@@ -6164,6 +6191,7 @@ def suppl_plots_stats_wcg_strategy():
     )
 
 
+@profiled(category="section")
 def suppl_choice_baseline_fig_3_and_distribution_first_bin_aligned():
     console.print(
         "\nFig 3: Baseline choice & Distribution within first bin\n", style="red bold"
@@ -6415,6 +6443,7 @@ def suppl_choice_baseline_fig_3_and_distribution_first_bin_aligned():
     # persistence of mental content being blocked.
 
 
+@profiled(category="section")
 def suppl_plots_by_words():
     console.print("\nSupplement: Plots by words", style="red bold")
 
@@ -6780,6 +6809,7 @@ def suppl_plots_by_words():
     )
 
 
+@profiled(category="section")
 def suppl_stats_submission_time():
     console.print("\nSupplement: Submission time\n", style="red bold")
 
@@ -6929,6 +6959,7 @@ def suppl_stats_submission_time():
             )
 
 
+@profiled(category="section")
 def suppl_plots_submission_time():
     console.print("\nSuppl Materials: Submission time plots", style="red bold")
 
@@ -7543,6 +7574,7 @@ def suppl_plots_submission_time():
     )
 
 
+@profiled(category="section")
 def suppl_plots_stats_lightbulb():
     console.print("\nSuppl Materials: New Story Alone", style="red bold")
 
@@ -7963,6 +7995,7 @@ def suppl_plots_stats_lightbulb():
     )
 
 
+@profiled(category="section")
 def suppl_plots_stats_lightbulb_after_carver():
     console.print("\nEffect of Original story on New Story", style="red bold")
 
@@ -8284,6 +8317,7 @@ def suppl_plots_stats_lightbulb_after_carver():
     )
 
 
+@profiled(category="section")
 def suppl_stats_control_correlations_story_thoughts():
     console.print(
         "\n > CORR: Control Linger rating & food thoughts: button_press", style="yellow"
@@ -8345,6 +8379,7 @@ def suppl_stats_control_correlations_story_thoughts():
     )
 
 
+@profiled(category="section")
 def suppl_highly_story_related_wrds():
     # most story related wors
     rated_words_post_df = load_rated_wordchains(
@@ -8390,6 +8425,7 @@ def suppl_highly_story_related_wrds():
     )
 
 
+@profiled(category="section")
 def suppl_transp_and_pmc():
     console.print("\nTransportation & Lingering measures", style="red bold")
 
@@ -8463,6 +8499,7 @@ def suppl_transp_and_pmc():
     print(latex_table_sr)
 
 
+@profiled(category="section")
 def suppl_plots_stats_pause_and_end_pause_cue():
     console.print("\nSuppl Materials: Pause & Pause-End", style="red bold")
     # Pause: https://aspredicted.org/ym73-srmz.pdf
@@ -8939,6 +8976,7 @@ def suppl_plots_stats_pause_and_end_pause_cue():
     )
 
 
+@profiled(category="section")
 def suppl_prereg_volition():
     # https://aspredicted.org/6stx-344p.pdf
     console.print(
@@ -9311,6 +9349,7 @@ def suppl_prereg_volition():
     )
 
 
+@profiled(category="section")
 def suppl_prereg_baseline():
     # https://aspredicted.org/jmst-yrrq.pdf
     # (only analyses/plots that are not covered already somewhere else)
@@ -9605,6 +9644,7 @@ def suppl_prereg_baseline():
     )
 
 
+@profiled(category="section")
 def suppl_prereg_continued_separated_delayed_continued():
     # https://aspredicted.org/fdkh-fdmc.pdf
     # only analyses which were not run before
@@ -9716,6 +9756,7 @@ def suppl_prereg_continued_separated_delayed_continued():
     )
 
 
+@profiled(category="section")
 def suppl_prereg_tom():
     # https://aspredicted.org/fps7-3n3f.pdf
     # (only analyses/plots that are not covered already somewhere else)
@@ -9876,6 +9917,7 @@ def suppl_prereg_tom():
     )
 
 
+@profiled(category="section")
 def suppl_prereg_geometry():
     # https://aspredicted.org/yxvh-9dpp.pdf
     console.print("\n Pre-reg: Geometry", style="red bold")
@@ -10035,6 +10077,7 @@ def suppl_prereg_geometry():
     )
 
 
+@profiled(category="section")
 def suppl_prereg_new_story():
     # https://aspredicted.org/yxvh-9dpp.pdf
     console.print("\n Pre-reg: New Story", style="red bold")
@@ -10233,6 +10276,7 @@ def suppl_prereg_new_story():
         )
 
 
+@profiled(category="section")
 def suppl_prereg_table_interference():
     console.print("\nSuppl: pre-reg table interference conditions", style="red bold")
 
@@ -10267,6 +10311,7 @@ def suppl_prereg_table_interference():
         )
 
 
+@profiled(category="section")
 def suppl_prereg_plot_interference():
     console.print("\nSuppl: pre-reg plot interference conditions", style="red bold")
 
@@ -10354,6 +10399,7 @@ def suppl_prereg_plot_interference():
     )
 
 
+@profiled(category="section")
 def suppl_interference_task_performance():
     console.print("\nInterference task performance", style="red bold")
 
@@ -10457,6 +10503,7 @@ def suppl_interference_task_performance():
         )
 
 
+@profiled(category="section")
 def suppl_plots_stats_suppress_no_button_press():
     console.print("\nSUPPL: Suppress No Button Press", style="red bold")
 
@@ -10651,6 +10698,7 @@ def suppl_plots_stats_suppress_no_button_press():
     )
 
 
+@profiled(category="section")
 def suppl_plots_sr_st_suppress():
     console.print("\nSUPPL: Story thoughts & story relatedness", style="red bold")
 
@@ -10727,6 +10775,7 @@ def suppl_plots_sr_st_suppress():
     )
 
 
+@profiled(category="section")
 def suppl_plots_all_bins():
     console.print("\nSUPPL: Plots with all bins", style="red bold")
 
@@ -10945,6 +10994,7 @@ def load_sr_multi_day_all_positions(condition: str):
     return sr1, sr2, sr3, sr4, sr_diff_sr2_sr1, sr_diff_sr4_sr3
 
 
+@profiled(category="section")
 def suppl_linger_multi_day_plots():
     console.print("\nSUPPL: Linger multi-day plots", style="red bold")
 
@@ -11337,6 +11387,7 @@ def suppl_linger_multi_day_plots():
     )
 
 
+@profiled(category="section")
 def suppl_linger_multi_day_stats():
     console.print("\nSUPPL: Linger multi-day", style="red bold")
 
@@ -11860,6 +11911,7 @@ def suppl_linger_multi_day_stats():
         )
 
 
+@profiled(category="section")
 def suppl_prereg_linger_multi_day():
     console.print("\nSUPPL: Linger multi-day (preregistration)", style="red bold")
 
@@ -11914,6 +11966,7 @@ def suppl_prereg_linger_multi_day():
 
 
 # plot all rii correlations in table
+@profiled(category="section")
 def suppl_stats_rii_correlations():
     console.print(
         "\n\nSupplement: Stats: RII correlations with dependent variables",
@@ -12120,6 +12173,7 @@ def suppl_stats_rii_correlations():
     return
 
 
+@profiled(category="section")
 def suppl_linger_multi_day_submission_time():
     console.print("\nSUPPL: Linger multi-day submission time", style="red bold")
 
@@ -12321,6 +12375,7 @@ def suppl_linger_multi_day_submission_time():
     # )
 
 
+@profiled(category="section")
 def suppl_thought_entries_mlm():
     console.print("\nSUPPL: Mixed-effect linear model", style="red bold")
 
@@ -12351,6 +12406,7 @@ def suppl_thought_entries_mlm():
     )
 
 
+@profiled(category="section")
 def suppl_demographic_stats():
     console.print("\nDemographic stats - Methods", style="red bold")
     demographic_stats(
@@ -12363,6 +12419,7 @@ def suppl_demographic_stats():
     )
 
 
+@profiled(category="section")
 def submission_demographic_exclusion_stats():
     console.print("\nReporting Summary", style="red bold")
 
@@ -12509,6 +12566,7 @@ def submission_demographic_exclusion_stats():
     print(f"Total excluded: {n_excluded}")
 
 
+@profiled(category="section")
 def suppl_info_story_end_separated_continued():
     console.print(
         "\nSupplemental Methods: New Story End: Separated, Continued", style="red bold"
@@ -12577,6 +12635,7 @@ def suppl_info_story_end_separated_continued():
     )
 
 
+@profiled(category="section")
 def suppl_info_effect_size_last_30s():
     console.print("\nSupplemental Methods: Effect size last 30s", style="red bold")
 
@@ -12616,6 +12675,7 @@ def suppl_info_effect_size_last_30s():
     )
 
 
+@profiled(category="section")
 def suppl_plot_correlation_sr_st():
     console.print(
         "\nSUPPL:Corr story relatedness and story thoughts",
@@ -12810,6 +12870,8 @@ def main():
     # suppl_plot_correlation_sr_st()
 
     console.print("\nDone", style="green bold")
+    if profiling_enabled():
+        print_trace_summary()
 
 
 if __name__ == "__main__":
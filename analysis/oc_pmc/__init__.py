@@ -1,8 +1,8 @@
 import logging
+import os
 from typing import Optional
 
 from dotenv import dotenv_values
-from rich.console import Console
 
 config = dotenv_values(".env")
 
@@ -29,6 +29,22 @@ STUDYDATA_LEGACY_DIR: str = config.get(
     "STUDYDATA_LEGACY_DIR", "conditions/psiturk-based/linger-volition"
 )  # type: ignore
 BELLANA_DIR: Optional[str] = config.get("BELLANA_DIR")
+# opt-in timing trace (JSONL), see oc_pmc.utils.profiling
+PROFILE_TRACE: Optional[str] = os.environ.get(
+    "PROFILE_TRACE", config.get("PROFILE_TRACE")
+)
+# also record peak memory of every span in the trace (slow, uses tracemalloc)
+PROFILE_MEMORY: bool = os.environ.get(
+    "PROFILE_MEMORY", config.get("PROFILE_MEMORY") or ""
+).lower() in ("1", "true", "yes")
+# memory budget of bootstrap estimates, larger runs use float32 buffers
+MEMORY_BUDGET_MB: Optional[str] = os.environ.get(
+    "MEMORY_BUDGET_MB", config.get("MEMORY_BUDGET_MB")
+)
+# bootstraps stop once their Monte Carlo error is small, n_bootstrap is the cap
+ADAPTIVE_BOOTSTRAP: bool = os.environ.get(
+    "ADAPTIVE_BOOTSTRAP", config.get("ADAPTIVE_BOOTSTRAP") or ""
+).lower() in ("1", "true", "yes")
 FORMAT = "[%(levelname)s] %(name)s.%(funcName)s - %(message)s"
 ALL = {
     "carver_original": [
@@ -76,7 +92,14 @@ PRE_POST_NOFILTER = ("position", {"post": NOFILTER, "pre": NOFILTER})
 logging.basicConfig(format=FORMAT)
 
 
-console = Console()
+def __getattr__(name: str):
+    # rich is slow to import: the shared console is created on first use
+    if name == "console":
+        from rich.console import Console
+
+        globals()["console"] = Console()
+        return globals()["console"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_logger(
@@ -1,6 +1,7 @@
 import re
 
 from oc_pmc.load import load_story
+from oc_pmc.utils.story_index import load_story_index
 
 
 def get_unique_words_for_section(story: str, section_number: int) -> list[str]:
@@ -18,22 +19,13 @@ def get_unique_words_for_section(story: str, section_number: int) -> list[str]:
     set[str]
         Set of unique words that appear only in the specified section.
     """
-    text = load_story(story)
-    sections = [s.strip() for s in text.split("***") if s.strip()]
+    section_words = load_story_index(story, story_file="intact.txt").section_words()
 
-    if section_number < 1 or section_number > len(sections):
+    if section_number < 1 or section_number > len(section_words):
         raise ValueError(
-            f"Invalid {section_number=}. Story has {len(sections)} sections."
+            f"Invalid {section_number=}. Story has {len(section_words)} sections."
         )
 
-    def get_words(text):
-        # Convert to lowercase and extract words (letters only)
-        words = re.findall(r"[a-zA-Z]+", text.lower())
-        return set(words)
-
-    # Get words for each section
-    section_words = [get_words(section) for section in sections]
-
     # Get words from target section
     target_words = section_words[section_number - 1]
 
@@ -68,15 +60,8 @@ def get_uniquely_shared_words_for_sections(
     if not section_numbers:
         return []
 
-    text = load_story(story)
-    sections = [s.strip() for s in text.split("***") if s.strip()]
-
-    def get_words(text):
-        words = re.findall(r"[a-zA-Z]+", text.lower())
-        return set(words)
-
-    section_words = [get_words(section) for section in sections]
-    n_sections = len(sections)
+    section_words = load_story_index(story, story_file="intact.txt").section_words()
+    n_sections = len(section_words)
     section_set = set(section_numbers)
 
     for num in section_numbers:
@@ -1,5 +1,3 @@
-import re
-
 import numpy as np
 import pandas as pd
 from scipy.stats import spearmanr
@@ -7,12 +5,11 @@ from scipy.stats import spearmanr
 from oc_pmc.load import (
     load_questionnaire,
     load_rated_wordchains,
-    load_story_sentences,
-    load_story_sentences_grouped,
     load_word_position,
 )
 from oc_pmc.stat import test_two
 from oc_pmc.utils import get_n_sections
+from oc_pmc.utils.story_index import load_story_index
 
 
 def compute_cumulative_match_score(
@@ -21,26 +18,9 @@ def compute_cumulative_match_score(
     word_position_dct = load_word_position(config=config["word_position"])
 
     # prep for normalization
-    any_word_re = re.compile(r"\b\w+\b", flags=re.IGNORECASE)
-    if config["word_position"]["mode"] == "exact_match_sentences":
-        section_lengths = np.array(
-            [
-                len(any_word_re.findall(sent))
-                for sent in load_story_sentences(
-                    story=config["story"], story_file="sectioned.txt"
-                )
-            ]
-        )
-    else:
-        section_sentences = load_story_sentences_grouped(
-            story=config["story"], story_file="sectioned.txt"
-        )
-        section_lengths = np.array(
-            [
-                len(any_word_re.findall("\n".join(section_sentences_)))
-                for section_sentences_ in section_sentences
-            ]
-        )
+    section_lengths = load_story_index(
+        story=config["story"], story_file="sectioned.txt"
+    ).lengths(sentences=config["word_position"]["mode"] == "exact_match_sentences")
 
     n_sections = get_n_sections(
         story=config["word_position"]["story"],
@@ -0,0 +1,203 @@
+"""Declarative exclusion rules, evaluated for a condition in one pass.
+
+A rule is a dict:
+    ```
+    rule = {
+        "name": "rt_mean",  # column name in exclusions.csv (+ "_excl")
+        "colname": "rt_mean",  # column in questionnaire data
+        "op": "gt",  # one of "lt", "lte", "gt", "gte", "eq"
+        "threshold": 6700,  # value, or "iqr_lower"/"iqr_upper"
+        "plot": {"nbins": 40, "x_range": [0, 25_000]},  # optional
+    }
+    ```
+If "plot" is not given, the defaults in RULE_PLOTS for the colname are used (no
+plot if there are none), `"plot": None` disables plotting for the rule.
+"iqr_lower"/"iqr_upper" thresholds are the 25th percentile - 1.5 * iqr and
+75th percentile + 1.5 * iqr of the comparison data, computed once for all rules.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from oc_pmc import DATA_DIR, QUESTIONNAIRE_DIR
+from oc_pmc.exclusions.analyze import print_exclusive_exclusions
+from oc_pmc.exclusions.utils import plot_exclusion_plots
+from oc_pmc.utils import check_make_dirs
+
+# rule op -> pd.Series comparison method
+RULE_OPS = {"lt": "lt", "lte": "le", "gt": "gt", "gte": "ge", "eq": "eq"}
+IQR_THRESHOLDS = ("iqr_lower", "iqr_upper")
+
+# default plot arguments per questionnaire column
+RULE_PLOTS: Dict[str, Dict[str, Any]] = {
+    "spr/char": {
+        "title": "Distribution spr/char correlations. exclusions < threshold",
+        "nbins": 15,
+        "x_range": [-0.5, 1],
+    },
+    "rt_mean": {
+        "title": "Distribution rt_mean. threshold < exclusions",
+        "nbins": 40,
+        "x_range": [0, 25_000],
+    },
+    "rt_max": {
+        "title": "Distribution rt_max. threshold < exclusions",
+        "nbins": 40,
+        "x_range": [0, 100_000],
+    },
+    "focusevents": {
+        "title": "Distribution focusevents. threshold < exclusions",
+        "nbins": 40,
+        "x_range": [0, 50],
+    },
+    "spr-wcg-break": {
+        "title": "Distribution spr-wcg-break times. threshold < exclusions",
+        "nbins": 40,
+        "x_range": [0, 200_000],
+    },
+    "comp_prop": {
+        "title": "Distribution comp_prop. threshold <= Exclusions",
+        "nbins": 40,
+        "x_range": [0, 1],
+    },
+    "exp_time_away": {
+        "title": "Distribution exp_time_away. threshold < exclusions",
+        "nbins": 40,
+        "x_range": [0, 100_000],
+    },
+}
+
+
+def get_iqr_thresholds(
+    to_compare_df: pd.DataFrame,
+    colnames: List[str],
+    iqr_factor: float = 1.5,
+) -> pd.DataFrame:
+    """Returns lower/upper outlier thresholds for all colnames.
+
+    Returns
+    -------
+    pd.DataFrame
+        colnames as index, columns 'iqr_lower' and 'iqr_upper'.
+    """
+    quartiles = to_compare_df.loc[:, colnames].quantile([0.25, 0.75])
+    iqr = quartiles.loc[0.75] - quartiles.loc[0.25]
+    return pd.DataFrame(
+        {
+            "iqr_lower": quartiles.loc[0.25] - iqr_factor * iqr,
+            "iqr_upper": quartiles.loc[0.75] + iqr_factor * iqr,
+        }
+    )
+
+
+def evaluate_exclusion_rules(
+    config: Dict[str, Any],
+    to_exclude_df: pd.DataFrame,
+    to_compare_df: Optional[pd.DataFrame],
+    rules: List[Dict[str, Any]],
+) -> pd.DataFrame:
+    """Returns a bool dataframe with one column per rule, marking participants
+    excluded by that rule.
+
+    Plots are handed to `plot_exclusion_plots` and thus follow the plot mode set
+    with `set_exclusion_plot_mode`.
+    """
+    iqr_colnames = list(
+        {rule["colname"] for rule in rules if rule["threshold"] in IQR_THRESHOLDS}
+    )
+    if len(iqr_colnames) > 0:
+        if to_compare_df is None:
+            raise ValueError("IQR based thresholds require to_compare_df.")
+        iqr_thresholds = get_iqr_thresholds(to_compare_df, iqr_colnames)
+
+    exclusions: Dict[str, pd.Series] = dict()
+    for rule in rules:
+        colname = rule["colname"]
+        threshold: Union[float, str] = rule["threshold"]
+        if threshold in IQR_THRESHOLDS:
+            threshold = iqr_thresholds.loc[colname, threshold]  # type: ignore
+
+        print(f"{colname} threshold: {rule['op']} {threshold}")
+        exclusions[rule["name"]] = getattr(
+            to_exclude_df[colname], RULE_OPS[rule["op"]]
+        )(threshold)
+        print(f"Exclusions: {exclusions[rule['name']].sum()}")
+
+        plot_kwargs = rule.get("plot", RULE_PLOTS.get(colname))
+        if plot_kwargs is None:
+            print("---")
+            continue
+        plot_exclusion_plots(
+            config,
+            to_exclude_df,
+            to_compare_df,
+            threshold,  # type: ignore
+            colname,
+            plot_kwargs.get(
+                "title", f"Distribution {colname}. exclusions: {rule['op']} threshold"
+            ),
+            plot_kwargs.get("nbins"),
+            plot_kwargs.get("x_range"),
+            skip_to_compare=plot_kwargs.get("skip_to_compare", to_compare_df is None),
+        )
+
+    return pd.DataFrame(exclusions)
+
+
+def summarize_exclusions(
+    exclusions_df: pd.DataFrame, exclusion_colname: str = "exclusion"
+) -> pd.DataFrame:
+    """Marks participants excluded by any rule, adds '_excl' to rule columns and
+    prints exclusion stats."""
+    sel_excluded = exclusions_df.any(axis=1)
+    new_colnames = {colname: f"{colname}_excl" for colname in exclusions_df.columns}
+    exclusions_df = exclusions_df.rename(columns=new_colnames)
+    exclusions_df.insert(
+        0, exclusion_colname, np.where(sel_excluded, "excluded", "included")
+    )
+
+    # Print Stats
+    print(f"Total Participants: {len(exclusions_df)}")
+    print(f"Excluded Participants: {sel_excluded.sum()}")
+    print(f"Included Participants: {(~sel_excluded).sum()}")
+    print("---\n Exclusion reasons (do not sum to total)")
+    print(exclusions_df.iloc[:, 1:].sum(axis=0))
+    print("---")
+
+    # Output exclusive exclusions
+    print_exclusive_exclusions(exclusions_df)
+    print("---")
+
+    return exclusions_df
+
+
+def save_exclusions(story: str, condition: str, exclusions_df: pd.DataFrame) -> str:
+    output_path = os.path.join(
+        DATA_DIR,
+        QUESTIONNAIRE_DIR,
+        story,
+        condition,
+        "exclusions.csv",
+    )
+    check_make_dirs(output_path)
+    exclusions_df.to_csv(output_path)
+    return output_path
+
+
+def run_exclusion_rules(
+    config: Dict[str, Any],
+    to_exclude_df: pd.DataFrame,
+    to_compare_df: Optional[pd.DataFrame],
+    rules: List[Dict[str, Any]],
+) -> pd.DataFrame:
+    """Evaluates rules, prints stats and writes exclusions.csv for
+    config['chosen_story'] & config['chosen_condition']."""
+    exclusions_df = evaluate_exclusion_rules(
+        config, to_exclude_df, to_compare_df, rules
+    )
+    exclusions_df = summarize_exclusions(exclusions_df)
+    save_exclusions(config["chosen_story"], config["chosen_condition"], exclusions_df)
+    return exclusions_df
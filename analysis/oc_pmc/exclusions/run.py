@@ -0,0 +1,120 @@
+"""Creates exclusions.csv for several conditions in one run.
+
+Run from the repository root:
+    ```
+    PYTHONPATH=analysis python -m oc_pmc.exclusions.run neutralcue2 --no-plots
+    ```
+Without conditions all conditions are processed.
+"""
+
+import argparse
+from typing import Callable, Dict, Optional
+
+from oc_pmc import console
+from oc_pmc.exclusions import (
+    exclude_linger_fa_dark_bedroom,
+    exclude_linger_interference_end_pause,
+    exclude_linger_interference_geometry,
+    exclude_linger_interference_pause,
+    exclude_linger_interference_situation,
+    exclude_linger_interference_story_spr,
+    exclude_linger_interference_story_spr_end,
+    exclude_linger_interference_tom,
+    exclude_linger_multi_day,
+    exclude_linger_neutralcue2,
+    exclude_linger_volition_button_press,
+    exclude_linger_volition_button_press_suppress,
+    exclude_linger_volition_suppress,
+)
+from oc_pmc.exclusions.utils import render_exclusion_plots, set_exclusion_plot_mode
+
+EXCLUSION_FUNCS: Dict[str, Callable[[], object]] = {
+    "button_press": lambda: exclude_linger_volition_button_press({"pre_reg": "old"}),
+    "button_press_suppress": exclude_linger_volition_button_press_suppress,
+    "suppress": exclude_linger_volition_suppress,
+    "neutralcue2": exclude_linger_neutralcue2,
+    "interference_pause": exclude_linger_interference_pause,
+    "interference_end_pause": exclude_linger_interference_end_pause,
+    "interference_tom": exclude_linger_interference_tom,
+    "interference_situation": exclude_linger_interference_situation,
+    "interference_geometry": exclude_linger_interference_geometry,
+    "interference_story_spr": exclude_linger_interference_story_spr,
+    "interference_story_spr_end_continued": lambda: (
+        exclude_linger_interference_story_spr_end("continued")
+    ),
+    "interference_story_spr_end_separated": lambda: (
+        exclude_linger_interference_story_spr_end("separated")
+    ),
+    "interference_story_spr_end_delayed_continued": lambda: (
+        exclude_linger_interference_story_spr_end("delayed_continued")
+    ),
+    "fa_dark_bedroom": exclude_linger_fa_dark_bedroom,
+    "multi_day_carver_july": lambda: exclude_linger_multi_day("multi_day_carver_july"),
+    "multi_day_july_carver": lambda: exclude_linger_multi_day("multi_day_july_carver"),
+}
+
+
+def run_exclusions(
+    conditions: Optional[list[str]] = None,
+    plots: bool = True,
+    plot_workers: Optional[int] = None,
+):
+    """Runs the exclusions for all conditions given (default: all).
+
+    Parameters
+    ----------
+    plots : bool, default=True
+        If False, no diagnostic plots are created.
+    plot_workers : int, optional
+        If given, plots are queued and rendered in parallel with that many
+        processes after all exclusions are computed.
+    """
+    if conditions is None:
+        conditions = list(EXCLUSION_FUNCS.keys())
+    unknown = [
+        condition for condition in conditions if condition not in EXCLUSION_FUNCS
+    ]
+    if len(unknown) > 0:
+        raise ValueError(f"Unknown conditions: {unknown}")
+
+    if not plots:
+        set_exclusion_plot_mode("skip")
+    elif plot_workers is not None:
+        set_exclusion_plot_mode("lazy")
+
+    for condition in conditions:
+        console.print(f"\n{condition}", style="green")
+        EXCLUSION_FUNCS[condition]()
+
+    if plots and plot_workers is not None:
+        render_exclusion_plots(max_workers=plot_workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "conditions",
+        nargs="*",
+        help=(
+            "conditions to create exclusions for (default: all). One of "
+            f"{', '.join(EXCLUSION_FUNCS.keys())}."
+        ),
+    )
+    parser.add_argument(
+        "--no-plots",
+        action="store_true",
+        help="do not create diagnostic plots.",
+    )
+    parser.add_argument(
+        "--plot-workers",
+        type=int,
+        default=None,
+        help="queue plots and render them with that many processes at the end.",
+    )
+    args = parser.parse_args()
+
+    run_exclusions(
+        conditions=args.conditions if len(args.conditions) > 0 else None,
+        plots=not args.no_plots,
+        plot_workers=args.plot_workers,
+    )
@@ -1,5 +1,6 @@
 import os
-from typing import Dict, List, Optional, Union
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Union
 
 import pandas as pd
 import plotly.express as px
@@ -13,6 +14,65 @@ log = get_logger(__name__)
 BASEDIR = "outputs/plots/exclusions"
 
 
+PLOT_MODES = ("immediate", "lazy", "skip")
+
+# "immediate": render when rule is evaluated, "lazy": queue for
+# render_exclusion_plots, "skip": do not plot at all.
+_plot_mode = "immediate"
+_plot_queue: List[Dict[str, Any]] = list()
+
+
+def set_exclusion_plot_mode(mode: str) -> None:
+    """Sets how exclusion plots are rendered, see PLOT_MODES."""
+    global _plot_mode
+    if mode not in PLOT_MODES:
+        raise ValueError(f"Invalid plot mode: {mode}. Choose from {PLOT_MODES}")
+    _plot_mode = mode
+
+
+def _render_exclusion_plot(
+    plot_path: str,
+    data_df: pd.DataFrame,
+    threshold: float,
+    colname: str,
+    title: str,
+    nbins: Optional[int] = None,
+    x_range: Optional[List] = None,
+) -> str:
+    plot = px.histogram(
+        data_df,
+        x=colname,
+        nbins=nbins,
+        title=title,
+        range_x=x_range,
+        color="condition",
+        barmode="overlay",
+    ).add_vline(x=threshold)
+    plot.write_image(plot_path)
+    return plot_path
+
+
+def render_exclusion_plots(max_workers: Optional[int] = None) -> None:
+    """Renders all queued exclusion plots in parallel and empties the queue.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Number of processes used to render plots. Defaults to the number of CPUs.
+    """
+    if len(_plot_queue) == 0:
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_render_exclusion_plot, **plot_kwargs)
+            for plot_kwargs in _plot_queue
+        ]
+        for future in as_completed(futures):
+            log.info(f"Rendered {future.result()}")
+    _plot_queue.clear()
+
+
 def plot_exclusion_plots(
     config: Dict,
     to_exclude: pd.DataFrame,
@@ -24,6 +84,10 @@ def plot_exclusion_plots(
     x_range: Optional[List] = None,
     skip_to_compare: bool = False,
 ) -> None:
+    if _plot_mode == "skip":
+        print("---")
+        return
+
     condition_name = config.get("to_exclude_name", "to_exclude")
 
     plot_path = os.path.join(
@@ -44,16 +108,19 @@ def plot_exclusion_plots(
         log.info(f"Cutting off data > {x_range[1]}")
         data_df = data_df[data_df[colname] <= x_range[1]]
 
-    plot = px.histogram(
-        data_df,
-        x=colname,
-        nbins=nbins,
-        title=title,
-        range_x=x_range,
-        color="condition",
-        barmode="overlay",
-    ).add_vline(x=threshold)
-    plot.write_image(plot_path)
+    plot_kwargs = {
+        "plot_path": plot_path,
+        "data_df": data_df.loc[:, [colname, "condition"]].copy(),
+        "threshold": threshold,
+        "colname": colname,
+        "title": title,
+        "nbins": nbins,
+        "x_range": x_range,
+    }
+    if _plot_mode == "lazy":
+        _plot_queue.append(plot_kwargs)
+    else:
+        _render_exclusion_plot(**plot_kwargs)
     print("---")
 
 
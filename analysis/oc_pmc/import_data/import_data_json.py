@@ -18,6 +18,7 @@ from oc_pmc.import_data.utils import (
     get_comp_prop_interference_story,
     get_comp_prop_july,
     get_mean_sr_rt,
+    spr_char_correlations,
 )
 from oc_pmc.load import load_rated_words
 from oc_pmc.utils import check_make_dirs, wordchains_to_ndarray
@@ -446,18 +447,6 @@ def get_spr_correlations(
     before correlation (to get rid of outliers)
     """
 
-    # helper function
-    def _trim_and_correlate(group_df: pd.DataFrame) -> float:
-        # trim
-        lower = group_df["sentence_time"].quantile(lower_trim)
-        upper = group_df["sentence_time"].quantile(upper_trim)
-        group_df = group_df.loc[
-            (group_df["sentence_time"] > lower) & (group_df["sentence_time"] < upper)
-        ]
-
-        # correlate
-        return group_df.corr().iloc[0, 1]  # type: ignore
-
     # get relevant rows
     if task_filter is None:
         task_filter = "reading"
@@ -474,15 +463,7 @@ def get_spr_correlations(
         )
 
     spr = pID_trialdata.loc[sel.tolist()]
-    spr_nchars = spr.loc[:, ["sentence_length", "sentence_time"]]
-    # convert rows to int
-    spr_nchars["sentence_length"] = spr_nchars["sentence_length"].astype(int)
-
-    # trim and correlate
-    spr_char_corrs = spr_nchars.groupby("participantID").apply(_trim_and_correlate)
-    spr_char_corrs.name = "spr/char"
-    # join dfs for output
-    return pd.DataFrame(spr_char_corrs)
+    return spr_char_correlations(spr, lower_trim, upper_trim)
 
 
 def get_time_away(
@@ -0,0 +1,176 @@
+"""Vectorized interval algebra for focus/blur (window on/off) events.
+
+All functions operate on all participants at once. Focus events are paired into
+"away" intervals with a sorted pass instead of a per-participant loop, stage
+windows are represented as interval tables, and the time away within each window
+is the summed overlap between both interval tables.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def pair_focus_events(
+    pID_events: pd.DataFrame,
+    off_value: str = "off",
+    on_value: str = "on",
+    data_col: str = "data",
+    timestamp_col: str = "timestamp",
+) -> pd.DataFrame:
+    """Returns one row per interval a participant spent outside the window.
+
+    Events are sorted by participant and time. Repeated "off" or "on" events are
+    collapsed into the first event of each run, "on" events before the first "off"
+    event are ignored, and a trailing "off" event without matching "on" event is
+    dropped. Every remaining "off" event is paired with the "on" event following it.
+
+    Parameters
+    ----------
+    pID_events : pd.DataFrame
+        Events with participantID as index, containing `data_col` and
+        `timestamp_col`. Rows with other values than `off_value`/`on_value` in
+        `data_col` are ignored.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns `participantID`, `start` (off) and `end` (on).
+    """
+    events = pID_events.loc[
+        pID_events[data_col].isin([off_value, on_value]), [data_col, timestamp_col]
+    ].reset_index()
+    events = events.sort_values(["participantID", timestamp_col], kind="stable")
+
+    pIDs = events["participantID"].to_numpy()
+    is_off = (events[data_col] == off_value).to_numpy()
+    timestamps = events[timestamp_col].to_numpy(dtype=float)
+
+    # collapse runs of identical events within a participant
+    new_pID = np.ones(len(pIDs), dtype=bool)
+    new_pID[1:] = pIDs[1:] != pIDs[:-1]
+    new_run = new_pID.copy()
+    new_run[1:] |= is_off[1:] != is_off[:-1]
+    pIDs, is_off, timestamps, new_pID = (
+        pIDs[new_run],
+        is_off[new_run],
+        timestamps[new_run],
+        new_pID[new_run],
+    )
+
+    # after collapsing, events alternate: an off event is matched with the next
+    # event if that is an on event of the same participant.
+    # this ignores leading on events and trailing off events.
+    has_next = np.zeros(len(pIDs), dtype=bool)
+    has_next[:-1] = ~new_pID[1:]
+    starts = is_off & has_next
+    ends = np.roll(starts, 1)
+
+    return pd.DataFrame(
+        {
+            "participantID": pIDs[starts],
+            "start": timestamps[starts],
+            "end": timestamps[ends],
+        }
+    )
+
+
+def get_stage_windows(
+    pID_trialdata: pd.DataFrame,
+    phase_col: str = "phase",
+    status_col: str = "status",
+    begin_value: str = "begin",
+    end_value: str = "end",
+    extra_keys: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """Returns the begin/end window of every phase for every participant.
+
+    Parameters
+    ----------
+    pID_trialdata : pd.DataFrame
+        Trialdata with participantID as index.
+    extra_keys : list[str], optional
+        Additional columns distinguishing repeated phases (e.g. `pre_or_post`).
+        Only columns present in `pID_trialdata` are used.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns `participantID`, `window`, `start` and `end`. The `window` label is
+        the phase name, suffixed with the extra keys if given.
+    """
+    keys = [phase_col] + [
+        key for key in (extra_keys or []) if key in pID_trialdata.columns
+    ]
+    trialdata = pID_trialdata.reset_index()
+    begins = (
+        trialdata.loc[trialdata[status_col] == begin_value, ["participantID", *keys]]
+        .assign(start=trialdata["timestamp"])
+        .drop_duplicates(["participantID", *keys], keep="first")
+    )
+    ends = (
+        trialdata.loc[trialdata[status_col] == end_value, ["participantID", *keys]]
+        .assign(end=trialdata["timestamp"])
+        .drop_duplicates(["participantID", *keys], keep="last")
+    )
+    windows = pd.merge(begins, ends, on=["participantID", *keys])
+
+    window = windows[phase_col].astype(str)
+    for key in keys[1:]:
+        suffix = windows[key].fillna("").astype(str)
+        window = window.where(suffix == "", window + "_" + suffix)
+    windows["window"] = window
+
+    return windows.loc[:, ["participantID", "window", "start", "end"]]
+
+
+def interval_overlap(intervals: pd.DataFrame, windows: pd.DataFrame) -> pd.DataFrame:
+    """Returns the summed overlap of intervals with each window.
+
+    Parameters
+    ----------
+    intervals : pd.DataFrame
+        Columns `participantID`, `start`, `end` (e.g. from `pair_focus_events`).
+    windows : pd.DataFrame
+        Columns `participantID`, `window`, `start`, `end`
+        (e.g. from `get_stage_windows`).
+
+    Returns
+    -------
+    pd.DataFrame
+        participantID as index, one column per window label. Participants/windows
+        without overlapping intervals are 0.
+    """
+    merged = pd.merge(
+        windows, intervals, on="participantID", suffixes=("_window", "_interval")
+    )
+    overlap = np.clip(
+        np.minimum(merged["end_window"], merged["end_interval"])
+        - np.maximum(merged["start_window"], merged["start_interval"]),
+        0,
+        None,
+    )
+    merged = merged.assign(overlap=overlap)
+    pID_overlap = merged.pivot_table(
+        index="participantID",
+        columns="window",
+        values="overlap",
+        aggfunc="sum",
+        fill_value=0,
+    )
+    # windows without any interval of that participant
+    pID_overlap = pID_overlap.reindex(
+        index=windows["participantID"].unique(),
+        columns=windows["window"].unique(),
+        fill_value=0,
+    )
+    pID_overlap.index.name = "participantID"
+    pID_overlap.columns.name = None
+    return pID_overlap
+
+
+def interval_durations(intervals: pd.DataFrame) -> pd.Series:
+    """Returns the summed interval duration per participant."""
+    durations = intervals["end"] - intervals["start"]
+    return durations.groupby(intervals["participantID"]).sum()
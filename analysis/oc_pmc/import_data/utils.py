@@ -3,6 +3,13 @@ from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
+from oc_pmc.import_data.intervals import (
+    get_stage_windows,
+    interval_durations,
+    interval_overlap,
+    pair_focus_events,
+)
+from oc_pmc.utils.grouped_stats import grouped_xy_stats
 
 
 def carver_solutions() -> List[Tuple[str, str, str]]:
@@ -236,172 +243,39 @@ def get_attention_check(pID_trialdata: pd.DataFrame) -> pd.DataFrame:
     return pID_attention_check
 
 
-def _fix_on_off_mismatch(group_df: pd.DataFrame) -> pd.DataFrame:
-    """Removes doubled/quadrupled "on" and "off" events.
-    Also removes "on" events at the beginning and "off" events at the end.
-    """
-    # iterate over rows and remove doubled events
-    new_rows = list()
-    mode = "begin"
-    removed_events = 0
-    for i, row in group_df.iterrows():
-        # remove any "on" events at the beginning
-        if mode == "begin":
-            if row["data"] == "on":
-                continue
-            mode = "off"
-            new_rows.append(row)
-        else:
-            if row["data"] == mode:
-                # remove duplicate entries
-                # count to remove off events at end
-                removed_events += 1
-            else:
-                removed_events = 0
-                mode = "on" if mode == "off" else "off"
-                new_rows.append(row)
-
-    if mode == "off":
-        # remove off events at end
-        new_rows = new_rows[:-removed_events]
-
-    return pd.DataFrame(new_rows)
-
-
-def _time_away(group_df: pd.DataFrame) -> pd.Series:
-    group_df = group_df.sort_values("timestamp")
-
-    # make sure if "on" and "off" events match:
-    # make sure that list starts with "off" events, ends with "on" events
-    group_df = _fix_on_off_mismatch(group_df)
-    if group_df.empty:
-        return pd.Series({"timestamp": 0})
-
-    time_away_ms = (
-        group_df.loc[(group_df["data"] == "on"), ["timestamp"]]
-        - group_df.loc[(group_df["data"] == "off"), ["timestamp"]]
-    ).sum()
-
-    return time_away_ms / 1000 / 60
-
-
 def get_time_away(
     pID_eventdata: pd.DataFrame, pID_trialdata: pd.DataFrame
 ) -> pd.DataFrame:
-    # base df for joining things in
-    pID_eventstats = pID_eventdata.loc[
-        pID_eventdata["event"] == "initialized", ["event"]
-    ]
-
-    # Special case, nobody focussed out of the window
-    if not any(pID_eventdata["data"] == "off"):
-        # get index, colnames and 0 data
-        index = pID_eventdata.index.unique()
-        colnames = [
-            "time away (m)",
-            "focusevents",
-            "spr time away (m)",
-            "rating time away (m)",
-        ]
-        zero_data = np.zeros((len(index), len(colnames)))
-        return pd.DataFrame(
-            data=zero_data,
-            index=index,
-            columns=colnames,  # type: ignore
-        )
-
-    # get off events
-    pID_off_events = (
-        pID_eventdata.loc[(pID_eventdata["data"] == "off"), ["data"]]
+    """Returns the time away (minutes) in total, during reading and during the
+    word chain game, as well as the amount of focusevents for every participant."""
+    pIDs = pID_eventdata.loc[pID_eventdata["event"] == "initialized"].index.unique()
+    pID_eventstats = pd.DataFrame(index=pIDs)
+
+    # pair off/on events into intervals away from the window
+    intervals = pair_focus_events(pID_eventdata.loc[pID_eventdata["event"] == "focus"])
+
+    # intersect intervals with phase windows (wcg happens pre and post reading)
+    windows = get_stage_windows(pID_trialdata, extra_keys=["pre_or_post"])
+    pID_window_away = interval_overlap(intervals, windows)
+    wcg_columns = [col for col in pID_window_away.columns if col.split("_")[0] == "wcg"]
+
+    pID_eventstats["time away (m)"] = interval_durations(intervals)
+    pID_eventstats["focusevents"] = (
+        pID_eventdata.loc[(pID_eventdata["data"] == "off"), "data"]
         .groupby("participantID")
         .count()
     )
-
-    # get phase times
-    trialdata = pID_trialdata.reset_index()
-    phase_times = pd.merge(
-        trialdata[trialdata["status"] == "end"],
-        trialdata[trialdata["status"] == "begin"],
-        on=["participantID", "phase"],
-    )[["participantID", "phase", "timestamp_x", "timestamp_y"]]
-    # merge with off events
-    offs = pID_eventdata.loc[
-        (pID_eventdata["data"] == "off"), ["timestamp", "data"]
-    ].reset_index()
-    phase_times_offs = pd.merge(
-        phase_times,
-        offs,
-        on="participantID",
+    pID_eventstats["spr time away (m)"] = pID_window_away.get("story_reading")
+    pID_eventstats["wcg time away (m)"] = pID_window_away.loc[:, wcg_columns].sum(
+        axis=1
     )
-    # merge with on events
-    ons = pID_eventdata.loc[
-        (pID_eventdata["data"] == "on"), ["timestamp", "data"]
-    ].reset_index()
-    phase_times_ons = pd.merge(
-        phase_times,
-        ons,
-        on="participantID",
-    )
-    # check if off/on events are within phases
-    offs_before_end = phase_times_offs["timestamp_x"] > phase_times_offs["timestamp"]
-    offs_after_start = phase_times_offs["timestamp_y"] < phase_times_offs["timestamp"]
-    offs_within_phase = phase_times_offs[(offs_before_end & offs_after_start)]
-    ons_before_end = phase_times_ons["timestamp_x"] > phase_times_ons["timestamp"]
-    ons_after_start = phase_times_ons["timestamp_y"] < phase_times_ons["timestamp"]
-    ons_within_phase = phase_times_ons[(ons_before_end & ons_after_start)]
-    within_phase: pd.DataFrame = pd.concat((offs_within_phase, ons_within_phase))  # type: ignore
-    # time away within spr
-    pID_events_within_spr = within_phase.loc[
-        within_phase["phase"] == "story_reading",
-        ["participantID", "data", "timestamp"],
-    ].set_index("participantID")
-    pID_timeaway_spr = pID_events_within_spr.groupby("participantID").apply(_time_away)
-    pID_timeaway_spr = pID_timeaway_spr.rename(
-        columns={"timestamp": "spr time away (m)"}
-    )  # type: ignore
-    # if there are no off-events
-    if "data" in pID_timeaway_spr.columns.to_list():
-        pID_timeaway_spr = pID_timeaway_spr.drop(columns="data")
-    # time away within wcg
-    pID_events_within_rating = within_phase.loc[
-        within_phase["phase"] == "wcg",
-        ["participantID", "data", "timestamp"],
-    ].set_index("participantID")
-    pID_timeaway_rating = pID_events_within_rating.groupby(
-        "participantID",
-        group_keys=False,
-    ).apply(_time_away)
-    pID_timeaway_rating = pID_timeaway_rating.rename(
-        columns={"timestamp": "wcg time away (m)"}
-    )  # type: ignore
-    if "data" in pID_timeaway_rating.columns.to_list():
-        pID_timeaway_rating = pID_timeaway_rating.drop(columns="data")
 
-    # time away in general
-    pID_focusevents = pID_eventdata.loc[
-        (pID_eventdata["event"] == "focus"), ["data", "timestamp"]
-    ]
-    pID_timeaway = pID_focusevents.groupby("participantID").apply(_time_away)
+    # get rid of NaNs (participants without events), convert to minutes
+    pID_eventstats = pID_eventstats.fillna(0).astype(float)
+    time_columns = ["time away (m)", "spr time away (m)", "wcg time away (m)"]
+    pID_eventstats[time_columns] = pID_eventstats[time_columns] / 1000 / 60
+    pID_eventstats.index.name = "participantID"
 
-    # join both results with stats
-    pID_eventstats = pID_eventstats.join(
-        [pID_timeaway, pID_off_events, pID_timeaway_spr, pID_timeaway_rating]
-    )
-
-    # get rid of NaNs
-    pID_eventstats.loc[pID_eventstats["data"].isna(), ["data", "timestamp"]] = 0
-    pID_eventstats.loc[
-        pID_eventstats["spr time away (m)"].isna(), ["spr time away (m)"]
-    ] = 0
-    pID_eventstats.loc[
-        pID_eventstats["wcg time away (m)"].isna(), ["wcg time away (m)"]
-    ] = 0
-    pID_eventstats = pID_eventstats.drop(columns="event")
-
-    # rename columns
-    pID_eventstats = pID_eventstats.rename(
-        columns={"data": "focusevents", "timestamp": "time away (m)"}
-    )
     return pID_eventstats
 
 
@@ -446,42 +320,66 @@ def get_spr_wcg_break(pID_trialdata: pd.DataFrame) -> pd.DataFrame:
 def get_exp_time_away(
     pID_eventdata: pd.DataFrame, pID_trialdata: pd.DataFrame
 ) -> pd.DataFrame:
-    """Return time away between start of word chain game and start of demographics
-    questionnaire."""
-    exp_times = list()
-    pIDs = list()
-
-    # Merge to have all data
-    pID_trial_eventdata = pd.concat([pID_trialdata, pID_eventdata], axis=0)
-
-    for group_name, group_df in pID_trial_eventdata.groupby("participantID"):
-        start_wcg = group_df.loc[
-            (group_df["phase"] == "wcg")
-            & (group_df["status"] == "begin")
-            & (group_df["pre_or_post"] == "pre"),
-            "timestamp",
-        ].iloc[0]
-        start_demographics = group_df.loc[
-            (group_df["phase"] == "q_demographics") & (group_df["status"] == "begin"),
-            "timestamp",
-        ].iloc[0]
-
-        # Disregard any information outside of range, only pick on off events
-        group_df = group_df.loc[
-            (group_df["timestamp"] > start_wcg)
-            & (group_df["timestamp"] < start_demographics)
-            & ((group_df["data"] == "off") | (group_df["data"] == "on"))
+    """Return time away (minutes) between start of word chain game and start of
+    demographics questionnaire."""
+    trialdata = pID_trialdata.reset_index()
+    start_wcg = (
+        trialdata.loc[
+            (trialdata["phase"] == "wcg")
+            & (trialdata["status"] == "begin")
+            & (trialdata["pre_or_post"] == "pre"),
+            ["participantID", "timestamp"],
+        ]
+        .groupby("participantID")
+        .first()
+    )
+    start_demographics = (
+        trialdata.loc[
+            (trialdata["phase"] == "q_demographics") & (trialdata["status"] == "begin"),
+            ["participantID", "timestamp"],
         ]
+        .groupby("participantID")
+        .first()
+    )
+    windows = start_wcg.join(
+        start_demographics, how="inner", lsuffix="_start", rsuffix="_end"
+    ).reset_index()
+    windows = windows.rename(
+        columns={"timestamp_start": "start", "timestamp_end": "end"}
+    )
+    windows["window"] = "exp"
 
-        if group_df.empty:
-            exp_times.append(0)
-        else:
-            exp_times.append(_time_away(group_df).item())
-        pIDs.append(group_name)
-    pID_exp_time = pd.DataFrame(data=exp_times, index=pIDs, columns=["exp_time_away"])  # type: ignore
+    intervals = pair_focus_events(pID_eventdata)
+    pID_exp_time = interval_overlap(intervals, windows).rename(
+        columns={"exp": "exp_time_away"}
+    )
+    pID_exp_time = pID_exp_time.reindex(
+        pID_trialdata.index.unique(), fill_value=0
+    ).astype(float)
     pID_exp_time.index.name = "participantID"
 
-    return pID_exp_time
+    return pID_exp_time / 1000 / 60
+
+
+def spr_char_correlations(
+    spr: pd.DataFrame,
+    lower_trim: float = 0.05,
+    upper_trim: float = 0.95,
+) -> pd.DataFrame:
+    """Returns the correlation between sentence_length and sentence_time of each
+    participant in `spr` (participantID as index), computed for all participants
+    at once. Sentence times outside the lower/upper_trim quantile of the
+    participant are not used."""
+    spr_stats = grouped_xy_stats(
+        spr.index.to_numpy(),
+        spr["sentence_length"].astype(int).to_numpy(),
+        spr["sentence_time"].to_numpy(dtype=float),
+        lower_trim,
+        upper_trim,
+    )
+    spr_char_corrs = spr_stats["pearson"].rename("spr/char")
+    spr_char_corrs.index.name = "participantID"
+    return pd.DataFrame(spr_char_corrs)
 
 
 def get_spr_correlations(
@@ -494,33 +392,13 @@ def get_spr_correlations(
     before correlation (to get rid of outliers)
     """
 
-    # helper function
-    def _trim_and_correlate(group_df: pd.DataFrame) -> float:
-        # trim
-        lower = group_df["sentence_time"].quantile(lower_trim)
-        upper = group_df["sentence_time"].quantile(upper_trim)
-        group_df = group_df.loc[
-            (group_df["sentence_time"] > lower) & (group_df["sentence_time"] < upper)
-        ]
-
-        # correlate
-        return group_df.corr().iloc[0, 1]  # type: ignore
-
     # get relevant variables
     sel = (pID_trialdata["phase"] == "story_reading") & (
         pID_trialdata["status"] == "ongoing"
     )
 
     spr = pID_trialdata.loc[sel.tolist()]
-    spr_nchars = spr.loc[:, ["sentence_length", "sentence_time"]]
-    # convert rows to int
-    spr_nchars["sentence_length"] = spr_nchars["sentence_length"].astype(int)
-
-    # trim and correlate
-    spr_char_corrs = spr_nchars.groupby("participantID").apply(_trim_and_correlate)
-    spr_char_corrs.name = "spr/char"
-    # join dfs for output
-    return pd.DataFrame(spr_char_corrs)
+    return spr_char_correlations(spr, lower_trim, upper_trim)
 
 
 def get_story_read(pID_trialdata: pd.DataFrame) -> pd.DataFrame:
@@ -1,5 +1,7 @@
 import csv
 import glob
+import hashlib
+import json
 import os
 import pickle
 from copy import deepcopy
@@ -11,7 +13,9 @@ from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union,
 import numpy as np
 import pandas as pd
 
+import oc_pmc
 from oc_pmc import (
+    CACHE_DIR,
     CORRECTIONS_DIR,
     DATA_DIR,
     EMBEDDINGS_DIR,
@@ -20,18 +24,22 @@ from oc_pmc import (
     RATEDWORDS_DIR,
     TIME_SPR_DIR,
     WORDCHAINS_DIR,
-    console,
     get_logger,
 )
 from oc_pmc.utils import (
+    check_make_dirs,
     clean_words,
     get_n_sections,
     get_summary_func,
     keep_filter_args,
     remove_filter_args,
+    schema,
     wordchain_df_to_list,
     wordchains_to_ndarray,
 )
+from oc_pmc.utils.grouped_stats import grouped_residuals, grouped_xy_stats
+from oc_pmc.utils.online_stats import OnlineCurve
+from oc_pmc.utils.profiling import profiled, record_cache
 from oc_pmc.utils.types import Filterspec
 
 log = get_logger(__name__)
@@ -70,15 +78,7 @@ def map_keys_wrapper(func: Callable) -> Callable:
     def mapped_keys(config=None, *args, **kwargs):
         if config is None:
             config = dict()
-        key_maps = config.get("key_maps")
-        active_swaps = list()  # track which keys have been mapped
-        if key_maps is not None:
-            config = deepcopy(config)
-            for key, val_map in key_maps.items():
-                if config[key] in val_map:
-                    # (key, old, new)
-                    active_swaps.append((key, config[key], val_map[config[key]]))
-                    config[key] = val_map[config[key]]
+        config, active_swaps = map_config_keys(config)
 
         output_df = func(config, *args, **kwargs)
 
@@ -92,6 +92,23 @@ def map_keys_wrapper(func: Callable) -> Callable:
     return mapped_keys
 
 
+def map_config_keys(
+    config: Dict[str, Any],
+) -> Tuple[Dict[str, Any], List[Tuple[str, Any, Any]]]:
+    """Returns config with the values in config['key_maps'] mapped (see
+    map_keys_wrapper) and the (key, old, new) swaps that were made."""
+    key_maps = config.get("key_maps")
+    active_swaps = list()  # track which keys have been mapped
+    if key_maps is not None:
+        config = deepcopy(config)
+        for key, val_map in key_maps.items():
+            if config[key] in val_map:
+                # (key, old, new)
+                active_swaps.append((key, config[key], val_map[config[key]]))
+                config[key] = val_map[config[key]]
+    return config, active_swaps
+
+
 def map_keys(func: Callable) -> Callable[..., pd.DataFrame]:
     """See map_keys_wrapper"""
     # shenanigans because of typing
@@ -131,8 +148,10 @@ def combined_configs_wrapper(func: Callable) -> Callable:
                 for key in ["story", "condition", "position"]:
                     if key in combined_config:
                         combined_configs_dfs[-1][key] = combined_config[key]
+                if schema.is_compact(config):
+                    schema.compact(combined_configs_dfs[-1], "wordchains")
 
-        return pd.concat(combined_configs_dfs)
+        return schema.concat(combined_configs_dfs)
 
     return combined_configs
 
@@ -276,6 +295,7 @@ def load_rated_fields(config: Dict[str, Any]) -> pd.DataFrame:
     return rated_fields_df
 
 
+@profiled(category="load")
 @map_keys
 def load_questionnaire(config: Dict[str, Any]) -> pd.DataFrame:
     """Returns questionnaire data for config.
@@ -417,6 +437,7 @@ def select(
     return pID_df.loc[cast(np.ndarray, selector), :], filtered_columns
 
 
+@profiled(category="load")
 def filter_participants(
     config: Dict[str, Any],
     pID_df: pd.DataFrame,
@@ -615,6 +636,7 @@ def load_corrections_from_path(
     return corrections
 
 
+@profiled(category="load")
 def load_corrections() -> Dict[str, str]:
     """Returns a dict with corrected words from default location.
 
@@ -696,6 +718,7 @@ def load_rated_words_from_path(
     return ratings_dict
 
 
+@profiled(category="load")
 def load_rated_words(config: Dict) -> Dict[str, float]:
     """Returns word-to-rating dict for given config.
 
@@ -900,6 +923,7 @@ def load_time_words_from_path(
     return word_times_df
 
 
+@profiled(category="load")
 def load_time_words(config: Dict[str, Any], **filter_kwargs) -> pd.DataFrame:
     path_time_words = os.path.join(
         OUTPUTS_DIR,
@@ -1009,6 +1033,7 @@ def add_questionnaire_columns(
     return data_df
 
 
+@profiled(category="load")
 @combined_configs
 @map_keys
 def load_wordchains(config: Dict[str, Any]) -> pd.DataFrame:
@@ -1020,6 +1045,9 @@ def load_wordchains(config: Dict[str, Any]) -> pd.DataFrame:
     ----------
     config: Dict[str, Any]
         Needs to contain 'story', 'condition' and 'position'.
+        'compact': bool
+            If true, returns compact dtypes and drops the keystroke columns
+            (see oc_pmc.utils.schema).
 
     Returns
     -------
@@ -1037,7 +1065,7 @@ def load_wordchains(config: Dict[str, Any]) -> pd.DataFrame:
         f"{config['position']}.csv",
     )  # type: ignore
 
-    pID_words_df = pd.read_csv(path_words, index_col=0)
+    pID_words_df = pd.read_csv(path_words, index_col=0, usecols=schema.usecols(config))
 
     if config.get("corrections", True):
         corrections = load_corrections()
@@ -1078,6 +1106,9 @@ def load_wordchains(config: Dict[str, Any]) -> pd.DataFrame:
     if config.get("filter", True):
         pID_words_df = filter_participants(config, pID_words_df)
 
+    if schema.is_compact(config):
+        schema.compact(pID_words_df, "wordchains")
+
     return pID_words_df
 
 
@@ -1145,6 +1176,7 @@ def load_event_theme_rated_wordchains_np(config: dict) -> dict[str, np.ndarray]:
     return r_wc_dct
 
 
+@profiled(category="load")
 @combined_configs
 @map_keys
 def load_rated_wordchains(config: Dict) -> pd.DataFrame:
@@ -1162,6 +1194,8 @@ def load_rated_wordchains(config: Dict) -> pd.DataFrame:
             describing which ratings to use.
         'simulated': bool
             If true, will simulate the wordchains.
+        'compact': bool
+            If true, returns compact dtypes (see oc_pmc.utils.schema).
 
     Returns
     -------
@@ -1173,7 +1207,10 @@ def load_rated_wordchains(config: Dict) -> pd.DataFrame:
     if config.get("simulated", False):
         from oc_pmc.simulate.rated_wordchains import simulate_rated_wordchains
 
-        return simulate_rated_wordchains(config)
+        simulated_df = simulate_rated_wordchains(config)
+        if schema.is_compact(config):
+            schema.compact(simulated_df, "rated_wordchains")
+        return simulated_df
     ratings_dict = load_rated_words(config["ratings"])
 
     pID_words_df = load_wordchains(config)
@@ -1189,7 +1226,15 @@ def load_rated_wordchains(config: Dict) -> pd.DataFrame:
         return rating
 
     # rate words
-    pID_words_df["story_relatedness"] = pID_words_df.apply(_rate_word, axis=1)
+    if isinstance(pID_words_df["word_text"].dtype, pd.CategoricalDtype):
+        # only rate every distinct word once
+        pID_words_df["story_relatedness"] = (
+            pID_words_df["word_text"]
+            .map(lambda word: ratings_dict.get(str(word).lower().strip(), np.nan))
+            .astype("float32")
+        )
+    else:
+        pID_words_df["story_relatedness"] = pID_words_df.apply(_rate_word, axis=1)
 
     if config.get("verbose", False):
         n_nans = pID_words_df["story_relatedness"].isna().sum()
@@ -1203,9 +1248,13 @@ def load_rated_wordchains(config: Dict) -> pd.DataFrame:
             )
         )
 
+    if schema.is_compact(config):
+        schema.compact(pID_words_df, "rated_wordchains")
+
     return pID_words_df
 
 
+@profiled(category="load")
 @map_keys
 def load_thought_entries(config: Dict[str, Any]) -> pd.DataFrame:
     path_double_presses = os.path.join(
@@ -1216,7 +1265,9 @@ def load_thought_entries(config: Dict[str, Any]) -> pd.DataFrame:
         f"{config['position']}.csv",
     )
 
-    pID_thought_entries_df = pd.read_csv(path_double_presses, index_col=0)
+    pID_thought_entries_df = pd.read_csv(
+        path_double_presses, index_col=0, usecols=schema.usecols(config)
+    )
 
     if config.get("align_timestamp", False):
         # only works for post free association phase!
@@ -1235,9 +1286,13 @@ def load_thought_entries(config: Dict[str, Any]) -> pd.DataFrame:
     if config.get("filter", True):
         pID_thought_entries_df = filter_participants(config, pID_thought_entries_df)
 
+    if schema.is_compact(config):
+        schema.compact(pID_thought_entries_df, "thought_entries")
+
     return pID_thought_entries_df
 
 
+@profiled(category="load")
 @map_keys
 def load_n_thought_entries(
     config: Dict[str, Any],
@@ -1330,8 +1385,298 @@ def load_thought_entries_and_questionnaire(
     return te_df, quest_df
 
 
+# word level measures materialized by load_per_participant_data
+PER_PARTICIPANT_MEASURES = ["story_relatedness", "word_time", "thought_entries"]
+# config keys which do not change the per participant table of a measure (plots,
+# tests, bootstraps and output), all other keys are part of its cache key
+PER_PARTICIPANT_IGNORED_KEYS = {
+    "verbose",
+    "console_comment",
+    "name",
+    "name1",
+    "name2",
+    "name_mapping",
+    "measure",
+    "measure_name",
+    "measure_letter",
+    "config1",
+    "config2",
+    "load_spec",
+    "aggregate_on",
+    "test_type",
+    "alternative",
+    "threshold",
+    "alpha",
+    "pvalue_exact",
+    "super_script",
+    "superscript1",
+    "superscript2",
+    "print_for_table",
+    "print_for_table_compact",
+    "latex",
+    "latex_columns",
+    "bootstrap",
+    "n_bootstrap",
+    "ci",
+    "ci_mc_error",
+    "pvalue_mc_error",
+    "adaptive_bootstrap",
+    "memory_budget_mb",
+    "online_stats",
+    "per_participant_cache",
+    "cache_dir",
+    "column",
+    "step",
+    "min_bin_n",
+    "plotkind",
+    "color",
+    "color_map",
+    "color_sequence",
+    "symbol",
+    "symbol_map",
+    "category_orders",
+    "title",
+    "showlegend",
+    "font_color",
+    "bgcolor",
+    "margin",
+    "width",
+    "height",
+    "scale",
+    "save",
+    "show",
+    "study",
+    "filetype",
+    "filepostfix",
+    "suffix",
+}
+PER_PARTICIPANT_IGNORED_PREFIXES = (
+    "x_",
+    "y_",
+    "legend",
+    "marker",
+    "line",
+    "axes_",
+    "text",
+    "bootstrap_",
+    "assumptions_",
+    "thought_entry_",
+)
+# added by filter_participants to every exclude
+AUTO_EXCLUDE_RULE = ("match", "exclusion", "excluded")
+_per_participant_tables: Dict[str, Dict[str, Any]] = dict()
+# bin width of the online curves behind per participant tables
+ONLINE_STEP = 30000
+_online_curves: Dict[str, OnlineCurve] = dict()
+
+
+def _per_participant_sources(config: Dict[str, Any]) -> List[Tuple]:
+    """(path, mtime, size) of the files a per participant table is computed from."""
+    paths = [
+        os.path.join(DATA_DIR, CORRECTIONS_DIR, "corrections.csv"),
+        os.path.join(DATA_DIR, CORRECTIONS_DIR, "discarded.csv"),
+    ]
+    if config.get("ratings") is not None:
+        fields = [DATA_DIR, RATEDWORDS_DIR]
+        for field in ["approach", "model", "story", "file"]:
+            if config["ratings"].get(field) is not None:
+                fields.append(config["ratings"][field])
+        paths.append(os.path.join(*fields))
+    for combined_config in config.get("combined_configs", [dict()]):
+        sub_config, _ = map_config_keys({**config, **combined_config})
+        story, condition = sub_config["story"], sub_config["condition"]
+        dir_questionnaire = os.path.join(DATA_DIR, QUESTIONNAIRE_DIR, story, condition)
+        paths.extend(sorted(glob.glob(os.path.join(dir_questionnaire, "*"))))
+        filename = f"{sub_config['position']}.csv"
+        paths.append(os.path.join(DATA_DIR, "time_words", story, condition, filename))
+        paths.append(
+            os.path.join(OUTPUTS_DIR, "double_press", story, condition, filename)
+        )
+
+    sources = list()
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            sources.append((path, stat.st_mtime, stat.st_size))
+        else:
+            sources.append((path, None, None))
+    return sources
+
+
+def _per_participant_key(config: Dict[str, Any], measure: str) -> str:
+    key: Dict[str, Any] = {
+        k: v
+        for k, v in config.items()
+        if k not in PER_PARTICIPANT_IGNORED_KEYS
+        and not k.startswith(PER_PARTICIPANT_IGNORED_PREFIXES)
+    }
+    key["measure"] = measure
+    if schema.is_compact(config):
+        # dtypes of the compact loaders
+        key["schemas"] = schema.SCHEMAS
+    if key.get("exclude") is not None and config.get("auto_exclude", True):
+        exclude = key["exclude"]
+        if not isinstance(exclude, List):
+            exclude = [exclude]
+        key["exclude"] = [rule for rule in exclude if tuple(rule) != AUTO_EXCLUDE_RULE]
+    return hashlib.sha256(
+        json.dumps(key, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+def compute_per_participant_table(config: Dict[str, Any], measure: str) -> pd.DataFrame:
+    """Returns the within participant summary of a word level measure (see
+    PER_PARTICIPANT_MEASURES) for all participants of config."""
+    if measure == "thought_entries":
+        # hi :)
+        # you will need a 'te_filter' and 'te_questionnaire' entry in your config
+        return load_n_thought_entries(
+            config,
+            # prioritize custom te/questionnaire filter
+            te_filter=config.get("te_filter"),
+            questionnaire_filter=config.get("questionnaire_filter"),
+        )[["thought_entries"]]
+
+    if measure == "story_relatedness":
+        data_sr = load_rated_wordchains(config)["story_relatedness"]
+    else:
+        data_sr = load_wordchains(config)["word_time"]
+
+    # within participant summary, in one groupby over all participants
+    summary_func = get_summary_func(config)
+    if callable(summary_func):  # count_high_sr
+        summary_sr = (data_sr > config["high_sr"]).groupby("participantID").sum()
+    else:
+        summary_sr = data_sr.groupby("participantID").aggregate(summary_func)
+    return summary_sr.to_frame(measure)
+
+
+def load_online_curve(
+    config: Dict[str, Any],
+    measure: str,
+    step: int,
+    x_column: str = "timestamp",
+    load_func: Callable[[Dict[str, Any]], pd.DataFrame] = load_rated_wordchains,
+) -> OnlineCurve:
+    """Returns the OnlineCurve of measure in the rows load_func(config) returns,
+    persisted in CACHE_DIR.
+
+    If the source files of config did not change, the curve is returned without
+    loading any rows. Otherwise the rows are loaded and only participants which
+    were added, removed or changed are folded in or out (see OnlineCurve.update).
+    """
+    # loaders extend config['exclude'] in place
+    config = deepcopy(config)
+    key = json.dumps(
+        [
+            _per_participant_key(config, measure),
+            step,
+            x_column,
+            f"{load_func.__module__}.{load_func.__qualname__}",
+        ]
+    )
+    curve_path = os.path.join(
+        config.get("cache_dir", CACHE_DIR),
+        "online_stats",
+        measure,
+        f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}.pkl",
+    )
+    sources = _per_participant_sources(config)
+    curve = _online_curves.get(curve_path)
+    if curve is None and os.path.isfile(curve_path):
+        with open(curve_path, "rb") as f_in:
+            curve = pickle.load(f_in)
+    if curve is not None and curve.sources == sources:
+        record_cache(hits=1)
+        _online_curves[curve_path] = curve
+        return curve
+    record_cache(misses=1)
+
+    if curve is None:
+        curve = OnlineCurve(measure, step, x_column)
+    n_removed, n_added = curve.update(load_func(config))
+    log.info(
+        f"Updated online curve of '{measure}': {n_removed} participants removed,"
+        f" {n_added} added, {len(curve)} in total."
+    )
+    curve.sources = sources
+    check_make_dirs(curve_path, verbose=False)
+    with open(curve_path, "wb") as f_out:
+        pickle.dump(curve, f_out)
+    _online_curves[curve_path] = curve
+    return curve
+
+
+def load_per_participant_table(config: Dict[str, Any], measure: str) -> pd.DataFrame:
+    """Returns compute_per_participant_table(config, measure), materialized in
+    CACHE_DIR and recomputed if the config or its source files changed.
+
+    The cache can be disabled with config['per_participant_cache'] = False. With
+    config['online_stats'] = True, participant means of story relatedness and
+    word times are taken from an OnlineCurve (see `load_online_curve`), which is
+    updated with new participants instead of recomputed.
+    """
+    # loaders extend config['exclude'] in place
+    config = deepcopy(config)
+    if (
+        not config.get("per_participant_cache", True)
+        or config.get("simulated", False)
+        or config.get("fields")
+    ):
+        return compute_per_participant_table(config, measure)
+
+    if (
+        config.get("online_stats", False)
+        and measure in ["story_relatedness", "word_time"]
+        and get_summary_func(config) == "mean"
+    ):
+        curve = load_online_curve(
+            config,
+            measure,
+            config.get("step", ONLINE_STEP),
+            load_func=(
+                load_rated_wordchains
+                if measure == "story_relatedness"
+                else load_wordchains
+            ),
+        )
+        return curve.participant_means().to_frame(measure)
+
+    cache_path = os.path.join(
+        config.get("cache_dir", CACHE_DIR),
+        "per_participant",
+        measure,
+        f"{_per_participant_key(config, measure)}.pkl",
+    )
+    sources = _per_participant_sources(config)
+    cached = _per_participant_tables.get(cache_path)
+    if cached is None and os.path.isfile(cache_path):
+        with open(cache_path, "rb") as f_in:
+            cached = pickle.load(f_in)
+    if cached is not None and cached["sources"] == sources:
+        record_cache(hits=1)
+        _per_participant_tables[cache_path] = cached
+        return cached["table"].copy()
+    record_cache(misses=1)
+
+    table_df = compute_per_participant_table(config, measure)
+    cached = {"sources": sources, "table": table_df}
+    check_make_dirs(cache_path, verbose=False)
+    with open(cache_path, "wb") as f_out:
+        pickle.dump(cached, f_out)
+    _per_participant_tables[cache_path] = cached
+    return table_df.copy()
+
+
+@profiled(category="load")
 @combined_configs
 def load_per_participant_data(config: dict) -> pd.DataFrame:
+    """Returns one row per participant with the measure config['measure'].
+
+    Word level measures (PER_PARTICIPANT_MEASURES) are summarized within
+    participants and answered from a table cached in CACHE_DIR (see
+    `load_per_participant_table`), all others are read from the questionnaire.
+    """
     measure = config.get("measure_name")
     if measure is None:
         measure = config["measure"]
@@ -1340,19 +1685,8 @@ def load_per_participant_data(config: dict) -> pd.DataFrame:
     if config.get("custom_measure"):
         measure = config["custom_measure"]
 
-    if measure == "story_relatedness":
-        data_df = load_rated_wordchains(config)[["story_relatedness"]]
-    elif measure == "word_time":
-        data_df = load_wordchains(config)[["word_time"]]
-    elif measure == "thought_entries":
-        # hi :)
-        # you will need a 'te_filter' and 'te_questionnaire' entry in your config
-        data_df = load_n_thought_entries(
-            config,
-            # prioritize custom te/questionnaire filter
-            te_filter=config.get("te_filter"),
-            questionnaire_filter=config.get("questionnaire_filter"),
-        )[["thought_entries"]]
+    if measure in PER_PARTICIPANT_MEASURES:
+        data_df = load_per_participant_table(config, measure)
     else:
         config = deepcopy(config)
         if config.get("exclude"):
@@ -1366,12 +1700,6 @@ def load_per_participant_data(config: dict) -> pd.DataFrame:
                 f"Invalid key '{measure}' or measure not implemented: {err}"
             )
 
-    # within participant mean
-    if measure in ["story_relatedness", "word_time"]:
-        data_df = data_df.groupby("participantID").aggregate(
-            {measure: get_summary_func(config)}
-        )
-
     if data_df.dtypes.iloc[0] == bool:  # noqa:E721 # type: ignore
         data_df = data_df.astype(int)
 
@@ -1402,7 +1730,90 @@ def load_cluster(config: Dict[str, Any]) -> pd.DataFrame:
     return cluster_df
 
 
+def compute_time_spr_features(
+    time_spr_df: pd.DataFrame,
+    lower_trim: float = 0.05,
+    upper_trim: float = 0.95,
+) -> pd.DataFrame:
+    """Returns per-participant reading time features of a time_spr table.
+
+    Correlations and the regression of reading time (sprt) on sentence length
+    (char_count) only use sentences within the lower/upper_trim quantile of
+    reading times of that participant, as for `spr/char` in the questionnaire
+    (sprt_char_pearson equals spr/char).
+    """
+    pIDs = time_spr_df.index.to_numpy()
+    spr_stats = grouped_xy_stats(
+        pIDs,
+        time_spr_df["char_count"].to_numpy(dtype=float),
+        time_spr_df["sprt"].to_numpy(dtype=float),
+        lower_trim,
+        upper_trim,
+    )
+    sprt = time_spr_df["sprt"].groupby(pIDs)
+    features_df = pd.DataFrame(
+        {
+            "n_sentences": sprt.size(),
+            "sprt_mean": sprt.mean(),
+            "sprt_median": sprt.median(),
+            "sprt_total": sprt.sum(),
+            "sprt_char_pearson": spr_stats["pearson"],
+            "sprt_char_spearman": spr_stats["spearman"],
+            "sprt_per_char": spr_stats["slope"],
+            "sprt_intercept": spr_stats["intercept"],
+            "sprt_resid_std": spr_stats["resid_std"],
+        }
+    )
+    features_df.index.name = "participantID"
+    return features_df
+
+
+def _load_time_spr_features(config: Dict[str, Any], time_spr_path: str) -> pd.DataFrame:
+    """Returns the feature table for time_spr_path, cached in CACHE_DIR and
+    recomputed if spr.csv changed."""
+    cache_path = os.path.join(
+        config.get("cache_dir", CACHE_DIR),
+        TIME_SPR_DIR,
+        config["story"],
+        config["condition"],
+        "spr_features.pkl",
+    )
+    source_mtime = os.path.getmtime(time_spr_path)
+    if os.path.isfile(cache_path):
+        with open(cache_path, "rb") as f_in:
+            cached = pickle.load(f_in)
+        if cached["source_mtime"] == source_mtime:
+            record_cache(hits=1)
+            return cached["features"]
+    record_cache(misses=1)
+
+    log.info(f"Computing reading time features for {time_spr_path}")
+    time_spr_df = pd.read_csv(time_spr_path, index_col=0)
+    features_df = compute_time_spr_features(time_spr_df)
+    check_make_dirs(cache_path, verbose=False)
+    with open(cache_path, "wb") as f_out:
+        pickle.dump({"source_mtime": source_mtime, "features": features_df}, f_out)
+    return features_df
+
+
+@profiled(category="load")
 def load_time_spr(config: Dict[str, Any]) -> pd.DataFrame:
+    """Returns the sentence reading times of config['story'] & config['condition'].
+
+    Parameters
+    ----------
+    config : Dict
+        Has to contain 'story' and 'condition' and can contain:
+            spr_features : bool, default=False
+                Return per-participant reading time features (see
+                `compute_time_spr_features`) instead of one row per sentence.
+                The table is cached in CACHE_DIR.
+            residualize : bool, default=False
+                Add column 'sprt_resid': reading time minus the reading time
+                predicted from the sentence length for that participant.
+            filter : bool, default=True
+                Filter participants.
+    """
     time_spr_path = os.path.join(
         DATA_DIR,
         TIME_SPR_DIR,
@@ -1411,7 +1822,23 @@ def load_time_spr(config: Dict[str, Any]) -> pd.DataFrame:
         "spr.csv",
     )
 
-    time_spr_df = pd.read_csv(time_spr_path, index_col=0)
+    if config.get("spr_features", False):
+        time_spr_df = _load_time_spr_features(config, time_spr_path)
+    else:
+        time_spr_df = pd.read_csv(time_spr_path, index_col=0)
+        if config.get("residualize", False):
+            features_df = _load_time_spr_features(config, time_spr_path)
+            time_spr_df["sprt_resid"] = grouped_residuals(
+                time_spr_df.index.to_numpy(),
+                time_spr_df["char_count"].to_numpy(dtype=float),
+                time_spr_df["sprt"].to_numpy(dtype=float),
+                features_df.rename(
+                    columns={
+                        "sprt_intercept": "intercept",
+                        "sprt_per_char": "slope",
+                    }
+                ),
+            )
 
     if config.get("filter", True):
         time_spr_df = filter_participants(
@@ -1564,6 +1991,7 @@ def load_manual_field_ratings(config: dict) -> pd.DataFrame:
     return field_ratings_pd
 
 
+@profiled(category="load")
 def load_word_position(config: dict) -> dict[str, np.ndarray]:
     """Returns word positions rated by rate_word_position.py as dict.
     Maps words to a list over all sections (in 0-based index), where
@@ -1728,6 +2156,7 @@ def load_story_sentences_grouped(
     return section_sentences
 
 
+@profiled(category="load")
 @map_keys
 def load_screen_recording_exclusions(config: dict) -> pd.DataFrame:
     """Loads and returns the screen recording exclusion df.
@@ -1771,7 +2200,7 @@ def load_screen_recording_exclusions(config: dict) -> pd.DataFrame:
             path_screen_recording_exclusions, header=True, index=True
         )
 
-        console.print(
+        oc_pmc.console.print(
             (
                 f"\n\nUpdated screen recording exclusion file with {len(missing_pIDs)}"
                 " pIDs.\n"
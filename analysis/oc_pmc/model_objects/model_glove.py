@@ -1,6 +1,5 @@
 import os
-import pickle
-from typing import Any, Dict, Union
+from typing import Any, Dict, List, Tuple, Union
 
 import numpy as np
 import pandas as pd
@@ -12,6 +11,44 @@ from oc_pmc.utils import check_make_dirs
 log = get_logger(__name__)
 
 
+def build_glove_store(path_glove: str, path_store: str):
+    """Converts the glove text file into a binary store in directory path_store:
+        vocab.npy : sorted, utf-8 encoded words (fixed width bytes)
+        vectors.npy : float32 matrix, row i is the embedding of vocab[i]
+    Both are written to temporary files first, so concurrent processes never
+    see a partial store.
+    """
+    log.info(f"Loading glove embeddings from {path_glove}")
+    with open(path_glove, "r", encoding="utf-8") as f_in:
+        embed_dim = len(f_in.readline().rstrip("\n").split(" ")) - 1
+    df = pd.read_csv(
+        path_glove,
+        sep=" ",
+        quoting=3,
+        header=None,
+        na_filter=False,  # words like "null" or "nan"
+        dtype={0: str, **{idx: np.float32 for idx in range(1, embed_dim + 1)}},
+        encoding="utf-8",
+    )
+    vocab = np.array([word.encode("utf-8") for word in df[0]])
+    vectors = df.iloc[:, 1:].to_numpy(dtype=np.float32)
+    del df
+
+    # sort vocabulary, for duplicate words keep the last (as a dict would)
+    order = np.argsort(vocab, kind="stable")
+    vocab = vocab[order]
+    keep = np.r_[vocab[1:] != vocab[:-1], True]
+    vocab = vocab[keep]
+    vectors = vectors[order[keep]]
+
+    check_make_dirs(path_store, verbose=False, isdir=True)
+    for name, array in (("vocab", vocab), ("vectors", vectors)):
+        path_tmp = os.path.join(path_store, f"{name}.{os.getpid()}.tmp.npy")
+        np.save(path_tmp, array)
+        os.replace(path_tmp, os.path.join(path_store, f"{name}.npy"))
+    log.info(f"Cached {len(vocab)} glove embeddings to {path_store}.")
+
+
 class Glove(ModelObject):
     def __init__(self, config: Dict) -> None:
         path_glove = config.get(
@@ -21,27 +58,54 @@ class Glove(ModelObject):
         cache_dir = config.get("cache_dir", CACHE_DIR)
 
         glove_name = os.path.basename(path_glove).replace(".txt", "")
-        path_cache_glove = os.path.join(cache_dir, f"{glove_name}.pkl")
-        if not os.path.isfile(path_cache_glove):
-            # load and save embeddings in faster format for speedup.
-            log.info(f"Loading glove embeddings from {path_glove}")
-            df = pd.read_csv(path_glove, sep=" ", quoting=3, header=None, index_col=0)
-            embedding_dict = {key: val.values for key, val in df.T.items()}
-            check_make_dirs(path_cache_glove, verbose=False)
-            with open(path_cache_glove, "wb") as f_out:
-                pickle.dump(embedding_dict, f_out)
-            log.info(f"Cached glove embeddings to {path_glove}.")
-
-        log.info(f"Loading glove embeddings from cache: {path_cache_glove}")
-        with open(path_cache_glove, "rb") as f_in:
-            self.embedding_dict = pickle.load(f_in)
-
-        self.embed_dim = config.get("embed_dim", 300)
+        path_store = os.path.join(cache_dir, glove_name)
+        if not (
+            os.path.isfile(os.path.join(path_store, "vocab.npy"))
+            and os.path.isfile(os.path.join(path_store, "vectors.npy"))
+        ):
+            build_glove_store(path_glove, path_store)
+
+        # memory mapped: only touched pages are read, and shared across processes
+        log.info(f"Loading glove embeddings from cache: {path_store}")
+        self.vocab = np.load(os.path.join(path_store, "vocab.npy"), mmap_mode="r")
+        self.vectors = np.load(os.path.join(path_store, "vectors.npy"), mmap_mode="r")
+
+        self.embed_dim = config.get("embed_dim", self.vectors.shape[1])
         self.model_name = "glove"
 
+    def lookup(self, words: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the row in `vectors` of each word and a mask which words are
+        in the vocabulary (rows of missing words are 0)."""
+        max_len = self.vocab.dtype.itemsize
+        encoded = [word.lower().encode("utf-8") for word in words]
+        # longer words cannot be in the vocabulary, and would be truncated
+        fits = np.array([len(word) <= max_len for word in encoded], dtype=bool)
+        queries = np.array(
+            [word if fit else b"" for word, fit in zip(encoded, fits)],
+            dtype=self.vocab.dtype,
+        )
+        rows = np.searchsorted(self.vocab, queries)
+        rows = np.minimum(rows, len(self.vocab) - 1)
+        mask = fits & (self.vocab[rows] == queries)
+        rows[~mask] = 0
+        return rows, mask
+
     def embedding(
         self,
         config: Dict[str, Any],
         word: str,
     ) -> Union[np.ndarray, None]:
-        return self.embedding_dict.get(word.lower(), None)
+        rows, mask = self.lookup([word])
+        if not mask[0]:
+            return None
+        return self.vectors[rows[0]]
+
+    def embeddings(
+        self,
+        config: Dict[str, Any],
+        words: List[str],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        rows, mask = self.lookup(words)
+        matrix = np.asarray(self.vectors[rows])  # fancy indexing copies
+        matrix[~mask] = 0
+        return matrix, mask
@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
@@ -6,6 +7,9 @@ import numpy as np
 class ModelObject:
     model_name: str
     max_bulk_size: int
+    embed_dim: int
+    # number of embeddings kept in an LRU cache by the default `embeddings`
+    embedding_cache_size: int = 0
 
     def incontext_bulk(
         self,
@@ -24,8 +28,57 @@ class ModelObject:
         self,
         config: Dict[str, Any],
         words: List[str],
-    ) -> Union[np.ndarray, List[Union[np.ndarray, None]]]:
-        return [self.embedding(config, word) for word in words]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns a contiguous (n_words, embed_dim) float32 matrix of embeddings and
+        a bool mask of words with an embedding (rows of other words are 0).
+
+        The default calls `embedding` once per unique word, models with a batched
+        lookup should override this.
+        """
+        unique_words = list(dict.fromkeys(words))
+        matrix = np.zeros((len(unique_words), self.embed_dim), dtype=np.float32)
+        mask = np.zeros(len(unique_words), dtype=bool)
+        for idx, word in enumerate(unique_words):
+            embedding = self._cached_embedding(config, word)
+            if embedding is not None:
+                matrix[idx] = embedding
+                mask[idx] = True
+        if len(unique_words) == len(words):
+            return matrix, mask
+        word_idx = {word: idx for idx, word in enumerate(unique_words)}
+        rows = np.array([word_idx[word] for word in words], dtype=np.int64)
+        return matrix[rows], mask[rows]
+
+    def _cached_embedding(
+        self,
+        config: Dict[str, Any],
+        word: str,
+    ) -> Union[np.ndarray, None]:
+        """`embedding` behind an LRU cache of size `embedding_cache_size`."""
+        if self.embedding_cache_size <= 0:
+            return self.embedding(config, word)
+        if not hasattr(self, "_embedding_cache"):
+            self._embedding_cache: OrderedDict = OrderedDict()
+        if word in self._embedding_cache:
+            self._embedding_cache.move_to_end(word)
+            return self._embedding_cache[word]
+        embedding = self.embedding(config, word)
+        self._embedding_cache[word] = embedding
+        if len(self._embedding_cache) > self.embedding_cache_size:
+            self._embedding_cache.popitem(last=False)
+        return embedding
+
+    def embedding_matrix(
+        self,
+        config: Dict[str, Any],
+        words: List[str],
+    ) -> np.ndarray:
+        """Like `embeddings`, but raises if a word has no embedding."""
+        matrix, mask = self.embeddings(config, words)
+        if not mask.all():
+            missing = [word for word, in_vocab in zip(words, mask) if not in_vocab]
+            raise RuntimeError(f"Words not in embedding model: {missing}")
+        return matrix
 
     def embedding(
         self,
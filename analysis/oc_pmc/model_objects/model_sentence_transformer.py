@@ -0,0 +1,46 @@
+from typing import Any, Dict, List, Tuple, Union
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from oc_pmc import get_logger
+from oc_pmc.model_objects.model_object import ModelObject
+from oc_pmc.utils.embedding_cache import cached_encode
+
+log = get_logger(__name__)
+
+
+class SentenceTransformerModel(ModelObject):
+    """Embeddings of a sentence-transformers model, computed in batches and
+    cached on disk."""
+
+    def __init__(self, config: Dict) -> None:
+        self.model_name = config.get("model_name", "google/embeddinggemma-300m")
+        log.info(f"Loading sentence transformer: {self.model_name}")
+        self.model = SentenceTransformer(self.model_name)
+        self.embed_dim = self.model.get_sentence_embedding_dimension()  # type: ignore
+        self.batch_size = config.get("batch_size", 64)
+
+    def embedding(
+        self,
+        config: Dict[str, Any],
+        word: str,
+    ) -> Union[np.ndarray, None]:
+        matrix, mask = self.embeddings(config, [word])
+        return matrix[0] if mask[0] else None
+
+    def embeddings(
+        self,
+        config: Dict[str, Any],
+        words: List[str],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        mask = np.array([word.strip() != "" for word in words], dtype=bool)
+        matrix = np.zeros((len(words), self.embed_dim), dtype=np.float32)
+        if mask.any():
+            matrix[mask] = cached_encode(
+                self.model,
+                self.model_name,
+                [word for word, valid in zip(words, mask) if valid],
+                batch_size=config.get("batch_size", self.batch_size),
+            )
+        return matrix, mask
@@ -1,23 +1,30 @@
-from .by_time_shifted import plot_by_time_shifted
-from .categorical_measure import plot_categorical_measure
-from .distribution import plot_distribution
-from .example_wc import plot_example_wcs
-from .numeric_measure import plot_numeric_measure
-from .word_position import (
-    plot_bars_match_score,
-    plot_by_time_shifted_without_section,
-    plot_match_score_across_conditions,
-    plot_match_score_by_time_sections,
-)
+"""Plot functions, imported on first access (plotly is slow to import)."""
 
-__all__ = [
-    "plot_by_time_shifted",
-    "plot_categorical_measure",
-    "plot_distribution",
-    "plot_example_wcs",
-    "plot_numeric_measure",
-    "plot_bars_match_score",
-    "plot_by_time_shifted_without_section",
-    "plot_match_score_across_conditions",
-    "plot_match_score_by_time_sections",
-]
+from importlib import import_module
+
+# exported name -> submodule
+_SUBMODULES = {
+    "plot_by_time_shifted": "by_time_shifted",
+    "plot_categorical_measure": "categorical_measure",
+    "plot_distribution": "distribution",
+    "plot_example_wcs": "example_wc",
+    "plot_numeric_measure": "numeric_measure",
+    "plot_bars_match_score": "word_position",
+    "plot_by_time_shifted_without_section": "word_position",
+    "plot_match_score_across_conditions": "word_position",
+    "plot_match_score_by_time_sections": "word_position",
+}
+
+__all__ = list(_SUBMODULES.keys())
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        value = getattr(import_module(f".{_SUBMODULES[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
@@ -16,13 +16,26 @@ import plotly.graph_objects as go
 
 from oc_pmc import get_logger
 from oc_pmc.load import (
+    load_online_curve,
     load_rated_wordchains,
     load_thought_entries_and_questionnaire,
     load_wordchains,
 )
 from oc_pmc.utils import config_to_descriptive_string, get_summary_func, save_plot
 from oc_pmc.utils.aggregator import aggregator
-from oc_pmc.utils.bootstrap import bootstrap_with_groups
+from oc_pmc.utils.binned_cube import (
+    bin_edges,
+    binned_cube,
+    group_bin_means,
+    resample_participant_rows,
+    word_offsets,
+)
+from oc_pmc.utils.bootstrap import (
+    bootstrap_with_groups,
+    get_confidence_intervals,
+    hierarchical_bootstrap_bin_means,
+    poisson_bootstrap_with_groups,
+)
 
 log = get_logger(__name__)
 
@@ -65,6 +78,31 @@ def func_load(config: Dict) -> pd.DataFrame:
     return load_wordchains(config)
 
 
+def func_load_online(config: Dict) -> pd.DataFrame:
+    """Returns one row per participant and bin from the OnlineCurve of the
+    condition: the participant's mean of config['column'] in the bin, the middle of
+    the bin as x_column and the number of words as 'n_rows'.
+
+    func_plot_by_time gives the same point estimates for these rows as for all
+    words (except for words exactly at the lowest bin edge, which pd.cut drops).
+    """
+    if config.get("mode") == "double_press":
+        raise ValueError("online_stats are not implemented for double presses")
+    if get_summary_func(config) != "mean" or not config.get(
+        "within_participant_summary", True
+    ):
+        raise ValueError("online_stats need within participant means")
+    if (config.get("shift_conditions") or config.get("shift_conditions_2")) and (
+        config.get("shift", 0) % config["step"] != 0
+    ):
+        raise ValueError("online_stats need shifts by multiples of step")
+
+    x_column = "timestamp" if not config.get("x_column") else config["x_column"]
+    return load_online_curve(
+        config, config["column"], config["step"], x_column, load_func=func_load
+    ).long()
+
+
 def func_plot_by_time(
     config: Dict[str, Any],
     data_df: pd.DataFrame,
@@ -143,32 +181,30 @@ def func_plot_by_time(
             filter(lambda x: x not in config["merged_columns"], grouping_columns)
         )
 
-    # Need to determine min x value: take closest multiple to "step"
-    min_x = config.get(
-        "min_x",
-        (min(data_df[x_column]) // step) * step,
-    )
-    max_x = config.get(
-        "max_x",
-        # accomodate largest value                            | shift   | don't remember
-        int(np.ceil(max(data_df[x_column]) / step)) * step + x_shift + step - 1,
+    # bin rows: from closest multiple of "step" below the min x value
+    bins = bin_edges(
+        data_df[x_column],
+        step,
+        config.get("min_x"),
+        config.get("max_x"),
+        shift=x_shift,
     )
-
-    # bin rows
-    bins = np.arange(min_x, max_x + 1, step)
     n_bins = len(bins) - 1
     bin_labels = [i + 0.5 for i in range(n_bins)]
     data_df["bins"] = pd.cut(data_df[x_column], bins=bins, labels=bin_labels)
+    grouping_columns_no_bins = list(filter(lambda x: x != "bins", grouping_columns))
+    # participant x bin means and counts, if the analysis uses them
+    cube = None
+    # words of the participant x bin table, for the hierarchical bootstrap
+    hierarchical_args = None
 
     # different procedure for double presses & story relatedness
     if config.get("mode") == "double_press":
-        grouping_columns_no_bins = list(filter(lambda x: x != "bins", grouping_columns))
-
         # 1. need to account for participants who did not press in the respective bin
 
         # add dummy values for each grouping combination without entry for bin
         group_indices_no_bins: list[tuple] = list(
-            data_df.groupby(grouping_columns_no_bins).indices.keys()
+            data_df.groupby(grouping_columns_no_bins, observed=False).indices.keys()
         )  # type: ignore
 
         indexed_data_df = (
@@ -215,17 +251,17 @@ def func_plot_by_time(
         # get number of participants for grouping columns
         participant_count = (
             quest_df.reset_index()  # type: ignore
-            .groupby(grouping_columns_no_bins)["participantID"]
+            .groupby(grouping_columns_no_bins, observed=False)["participantID"]
             .nunique()
         )
 
         # need to add within participant double-presses before averaging
         mean_aggregated_participant = data_df.groupby(
-            [*grouping_columns, "participantID"]
+            [*grouping_columns, "participantID"], observed=False
         ).aggregate({"double_press": "sum"})
 
         mean_aggregated = mean_aggregated_participant.groupby(
-            grouping_columns
+            grouping_columns, observed=False
         ).aggregate({"double_press": "sum"})  # type: ignore
 
         # participant_counts is not indexed by bins, have to remove it:
@@ -281,11 +317,17 @@ def func_plot_by_time(
             summary_func = get_summary_func(config)
 
             # 1. Within participant mean
-            sample_df = (
-                data_df.groupby(["participantID", *grouping_columns], observed=True)
-                .agg({column: summary_func})
-                .reset_index()
-            )
+            if summary_func == "mean":
+                cube = binned_cube(
+                    data_df, x_column, [column], grouping_columns_no_bins, bins
+                )
+                sample_df = cube.long(column, bin_labels)
+            else:
+                sample_df = (
+                    data_df.groupby(["participantID", *grouping_columns], observed=True)
+                    .agg({column: summary_func})
+                    .reset_index()
+                )
 
             # 1.5 optionally ensure that participants in different groups of specified
             # column are present in both groups.
@@ -303,7 +345,7 @@ def func_plot_by_time(
                     )
                 )
                 for group_key, group_df in sample_df.groupby(
-                    grouping_columns_no_equalizing_column
+                    grouping_columns_no_equalizing_column, observed=False
                 ):
                     col_vals: list[str] = (
                         group_df[equalize_participants_on_column].unique().tolist()
@@ -338,9 +380,6 @@ def func_plot_by_time(
                 sample_df = pd.concat(new_sample_df_ls)
 
             # 2. Pivot (unnecessary, but matched with bootstrap to avoid bugs)
-            grouping_columns_no_bins = list(
-                filter(lambda x: x != "bins", grouping_columns)
-            )
             sample_wide_df = sample_df.pivot(
                 columns="bins",
                 index=["participantID", *grouping_columns_no_bins],
@@ -349,7 +388,7 @@ def func_plot_by_time(
 
             # 2. Bin mean
             bin_mean_wide_df = sample_wide_df.groupby(
-                grouping_columns_no_bins, as_index=False
+                grouping_columns_no_bins, as_index=False, observed=False
             ).mean()
 
             # 3. Unpivot
@@ -357,37 +396,81 @@ def func_plot_by_time(
                 id_vars=grouping_columns_no_bins, value_name=column
             ).set_index([*grouping_columns_no_bins, "bins"])
 
-            # 3. Define bootstrap procedure
+            # 3. Define bootstrap procedure on the participant x bin values: the
+            # row of each participant's group in bin_mean_wide_df and the
+            # participant of each row
+            bin_columns = [
+                c for c in bin_mean_wide_df.columns if c not in grouping_columns_no_bins
+            ]
+            wide_group_codes = pd.MultiIndex.from_frame(
+                bin_mean_wide_df[grouping_columns_no_bins]
+            ).get_indexer(
+                pd.MultiIndex.from_frame(sample_wide_df[grouping_columns_no_bins])
+            )
+            wide_participant_codes = pd.factorize(sample_wide_df.index)[0]
+
             def sample_agg_func_within_participants(
-                sample_wide_df: pd.DataFrame,
-                sample_wide_pID_grouping,
-                grouping_columns_no_bins: List[str],
-            ) -> pd.DataFrame:
-                # 1. Resample participants
-                chosen_ids = sample_wide_pID_grouping.sample(
-                    frac=1, replace=True
-                ).values
-                resample_df: pd.DataFrame = sample_wide_df.loc[chosen_ids]  # type: ignore
+                wide_values: np.ndarray,
+                participant_codes: np.ndarray,
+                group_codes: np.ndarray,
+                n_groups: int,
+                index: pd.MultiIndex,
+            ) -> pd.Series:
+                # 1. Resample participants (all rows of participants drawn per group)
+                rows = resample_participant_rows(participant_codes, group_codes)
 
                 # 2. Bin means
-                bin_mean_wide_df = resample_df.groupby(
-                    grouping_columns_no_bins, as_index=False
-                ).mean()
+                means = group_bin_means(wide_values[rows], group_codes[rows], n_groups)
 
-                # 3. unpivot
-                return bin_mean_wide_df.melt(
-                    id_vars=grouping_columns_no_bins
-                ).set_index([*grouping_columns_no_bins, "bins"])
+                # 3. unpivot (melt order: bins, then groups)
+                return pd.Series(means.T.ravel(), index=index)
 
             bootstrap_func = sample_agg_func_within_participants
-            sample_wide_pID_grouping = sample_wide_df.reset_index().groupby(
-                grouping_columns_no_bins
-            )["participantID"]
             bootstrap_args = dict(
-                grouping_columns_no_bins=grouping_columns_no_bins,
-                sample_wide_pID_grouping=sample_wide_pID_grouping,
+                participant_codes=wide_participant_codes,
+                group_codes=wide_group_codes,
+                n_groups=len(bin_mean_wide_df),
+                index=mean_aggregated.index,
             )
-            bootstrap_df = sample_wide_df
+            bootstrap_df = sample_wide_df[bin_columns].to_numpy(dtype=float)
+
+            # 4. Optionally resample words within the resampled participants' bins
+            if config.get("within_participant_summary", True) == "hierarchical":
+                if summary_func != "mean":
+                    raise ValueError(
+                        "The hierarchical bootstrap needs within participant means"
+                    )
+                # cell of every word in the participant x bin table
+                word_rows = pd.MultiIndex.from_arrays(
+                    [
+                        sample_wide_df.index,
+                        *[sample_wide_df[c] for c in grouping_columns_no_bins],
+                    ]
+                ).get_indexer(
+                    pd.MultiIndex.from_arrays(
+                        [
+                            data_df.index.get_level_values("participantID"),
+                            *[data_df[c] for c in grouping_columns_no_bins],
+                        ]
+                    )
+                )
+                word_bins = pd.Index(bin_columns).get_indexer(data_df["bins"])
+                word_values = data_df[column].to_numpy(dtype=float)
+                in_table = (word_rows >= 0) & (word_bins >= 0) & ~np.isnan(word_values)
+                order, offsets = word_offsets(
+                    word_rows[in_table],
+                    word_bins[in_table],
+                    len(sample_wide_df),
+                    len(bin_columns),
+                )
+                hierarchical_args = dict(
+                    word_values=word_values[in_table][order],
+                    offsets=offsets,
+                    participant_codes=wide_participant_codes,
+                    group_codes=wide_group_codes,
+                    n_groups=len(bin_mean_wide_df),
+                    n_bins=len(bin_columns),
+                )
 
             grouped_bins = sample_df.groupby(grouping_columns, observed=False).count()
             n_observations_per_bin = grouped_bins[grouped_bins.columns[0]]
@@ -420,10 +503,31 @@ def func_plot_by_time(
 
     # bootstrap
     if config.get("bootstrap"):
-        # data_df
-        lowers_df, uppers_df = bootstrap_with_groups(
-            config, bootstrap_df.copy(), bootstrap_func, bootstrap_args
-        )
+        if config.get("bootstrap_mode") == "poisson":
+            # resampling words within groups (in one pass over the words)
+            if config.get("mode") == "double_press" or config.get(
+                "within_participant_summary", True
+            ):
+                raise ValueError(
+                    "bootstrap_mode 'poisson' needs within_participant_summary=False"
+                )
+            lowers_df, uppers_df = poisson_bootstrap_with_groups(
+                config, data_df, grouping_columns, column
+            )
+        elif hierarchical_args is not None:
+            estimates = hierarchical_bootstrap_bin_means(config, **hierarchical_args)
+            # unpivot (melt order: bins, then groups)
+            lowers_df, uppers_df = get_confidence_intervals(
+                config,
+                pd.DataFrame(
+                    estimates.transpose(2, 1, 0).reshape(-1, len(estimates)),
+                    index=mean_aggregated.index,
+                ),
+            )
+        else:
+            lowers_df, uppers_df = bootstrap_with_groups(
+                config, bootstrap_df.copy(), bootstrap_func, bootstrap_args
+            )
         # have to subtract/add the actual mean to get 'error' only
         lowers_df["ci_lower"] = mean_aggregated[column] - lowers_df["ci_lower"]
         uppers_df["ci_upper"] = uppers_df["ci_upper"] - mean_aggregated[column]
@@ -433,8 +537,16 @@ def func_plot_by_time(
         # in case in whichin_participant_mean is True, the number of words across
         # participants is still a good estimator for the size of the confidence ints.
         # This allows to use the real observation n as bin n
-        grouped_bins = data_df.groupby(grouping_columns, observed=False).count()
-        n_observations_per_bin = grouped_bins[grouped_bins.columns[0]]
+        if config.get("online_stats") and "n_rows" in data_df.columns:
+            # rows are participant x bin means (func_load_online)
+            n_observations_per_bin = data_df.groupby(grouping_columns, observed=False)[
+                "n_rows"
+            ].sum()
+        elif cube is not None:
+            n_observations_per_bin = cube.counts_by_group(grouping_columns, bin_labels)
+        else:
+            grouped_bins = data_df.groupby(grouping_columns, observed=False).count()
+            n_observations_per_bin = grouped_bins[grouped_bins.columns[0]]
 
     # filter bins that are too empty
     # mean_aggregated may have deleted empty bins due to the pivot function, thus need
@@ -590,9 +702,12 @@ def func_plot_by_time(
 
 
 def plot_by_time_shifted(config):
+    """With config['online_stats'] = True and without bootstrap, plots the point
+    estimates of the persisted online curves (see func_load_online)."""
+    online = config.get("online_stats", False) and not config.get("bootstrap")
     aggregator(
         config,
-        load_func=func_load,
+        load_func=func_load_online if online else func_load,
         call_func=func_plot_by_time,
         no_extra_columns=False,
     )
@@ -687,7 +802,7 @@ def func_plot_by_time_pre_post(
 
     # 4. Bin means
     bin_mean_wide_df = sample_wide_df.groupby(
-        grouping_columns_no_bins, as_index=False
+        grouping_columns_no_bins, as_index=False, observed=False
     ).mean()
 
     # 3. Unpivot
@@ -707,7 +822,7 @@ def func_plot_by_time_pre_post(
 
         # 2. Bin means
         bin_mean_wide_df = resample_df.groupby(
-            grouping_columns_no_bins, as_index=False
+            grouping_columns_no_bins, as_index=False, observed=False
         ).mean()
 
         # 3. unpivot
@@ -722,7 +837,7 @@ def func_plot_by_time_pre_post(
     grouped_bins = (
         data_df.groupby(["position", *grouping_columns], observed=False)
         .count()
-        .groupby(grouping_columns)
+        .groupby(grouping_columns, observed=False)
         .min()
     )
     n_observations_per_bin = grouped_bins[grouped_bins.columns[0]]
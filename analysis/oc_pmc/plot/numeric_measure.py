@@ -12,7 +12,10 @@ from oc_pmc import get_logger
 from oc_pmc.load import load_per_participant_data
 from oc_pmc.utils import save_plot
 from oc_pmc.utils.aggregator import aggregator
-from oc_pmc.utils.bootstrap import bootstrap_with_groups
+from oc_pmc.utils.bootstrap import (
+    bootstrap_with_groups,
+    poisson_bootstrap_with_groups,
+)
 
 log = get_logger(__name__)
 
@@ -53,16 +56,21 @@ def func_plot_numeric_measure(
         )  # type: ignore
 
     if config.get("bootstrap"):
-        lowers_df, uppers_df = bootstrap_with_groups(
-            config,
-            data_df,
-            sample_agg_func,
-            aggregation_args=dict(
-                grouping_columns=grouping_columns,
-                column=column,
-                summary_func=summary_func,
-            ),
-        )
+        if config.get("bootstrap_mode") == "poisson" and summary_func == "mean":
+            lowers_df, uppers_df = poisson_bootstrap_with_groups(
+                config, data_df, grouping_columns, column
+            )
+        else:
+            lowers_df, uppers_df = bootstrap_with_groups(
+                config,
+                data_df,
+                sample_agg_func,
+                aggregation_args=dict(
+                    grouping_columns=grouping_columns,
+                    column=column,
+                    summary_func=summary_func,
+                ),
+            )
         lowers_df["ci_lower"] = means_df[column] - lowers_df["ci_lower"]
         uppers_df["ci_upper"] = uppers_df["ci_upper"] - means_df[column]
         means_df = means_df.join(lowers_df).join(uppers_df)
@@ -0,0 +1,510 @@
+"""Writes a complete synthetic DATA_DIR tree.
+
+For one story and several conditions, following files are generated (paths
+relative to config["output_dir"], in the same format as the study data):
+    time_words/<story>/<condition>/{practice,pre,post}.csv
+    double_press/<story>/<condition>/{pre,post}.csv
+    time_spr/<story>/<condition>/spr.csv
+    questionnaires/<story>/<condition>/{summary,exclusions}.csv
+    rated_words/<approach>/<model>/<story>/all.csv
+    corrections/corrections.csv
+
+Participants are generated and appended to the files in chunks of
+config["chunk_size"], so memory stays bounded for any number of participants.
+
+Generative model (per participant):
+    * word submission times as in `simulate_rated_wordchains`;
+    * a story relatedness offset ~ N(0, sr_participant_std); words are chosen
+      from a vocabulary with fixed ratings (rated_words), closest to the
+      participant's story relatedness + N(0, sr_word_std). In the post position
+      the story relatedness is shifted by effect_size * sr_participant_std
+      (optionally decaying with exp(-timestamp / effect_decay)), so the effect
+      size is Cohen's d of participant mean story relatedness against a
+      condition with effect size 0;
+    * thought entries (double presses) as poisson process, with rate multiplied
+      by (1 + effect_size) in the post position;
+    * sentence reading times linear in the sentence length;
+    * questionnaire measures, from which exclusions are computed with
+      EXCLUSION_RULES (see `oc_pmc.exclusions.engine`).
+"""
+
+import argparse
+import os
+from typing import Any, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+from oc_pmc import (
+    CACHE_DIR,
+    CORRECTIONS_DIR,
+    QUESTIONNAIRE_DIR,
+    RATEDWORDS_DIR,
+    TIME_SPR_DIR,
+    get_logger,
+)
+from oc_pmc.exclusions.engine import RULE_OPS
+from oc_pmc.simulate.rated_wordchains import simulate_word_times
+from oc_pmc.utils import check_make_dirs
+from oc_pmc.utils.grouped_stats import grouped_xy_stats
+
+log = get_logger(__name__)
+
+SR_MIN = 1
+SR_MAX = 7
+# rules in the format of oc_pmc.exclusions.engine (as for neutralcue2)
+EXCLUSION_RULES: List[Dict[str, Any]] = [
+    {"name": "spr/char", "colname": "spr/char", "op": "lt", "threshold": 0.37},
+    {
+        "name": "spr-wcg-break",
+        "colname": "spr-wcg-break",
+        "op": "gt",
+        "threshold": 70000,
+    },
+    {"name": "rt_mean", "colname": "rt_mean", "op": "gt", "threshold": 6700},
+    {"name": "rt_max", "colname": "rt_max", "op": "gt", "threshold": 30000},
+    {"name": "comp_prop", "colname": "comp_prop", "op": "lte", "threshold": 0.25},
+    {"name": "catch", "colname": "catch_prop", "op": "lt", "threshold": 0.5},
+    {"name": "read_story", "colname": "read_story", "op": "eq", "threshold": "Y"},
+    {
+        "name": "exp_time_away",
+        "colname": "exp_time_away",
+        "op": "gt",
+        "threshold": 45000,
+    },
+    {"name": "focusevents", "colname": "focusevents", "op": "gt", "threshold": 5},
+]
+
+
+def simulate_vocabulary(config: dict, rng: np.random.Generator) -> pd.DataFrame:
+    """Returns words with their story relatedness rating, sorted by rating."""
+    vocabulary_size = config.get("vocabulary_size", 20000)
+    ratings = np.sort(rng.uniform(SR_MIN, SR_MAX, size=vocabulary_size).round(2))
+    words = np.array([f"w{idx}" for idx in rng.permutation(vocabulary_size)])
+    return pd.DataFrame({"word": words, "mean_rating": ratings})
+
+
+def simulate_sentences(
+    config: dict, rng: np.random.Generator, words: np.ndarray
+) -> List[str]:
+    """Returns the sentences of the (synthetic) story."""
+    n_sentences = config.get("n_sentences", 80)
+    n_words = np.maximum(rng.poisson(10, size=n_sentences), 1)
+    return [" ".join(rng.choice(words, size=n)).capitalize() + "." for n in n_words]
+
+
+def misspelled_words(vocabulary_df: pd.DataFrame, n_corrections: int) -> np.ndarray:
+    """Returns a mask of the words which are misspelled (and corrected in
+    corrections.csv), spread evenly over ratings."""
+    n_words = len(vocabulary_df)
+    misspelled = np.zeros(n_words, dtype=bool)
+    step = max(n_words // max(n_corrections, 1), 1)
+    misspelled[np.arange(0, n_words, step)[:n_corrections]] = True
+    return misspelled
+
+
+def choose_words(
+    target_sr: np.ndarray,
+    ratings: np.ndarray,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Returns for every target story relatedness the index of a word with a
+    rating close to it. ratings have to be sorted."""
+    idcs = np.searchsorted(ratings, np.clip(target_sr, SR_MIN, SR_MAX))
+    # choose among neighbours, so that words with equal ratings all occur
+    idcs = idcs + rng.integers(-5, 6, size=idcs.shape)
+    return np.clip(idcs, 0, len(ratings) - 1)
+
+
+def wordchains_to_df(
+    pIDs: np.ndarray,
+    word_times: np.ndarray,
+    timestamps: np.ndarray,
+    words: np.ndarray,
+    story_relatedness: np.ndarray,
+) -> pd.DataFrame:
+    """Long format of (n_participants, max_n_words) arrays, nan words dropped."""
+    keep = ~np.isnan(timestamps)
+    rows, word_counts = np.nonzero(keep)
+    words_df = pd.DataFrame(
+        {
+            "word_text": words[keep],
+            "word_count": word_counts,
+            "word_time": np.round(word_times[keep]).astype(np.int64),
+            "timestamp": np.round(timestamps[keep]).astype(np.int64),
+            "story_relatedness": story_relatedness[keep].round(2),
+        },
+        index=pd.Index(pIDs[rows], name="participantID"),
+    )
+    return words_df
+
+
+def simulate_double_presses(
+    config: dict,
+    rng: np.random.Generator,
+    pIDs: np.ndarray,
+    timestamps: np.ndarray,
+    rate_factor: float,
+) -> pd.DataFrame:
+    """Returns thought entries (double presses) of participants during the word
+    chains with word timestamps (n_participants, max_n_words)."""
+    max_timestamp = config.get("max_timestamp", 180000)
+    rates = rng.lognormal(
+        np.log(config.get("double_press_rate", 1.0) * rate_factor), 0.5, len(pIDs)
+    )
+    n_presses = rng.poisson(rates * max_timestamp / 60000)
+    rows = np.repeat(np.arange(len(pIDs)), n_presses)
+    press_timestamps = np.round(rng.uniform(0, max_timestamp, size=len(rows)))
+    order = np.lexsort((press_timestamps, rows))
+    rows, press_timestamps = rows[order], press_timestamps[order]
+
+    # word during which the press happened, and the start of that word
+    word_timestamps = np.nan_to_num(timestamps[rows], nan=np.inf)
+    word_counts = (word_timestamps < press_timestamps[:, None]).sum(axis=1)
+    word_starts = np.where(
+        word_counts > 0,
+        np.take_along_axis(
+            word_timestamps, np.maximum(word_counts - 1, 0)[:, None], axis=1
+        )[:, 0],
+        0,
+    )
+
+    presses_df = pd.DataFrame(
+        {
+            "timestamp": press_timestamps.astype(np.int64),
+            "current_double_press_count": (
+                np.arange(len(rows))
+                - np.repeat(np.cumsum(n_presses) - n_presses, n_presses)
+                + 1
+            ).astype(float),
+            "time_since_last_word_start": (press_timestamps - word_starts).astype(
+                np.int64
+            ),
+            "word_count": word_counts,
+            "word_text": np.nan,
+            "word_key_onsets": "[]",
+            "word_key_chars": "[]",
+            "word_key_codes": "[]",
+        },
+        index=pd.Index(pIDs[rows], name="participantID"),
+    )
+    presses_df["word_double_press_count"] = presses_df.groupby(
+        ["participantID", "word_count"]
+    )["timestamp"].transform("size")
+    return presses_df
+
+
+def simulate_spr(
+    rng: np.random.Generator,
+    pIDs: np.ndarray,
+    sentences: List[str],
+    reading_starts: np.ndarray,
+) -> pd.DataFrame:
+    """Returns sentence reading times, linear in the number of characters. Some
+    participants skim (reading times independent of sentence length)."""
+    char_counts = np.array([len(sentence) for sentence in sentences], dtype=float)
+    intercepts = rng.normal(1000, 250, size=len(pIDs))
+    slopes = np.maximum(rng.normal(40, 12, size=len(pIDs)), 5)
+    skimmers = rng.random(len(pIDs)) < 0.05
+    slopes[skimmers] = 0
+    intercepts[skimmers] = rng.uniform(300, 1500, size=skimmers.sum())
+    sprts = (intercepts[:, None] + slopes[:, None] * char_counts[None, :]) * (
+        rng.lognormal(0, 0.2, size=(len(pIDs), len(sentences)))
+    )
+    sprts = np.round(sprts)
+    timestamps = reading_starts[:, None] + np.cumsum(sprts, axis=1)
+    return pd.DataFrame(
+        {
+            "Trial": np.tile(np.arange(len(sentences)) + 100, len(pIDs)),
+            "Timestamp": timestamps.reshape(-1).astype(np.int64),
+            "char_count": np.tile(char_counts, len(pIDs)),
+            "sentence": np.tile(np.array(sentences, dtype=object), len(pIDs)),
+            "sprt": sprts.reshape(-1),
+        },
+        index=pd.Index(np.repeat(pIDs, len(sentences)), name="participantID"),
+    )
+
+
+def evaluate_rules(summary_df: pd.DataFrame, rules: List[Dict]) -> pd.DataFrame:
+    """Returns exclusions in the format of exclusions.csv (without the prints and
+    plots of `oc_pmc.exclusions.engine.run_exclusion_rules`)."""
+    exclusions_df = pd.DataFrame(
+        {
+            f"{rule['name']}_excl": getattr(
+                summary_df[rule["colname"]], RULE_OPS[rule["op"]]
+            )(rule["threshold"])
+            for rule in rules
+        },
+        index=summary_df.index,
+    )
+    exclusions_df.insert(
+        0,
+        "exclusion",
+        np.where(exclusions_df.any(axis=1), "excluded", "included"),
+    )
+    return exclusions_df
+
+
+def simulate_chunk(
+    config: dict,
+    rng: np.random.Generator,
+    pIDs: np.ndarray,
+    effect_size: float,
+    vocabulary_df: pd.DataFrame,
+    sentences: List[str],
+) -> Dict[str, pd.DataFrame]:
+    """Simulates all data of participants pIDs, returns a dataframe per file
+    (keys are paths relative to the condition directories)."""
+    n = len(pIDs)
+    # misspelled variants (word + "x") are stored after the correct words
+    words = vocabulary_df["word"].to_numpy(dtype=object)
+    words = np.concatenate((words, words + "x"))
+    ratings = vocabulary_df["mean_rating"].to_numpy()
+    sr_mean = config.get("sr_mean", 2.7)
+    sr_participant_std = config.get("sr_participant_std", 0.5)
+    sr_word_std = config.get("sr_word_std", 1.0)
+    effect_decay = config.get("effect_decay")
+    misspelling_rate = config.get("misspelling_rate", 0.01)
+    can_be_misspelled = misspelled_words(
+        vocabulary_df, config.get("n_corrections", 200)
+    )
+    sr_offsets = rng.normal(0, sr_participant_std, size=n)
+
+    dfs: Dict[str, pd.DataFrame] = dict()
+    word_chains: Dict[str, np.ndarray] = dict()
+    for position in ("practice", "pre", "post"):
+        max_timestamp = config.get("practice_max_timestamp", 60000)
+        if position != "practice":
+            max_timestamp = config.get("max_timestamp", 180000)
+        word_times, timestamps = simulate_word_times(config, rng, n, max_timestamp)
+        target_sr = (
+            sr_mean
+            + sr_offsets[:, None]
+            + rng.normal(0, sr_word_std, size=timestamps.shape)
+        )
+        if position == "practice":
+            target_sr = rng.uniform(SR_MIN, SR_MAX, size=timestamps.shape)
+        elif position == "post":
+            effect = effect_size * sr_participant_std
+            if effect_decay is not None:
+                effect = effect * np.exp(-np.nan_to_num(timestamps) / effect_decay)
+            target_sr = target_sr + effect
+        word_idcs = choose_words(target_sr, ratings, rng)
+        # misspelled words, corrected by corrections.csv
+        misspelled = rng.random(word_idcs.shape) < misspelling_rate
+        misspelled &= can_be_misspelled[word_idcs]
+        word_chains[position] = timestamps
+        dfs[f"time_words/{position}"] = wordchains_to_df(
+            pIDs,
+            word_times,
+            timestamps,
+            words[word_idcs + misspelled * len(ratings)],
+            ratings[word_idcs],
+        )
+
+    for position in ("pre", "post"):
+        dfs[f"double_press/{position}"] = simulate_double_presses(
+            config,
+            rng,
+            pIDs,
+            word_chains[position],
+            1 + effect_size if position == "post" else 1,
+        )
+
+    # timeline (absolute ms): practice & pre free association, reading, post
+    experiment_starts = 1.7e12 + rng.uniform(0, 3e10, size=n).round()
+    pre_starts = experiment_starts + rng.uniform(60000, 120000, size=n).round()
+    reading_starts = pre_starts + config.get("max_timestamp", 180000) + 30000
+    spr_df = simulate_spr(rng, pIDs, sentences, reading_starts)
+    dfs["time_spr/spr"] = spr_df
+    reading_ends = spr_df.groupby("participantID")["Timestamp"].max().to_numpy()
+    spr_wcg_breaks = rng.lognormal(np.log(20000), 0.5, size=n).round()
+
+    post_df = dfs["time_words/post"]
+    post_word_times = post_df.groupby("participantID")["word_time"]
+    spr_stats = grouped_xy_stats(
+        spr_df.index.to_numpy(),
+        spr_df["char_count"].to_numpy(),
+        spr_df["sprt"].to_numpy(),
+        0.05,
+        0.95,
+    )
+    summary_df = pd.DataFrame(
+        {
+            "comp_prop": rng.beta(6, 2, size=n).round(2),
+            "catch_prop": rng.choice([0, 0.5, 1], p=[0.03, 0.07, 0.9], size=n),
+            "read_story": np.where(rng.random(n) < 0.03, "Y", "N"),
+            "linger_rating": np.clip(
+                np.round(3.5 + effect_size + rng.normal(0, 1.5, size=n)), 1, 7
+            ).astype(int),
+            "demographics_age": rng.integers(18, 70, size=n),
+            "demographics_gender": rng.choice(
+                ["female", "male", "other"], p=[0.49, 0.49, 0.02], size=n
+            ),
+            "free_association_pre_task_start": pre_starts.astype(np.int64),
+            "reading_task_start": reading_starts.astype(np.int64),
+            "reading_task_end": reading_ends,
+            "free_association_post_task_start": (reading_ends + spr_wcg_breaks).astype(
+                np.int64
+            ),
+            "spr/char": spr_stats["pearson"].reindex(pIDs).to_numpy().round(3),
+            "spr-wcg-break": spr_wcg_breaks,
+            "rt_mean": post_word_times.mean().reindex(pIDs).to_numpy().round(),
+            "rt_max": post_word_times.max().reindex(pIDs).to_numpy(),
+            "exp_time_away": rng.exponential(5000, size=n).round(),
+            "focusevents": rng.poisson(1, size=n),
+            "te_count_pre": dfs["double_press/pre"]
+            .groupby("participantID")
+            .size()
+            .reindex(pIDs, fill_value=0)
+            .to_numpy(),
+            "te_count_post": dfs["double_press/post"]
+            .groupby("participantID")
+            .size()
+            .reindex(pIDs, fill_value=0)
+            .to_numpy(),
+        },
+        index=pd.Index(pIDs, name="participantID"),
+    )
+    dfs["questionnaires/summary"] = summary_df
+    dfs["questionnaires/exclusions"] = evaluate_rules(
+        summary_df, config.get("exclusion_rules", EXCLUSION_RULES)
+    )
+    return dfs
+
+
+def simulate_data_dir(config: dict) -> str:
+    """Writes a synthetic DATA_DIR tree (see module docstring).
+
+    Parameters
+    ----------
+    config : dict
+        output_dir : str, default=CACHE_DIR/simulated_data
+            Directory to write to, use it as DATA_DIR.
+        story : str, default="simulated_story"
+        conditions : Dict[str, float], default={"control": 0, "treatment": 0.5}
+            Conditions and their effect size.
+        n_participants : int or Dict[str, int], default=200
+            Number of participants (per condition).
+        max_n_words : int, default=150
+            Maximum length of word chains.
+        max_timestamp : int, default=180000
+            Duration of pre/post free association in ms.
+        chunk_size : int, default=5000
+            Number of participants simulated at once.
+        seed : int, default=42
+        Further parameters are described in the functions of this module.
+
+    Returns
+    -------
+    str
+        output_dir
+    """
+    output_dir = config.get("output_dir", os.path.join(CACHE_DIR, "simulated_data"))
+    story = config.get("story", "simulated_story")
+    conditions: Dict[str, float] = config.get(
+        "conditions", {"control": 0.0, "treatment": 0.5}
+    )
+    n_participants: Union[int, Dict[str, int]] = config.get("n_participants", 200)
+    chunk_size = config.get("chunk_size", 5000)
+    ratings = config.get("ratings", {"approach": "simulated", "model": "moment"})
+    rng = np.random.default_rng(config.get("seed", 42))
+
+    vocabulary_df = simulate_vocabulary(config, rng)
+    path_rated_words = os.path.join(
+        output_dir,
+        RATEDWORDS_DIR,
+        ratings["approach"],
+        ratings["model"],
+        story,
+        "all.csv",
+    )
+    check_make_dirs(path_rated_words, verbose=False)
+    vocabulary_df.to_csv(path_rated_words, index=False)
+
+    corrected = vocabulary_df["word"].to_numpy()[
+        misspelled_words(vocabulary_df, config.get("n_corrections", 200))
+    ]
+    path_corrections = os.path.join(output_dir, CORRECTIONS_DIR, "corrections.csv")
+    check_make_dirs(path_corrections, verbose=False)
+    pd.DataFrame(
+        {"key": [f"{word}x" for word in corrected], "value": corrected}
+    ).to_csv(path_corrections, index=False)
+
+    sentences = simulate_sentences(config, rng, vocabulary_df["word"].to_numpy())
+
+    paths = {
+        "time_words/practice": ("time_words", "practice.csv"),
+        "time_words/pre": ("time_words", "pre.csv"),
+        "time_words/post": ("time_words", "post.csv"),
+        "double_press/pre": ("double_press", "pre.csv"),
+        "double_press/post": ("double_press", "post.csv"),
+        "time_spr/spr": (TIME_SPR_DIR, "spr.csv"),
+        "questionnaires/summary": (QUESTIONNAIRE_DIR, "summary.csv"),
+        "questionnaires/exclusions": (QUESTIONNAIRE_DIR, "exclusions.csv"),
+    }
+    pID_start = config.get("pID_start", 1000)
+    for condition, effect_size in conditions.items():
+        n_condition = (
+            n_participants[condition]
+            if isinstance(n_participants, dict)
+            else n_participants
+        )
+        log.info(
+            f"Simulating {n_condition} participants for {story}/{condition}"
+            f" (effect size {effect_size})"
+        )
+        for chunk_start in range(0, n_condition, chunk_size):
+            pIDs = pID_start + np.arange(
+                chunk_start, min(chunk_start + chunk_size, n_condition)
+            )
+            dfs = simulate_chunk(
+                config, rng, pIDs, effect_size, vocabulary_df, sentences
+            )
+            for key, (directory, filename) in paths.items():
+                path = os.path.join(output_dir, directory, story, condition, filename)
+                if chunk_start == 0:
+                    check_make_dirs(path, verbose=False)
+                dfs[key].to_csv(
+                    path, mode="w" if chunk_start == 0 else "a", header=chunk_start == 0
+                )
+        pID_start += n_condition
+
+    log.info(f"Simulated data written to {output_dir}")
+    return output_dir
+
+
+if __name__ == "__main__":
+    args = argparse.ArgumentParser()
+    args.add_argument(
+        "-o",
+        "--output_dir",
+        type=str,
+        default=os.path.join(CACHE_DIR, "simulated_data"),
+        help="Directory to write the data tree to.",
+    )
+    args.add_argument(
+        "-n", "--n_participants", type=int, default=200, help="Per condition."
+    )
+    args.add_argument(
+        "-e",
+        "--effect_size",
+        type=float,
+        default=0.5,
+        help="Effect size of the treatment condition (control has 0).",
+    )
+    args.add_argument("--max_n_words", type=int, default=150)
+    args.add_argument("--chunk_size", type=int, default=5000)
+    args.add_argument("--seed", type=int, default=42)
+    args = args.parse_args()
+
+    simulate_data_dir(
+        {
+            "output_dir": args.output_dir,
+            "conditions": {"control": 0.0, "treatment": args.effect_size},
+            "n_participants": args.n_participants,
+            "max_n_words": args.max_n_words,
+            "chunk_size": args.chunk_size,
+            "seed": args.seed,
+        }
+    )
@@ -0,0 +1,455 @@
+"""Monte Carlo power analysis of the story relatedness tests.
+
+Every replicate draws two synthetic conditions (arms 'x' and 'y') with
+`simulate_rated_wordchains`, shifts the story relatedness of arm 'y' by the
+effect size and runs one of the tests on the draw:
+
+    test_two                   : test on participant means (default: t-test)
+    test_difference_bin_means  : permutation test of the mean bin difference
+    test_mlm                   : mixed linear model on participant bin means
+
+The power of a grid cell (n_participants per arm, effect size) is the share of
+replicates with p < alpha. Replicates are run in batches on a process pool until
+the confidence interval of the power is narrower than `ci_width` (or
+`max_simulations` is reached). Every replicate has its own seed derived from
+(seed, cell, replicate), so results do not depend on the number of workers or
+on the order in which replicates finish. Finished replicates are appended to a
+checkpoint file and reused when the analysis is run again.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from oc_pmc import CACHE_DIR, console, get_logger
+from oc_pmc.simulate.rated_wordchains import simulate_rated_wordchains
+from oc_pmc.utils import check_make_dirs
+
+log = get_logger(__name__)
+
+TESTS = ("test_two", "test_difference_bin_means", "test_mlm")
+# 'x' is the reference level of the mixed linear model
+ARMS = ("x", "y")
+DEFAULT_ARM_CONFIG = {
+    "story": "carver_original",
+    "condition": "button_press",
+    "position": "post",
+}
+# participants drawn to estimate the standard deviation of participant means
+N_PILOT = 2000
+# config keys that control how many replicates run, not their results
+RUN_KEYS = (
+    "batch_size",
+    "checkpoint",
+    "ci",
+    "ci_width",
+    "max_simulations",
+    "max_workers",
+    "min_simulations",
+)
+
+
+def arm_configs(config: Dict[str, Any]) -> Tuple[Dict, Dict]:
+    return (
+        {**DEFAULT_ARM_CONFIG, **config.get("config1", {})},
+        {**DEFAULT_ARM_CONFIG, **config.get("config2", {})},
+    )
+
+
+def participant_sd(config: Dict[str, Any]) -> float:
+    """Standard deviation of participant mean story relatedness in arm 'x'."""
+    config1, _ = arm_configs(config)
+    pilot_df = simulate_rated_wordchains(
+        {**config1, "n_participants": N_PILOT, "seed": config.get("seed", 42)}
+    )
+    return pilot_df.groupby("participantID")["story_relatedness"].mean().std()
+
+
+def simulate_arms(
+    config: Dict[str, Any],
+    n_participants: int,
+    effect_size: float,
+    rng: np.random.Generator,
+) -> pd.DataFrame:
+    """Returns words of both arms (columns story_relatedness, timestamp, arm),
+    arm 'y' is shifted by effect_size * config['effect_scale']."""
+    arm_dfs = list()
+    for idx_arm, (arm, arm_config) in enumerate(zip(ARMS, arm_configs(config))):
+        arm_df = simulate_rated_wordchains(
+            {
+                **arm_config,
+                "n_participants": n_participants,
+                "seed": int(rng.integers(2**32)),
+            }
+        )[["story_relatedness", "timestamp"]]
+        # simulated participant IDs depend on the condition, make them unique
+        pIDs = arm_df.index
+        arm_df.index = pIDs - pIDs.min() + idx_arm * n_participants
+        arm_df["arm"] = arm
+        arm_dfs.append(arm_df)
+
+    shift = effect_size * config.get("effect_scale", 1.0)
+    if config.get("effect_decay") is not None:
+        shift = shift * np.exp(-arm_dfs[1]["timestamp"] / config["effect_decay"])
+    arm_dfs[1]["story_relatedness"] = np.clip(
+        arm_dfs[1]["story_relatedness"] + shift, 1, 7
+    )
+    return pd.concat(arm_dfs, axis=0)
+
+
+def run_test(config: Dict[str, Any], data_df: pd.DataFrame) -> float:
+    """Returns the p-value of config['test'] on the simulated arms."""
+    test = config.get("test", "test_two")
+    step = config.get("step", 30000)
+
+    if test == "test_two":
+        from oc_pmc.stat.test_two import test_two
+
+        participant_sr = data_df.groupby(["arm", "participantID"])[
+            "story_relatedness"
+        ].mean()
+        test_config = {
+            "measure": "story_relatedness",
+            "test_type": config.get("test_type", "ind"),
+            "no_effect_size": True,
+        }
+        if config.get("alternative") is not None:
+            test_config["alternative"] = config["alternative"]
+        return test_two(
+            test_config,
+            participant_sr.loc[ARMS[0]],
+            participant_sr.loc[ARMS[1]],
+            verbose=False,
+        )
+
+    if test == "test_difference_bin_means":
+        from oc_pmc.stat.difference_bin_means import func_difference_bin_means
+
+        _, _, pvalue = func_difference_bin_means(
+            {
+                "column": "story_relatedness",
+                "step": step,
+                "comparison_dct": {"arm": list(ARMS)},
+                "n_bootstrap": config.get("n_bootstrap", 1000),
+                "alternative": config.get("alternative", "two-sided"),
+                "verbose": False,
+                "bootstrap_tqdm_disable": True,
+            },
+            data_df,
+        )
+        return pvalue
+
+    if test == "test_mlm":
+        from statsmodels.tools.sm_exceptions import ConvergenceWarning
+
+        from oc_pmc.stat.test_mlm import fit_mlm, interaction_param
+
+        aggregated_df = (
+            data_df.assign(
+                bin_time=(data_df["timestamp"] // step * step + step // 2) // 1000
+            )
+            .groupby(["arm", "participantID", "bin_time"])["story_relatedness"]
+            .mean()
+            .reset_index()
+        )
+        # centered, so that the arm coefficient is the difference at the mean
+        # time (the main effect) and not at bin_time = 0
+        aggregated_df["bin_time"] -= aggregated_df["bin_time"].mean()
+        # singular random effects and convergence warnings on every replicate,
+        # statsmodels sets its warnings to "always" on import
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            warnings.simplefilter("ignore", ConvergenceWarning)
+            result = fit_mlm(config, aggregated_df, "story_relatedness", "arm")
+        if config.get("mlm_term", "main") == "interaction":
+            param = interaction_param(aggregated_df, "arm")
+        else:
+            param = f"arm[T.{ARMS[1]}]"
+        return result.pvalues.loc[param]
+
+    raise ValueError(f"Invalid test: '{test}', choose from {TESTS}")
+
+
+def _run_replicate(task: Tuple[Dict[str, Any], int, int, int, float, int]) -> float:
+    config, idx_n, n_participants, idx_effect, effect_size, replicate = task
+    seed_sequence = np.random.SeedSequence(
+        config.get("seed", 42), spawn_key=(idx_n, idx_effect, replicate)
+    )
+    # permutation tests shuffle with pandas, which uses the global numpy state
+    np.random.seed(seed_sequence.generate_state(1)[0])
+    data_df = simulate_arms(
+        config, n_participants, effect_size, np.random.default_rng(seed_sequence)
+    )
+    return run_test(config, data_df)
+
+
+def power_ci(n_rejected: int, n_simulations: int, ci: float) -> Tuple[float, float]:
+    """Wilson score interval of the rejection rate."""
+    if n_simulations == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf((1 + ci) / 2)
+    power = n_rejected / n_simulations
+    center = (power + z**2 / (2 * n_simulations)) / (1 + z**2 / n_simulations)
+    half_width = (
+        z
+        / (1 + z**2 / n_simulations)
+        * np.sqrt(power * (1 - power) / n_simulations + z**2 / (4 * n_simulations**2))
+    )
+    return max(center - half_width, 0.0), min(center + half_width, 1.0)
+
+
+def summarize_power(config: Dict[str, Any], results_df: pd.DataFrame) -> pd.DataFrame:
+    """Power and its confidence interval for every cell of the grid."""
+    alpha = config.get("alpha", 0.05)
+    ci = config.get("ci", 0.95)
+    rows = list()
+    for n_participants in config["n_participants"]:
+        for effect_size in config["effect_sizes"]:
+            pvalues = results_df.loc[
+                (results_df["n_participants"] == n_participants)
+                & (results_df["effect_size"] == effect_size),
+                "pvalue",
+            ]
+            n_rejected = int((pvalues < alpha).sum())
+            ci_lower, ci_upper = power_ci(n_rejected, len(pvalues), ci)
+            rows.append(
+                {
+                    "n_participants": n_participants,
+                    "effect_size": effect_size,
+                    "n_simulations": len(pvalues),
+                    "power": n_rejected / max(len(pvalues), 1),
+                    "ci_lower": ci_lower,
+                    "ci_upper": ci_upper,
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def checkpoint_path(config: Dict[str, Any]) -> str:
+    """Checkpoint file of config, shared by all runs with the same replicates."""
+    if config.get("checkpoint") is not None:
+        return config["checkpoint"]
+    key = {k: v for k, v in config.items() if k not in RUN_KEYS}
+    digest = hashlib.sha256(
+        json.dumps(key, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return os.path.join(CACHE_DIR, "power", f"{digest[:16]}.csv")
+
+
+def power_analysis(config: Dict[str, Any]) -> pd.DataFrame:
+    """Estimates the power of a test over a grid of sample and effect sizes.
+
+    Parameters
+    ----------
+    config : Dict
+        Has to contain
+            n_participants : List[int]
+                Participants per arm.
+            effect_sizes : List[float]
+                Shifts of the story relatedness of arm 'y'.
+        and can contain:
+            test : str, default='test_two'
+                One of TESTS.
+            config1, config2 : Dict
+                Simulation configs of the arms, passed to
+                `simulate_rated_wordchains` (default: DEFAULT_ARM_CONFIG).
+            effect_unit : str, default='d'
+                'd': effect sizes are in standard deviations of participant
+                mean story relatedness (Cohen's d), 'raw': in rating points.
+            effect_decay : float, optional
+                Shift decays with exp(-timestamp / effect_decay).
+            alpha : float, default=0.05
+            alternative : str, optional
+            test_type : str, default='ind'
+                test_two only.
+            step : int, default=30000
+                Bin size, test_difference_bin_means and test_mlm only.
+            n_bootstrap : int, default=1000
+                test_difference_bin_means only.
+            model_kind, model_method : str
+                test_mlm only, see `fit_mlm`.
+            mlm_term : str, default='main'
+                test_mlm only: test the main effect of the arm ('main', the
+                difference at the mean bin time) or its interaction with time
+                ('interaction', needs effect_decay).
+            ci : float, default=0.95
+                Confidence level of the power estimate.
+            ci_width : float, default=0.05
+                Stop a cell once its confidence interval is narrower.
+            min_simulations : int, default=200
+            max_simulations : int, default=5000
+            batch_size : int, default=100
+                Replicates per cell and round (stopping is checked per round).
+            max_workers : int, optional
+                Processes, defaults to the number of CPUs.
+            seed : int, default=42
+            checkpoint : str, optional
+                CSV of finished replicates. Defaults to a file in CACHE_DIR
+                named after the config.
+
+    Returns
+    -------
+    pd.DataFrame
+        Power per cell, see `summarize_power`.
+    """
+    config = dict(config)
+    test = config.get("test", "test_two")
+    if test not in TESTS:
+        raise ValueError(f"Invalid test: '{test}', choose from {TESTS}")
+    effect_unit = config.get("effect_unit", "d")
+    if effect_unit == "d":
+        config["effect_scale"] = participant_sd(config)
+        log.info(f"Effect sizes in units of {config['effect_scale']:.3f} ratings")
+    elif effect_unit != "raw":
+        raise ValueError(f"effect_unit has to be 'd' or 'raw', not '{effect_unit}'")
+
+    ci_width = config.get("ci_width", 0.05)
+    min_simulations = config.get("min_simulations", 200)
+    max_simulations = config.get("max_simulations", 5000)
+    batch_size = config.get("batch_size", 100)
+    max_workers = config.get("max_workers") or os.cpu_count() or 1
+
+    path_checkpoint = checkpoint_path(config)
+    columns = ["n_participants", "effect_size", "replicate", "pvalue"]
+    if os.path.isfile(path_checkpoint):
+        results_df = pd.read_csv(path_checkpoint)
+        log.info(f"Resuming from {len(results_df)} replicates in {path_checkpoint}")
+    else:
+        check_make_dirs(path_checkpoint, verbose=False)
+        results_df = pd.DataFrame(columns=columns)
+        results_df.to_csv(path_checkpoint, index=False)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        idx_round = 0
+        while True:
+            summary_df = summarize_power(config, results_df)
+            done = (summary_df["n_simulations"] >= max_simulations) | (
+                (summary_df["n_simulations"] >= min_simulations)
+                & (summary_df["ci_upper"] - summary_df["ci_lower"] <= ci_width)
+            )
+            if done.all():
+                break
+
+            tasks: List[Tuple[Dict[str, Any], int, int, int, float, int]] = list()
+            for idx_cell in np.flatnonzero(~done.to_numpy()):
+                idx_n, idx_effect = divmod(idx_cell, len(config["effect_sizes"]))
+                n_simulations = summary_df["n_simulations"].iloc[idx_cell]
+                for replicate in range(
+                    n_simulations, min(n_simulations + batch_size, max_simulations)
+                ):
+                    tasks.append(
+                        (
+                            config,
+                            idx_n,
+                            config["n_participants"][idx_n],
+                            idx_effect,
+                            config["effect_sizes"][idx_effect],
+                            replicate,
+                        )
+                    )
+            idx_round += 1
+            log.info(
+                f"Round {idx_round}: {len(tasks)} replicates in"
+                f" {(~done).sum()}/{len(done)} cells"
+            )
+            pvalues = list(
+                executor.map(
+                    _run_replicate,
+                    tasks,
+                    chunksize=max(len(tasks) // (4 * max_workers), 1),
+                )
+            )
+            batch_df = pd.DataFrame(
+                [
+                    (n_participants, effect_size, replicate, pvalue)
+                    for (
+                        _,
+                        _,
+                        n_participants,
+                        _,
+                        effect_size,
+                        replicate,
+                    ), pvalue in zip(tasks, pvalues)
+                ],
+                columns=columns,
+            )
+            batch_df.to_csv(path_checkpoint, mode="a", header=False, index=False)
+            if len(results_df) == 0:
+                results_df = batch_df
+            else:
+                results_df = pd.concat((results_df, batch_df), ignore_index=True)
+
+    return summary_df
+
+
+def print_power(summary_df: pd.DataFrame):
+    """Prints the power grid (rows: n_participants, columns: effect sizes)."""
+    from rich.table import Table
+
+    table = Table(title="Power (95% CI)")
+    table.add_column("n / arm", justify="right")
+    effect_sizes = summary_df["effect_size"].unique()
+    for effect_size in effect_sizes:
+        table.add_column(f"effect {effect_size:g}", justify="right")
+    for n_participants, n_df in summary_df.groupby("n_participants", sort=True):
+        n_df = n_df.set_index("effect_size")
+        table.add_row(
+            str(n_participants),
+            *(
+                f"{n_df.loc[e, 'power']:.2f}"
+                f" [{n_df.loc[e, 'ci_lower']:.2f}, {n_df.loc[e, 'ci_upper']:.2f}]"
+                for e in effect_sizes
+            ),
+        )
+    console.print(table)
+
+
+if __name__ == "__main__":
+    args = argparse.ArgumentParser()
+    args.add_argument("-t", "--test", type=str, default="test_two", choices=TESTS)
+    args.add_argument(
+        "-n",
+        "--n_participants",
+        type=int,
+        nargs="+",
+        default=[50, 100, 150, 200],
+        help="Participants per arm.",
+    )
+    args.add_argument(
+        "-e",
+        "--effect_sizes",
+        type=float,
+        nargs="+",
+        default=[0.0, 0.2, 0.35, 0.5],
+        help="Effect sizes (Cohen's d on participant means).",
+    )
+    args.add_argument("--ci_width", type=float, default=0.05)
+    args.add_argument("--max_simulations", type=int, default=5000)
+    args.add_argument("--max_workers", type=int)
+    args.add_argument("--seed", type=int, default=42)
+    args.add_argument("-o", "--output", type=str, help="CSV to save the power to.")
+    args = args.parse_args()
+
+    summary_df = power_analysis(
+        {
+            "test": args.test,
+            "n_participants": args.n_participants,
+            "effect_sizes": args.effect_sizes,
+            "ci_width": args.ci_width,
+            "max_simulations": args.max_simulations,
+            "max_workers": args.max_workers,
+            "seed": args.seed,
+        }
+    )
+    print_power(summary_df)
+    if args.output is not None:
+        check_make_dirs(args.output, verbose=False)
+        summary_df.to_csv(args.output, index=False)
@@ -1,6 +1,7 @@
 """Generates chains of story relatedness given certain parameters."""
 
-import matplotlib.pyplot as plt
+from typing import Optional, Tuple
+
 import numpy as np
 import pandas as pd
 from scipy.stats import lognorm
@@ -36,6 +37,7 @@ def get_stats_wordchains(plot_distributions=False):
         # transform word submission time to log
         data_df["word_time"] = np.log(data_df["word_time"])
 
+        import matplotlib.pyplot as plt
         from distfit import distfit
 
         # estimate distribution that fits
@@ -108,7 +110,15 @@ def get_stats_wordchains(plot_distributions=False):
     )
 
 
-def simulate_rated_wordchains(config: dict):
+def simulate_word_times(
+    config: dict,
+    rng: np.random.Generator,
+    n_participants: int,
+    max_timestamp: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns word submission times and timestamps, shape (n_participants,
+    max_n_words). Submission times are log-normal with participant specific
+    mean and std, words after max_timestamp are nan."""
     # mean of all p submission time means
     word_time_mean_mean = config.get("word_time_mean_mean", 8.031)
     # std of all p submission time means
@@ -119,15 +129,8 @@ def simulate_rated_wordchains(config: dict):
     word_time_std_std = config.get("word_time_std_std", 0.104)
 
     max_n_words = config.get("max_n_words", 150)
-    max_timestamp = config.get("max_timestamp", 180000)
-
-    n_participants = config["n_participants"]
-    pID_basis = config.get("pID_prefix", -2000)
-    story = config.get("story", "fake_story_1")
-    condition = config.get("condition", "fake_condition_1")
-    position = config.get("position", "fake_position_1")
-
-    rng = np.random.default_rng(seed=config.get("seed", 42))
+    if max_timestamp is None:
+        max_timestamp = config.get("max_timestamp", 180000)
 
     # choose participants means
     p_word_time_means = rng.normal(
@@ -150,6 +153,22 @@ def simulate_rated_wordchains(config: dict):
     p_word_timestamps = np.cumsum(p_word_submission_times, axis=1)
     p_word_submission_times[p_word_timestamps > max_timestamp] = np.nan
     p_word_timestamps[p_word_timestamps > max_timestamp] = np.nan
+    return p_word_submission_times, p_word_timestamps
+
+
+def simulate_rated_wordchains(config: dict):
+    max_n_words = config.get("max_n_words", 150)
+    n_participants = config["n_participants"]
+    pID_basis = config.get("pID_prefix", -2000)
+    story = config.get("story", "fake_story_1")
+    condition = config.get("condition", "fake_condition_1")
+    position = config.get("position", "fake_position_1")
+
+    rng = np.random.default_rng(seed=config.get("seed", 42))
+
+    p_word_submission_times, p_word_timestamps = simulate_word_times(
+        config, rng, n_participants
+    )
 
     # pivot into long format
     p_word_submission_times_flat = p_word_submission_times.reshape(-1)
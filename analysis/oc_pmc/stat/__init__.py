@@ -1,15 +1,49 @@
-from .correlate_two import correlate_two
-from .sr_two import sr_two
-from .te_two import te_two
-from .test_mlm import test_mlm
-from .test_multiple import test_multiple
-from .test_two import test_two
-
-__all__ = [
-    "correlate_two",
-    "sr_two",
-    "te_two",
-    "test_mlm",
-    "test_multiple",
-    "test_two",
-]
+"""Statistical tests, imported on first access (statsmodels, scipy and plotly are
+slow to import).
+
+Every exported function has the name of the submodule defining it. Importing a
+submodule sets it as attribute of the package, which would shadow the function,
+so the package keeps the function instead (as an eager
+`from .test_two import test_two` would).
+"""
+
+import sys
+from importlib import import_module
+from types import ModuleType
+
+# exported name -> submodule
+_SUBMODULES = {
+    "correlate_two": "correlate_two",
+    "sr_two": "sr_two",
+    "te_two": "te_two",
+    "test_mlm": "test_mlm",
+    "test_multiple": "test_multiple",
+    "test_two": "test_two",
+}
+
+__all__ = list(_SUBMODULES.keys())
+
+
+class _LazyPackage(ModuleType):
+    def __setattr__(self, name: str, value) -> None:
+        if (
+            name in _SUBMODULES
+            and isinstance(value, ModuleType)
+            and value.__name__ == f"{__name__}.{_SUBMODULES[name]}"
+        ):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _LazyPackage
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        import_module(f".{_SUBMODULES[name]}", __name__)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
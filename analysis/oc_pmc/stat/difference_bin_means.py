@@ -8,7 +8,12 @@ from oc_pmc.load import load_rated_wordchains, load_wordchains
 from oc_pmc.stat.test_two import cut_small_value
 from oc_pmc.utils import percentile_of
 from oc_pmc.utils.aggregator import aggregator
-from oc_pmc.utils.bootstrap import bootstrap_with_groups_get_estimates
+from oc_pmc.utils.binned_cube import bin_edges, binned_cube, group_bin_means
+from oc_pmc.utils.bootstrap import (
+    bootstrap_with_groups_get_estimates,
+    pvalue_mc_error,
+    pvalue_stopping,
+)
 
 log = get_logger(__name__)
 
@@ -58,9 +63,32 @@ def func_load(config: dict) -> pd.DataFrame:
     return load_rated_wordchains(config)
 
 
+def get_pvalue(percentile: float, alternative: str) -> float:
+    if alternative == "two-sided":
+        return min(1 - percentile, percentile) * 2
+    elif alternative == "greater":
+        return 1 - percentile
+    elif alternative == "less":
+        return percentile
+    raise ValueError(
+        'config[\'alternative\'] has to be one of "two-sided", "greater", or "less"'
+        f'not "{alternative}"'
+    )
+
+
 def func_difference_bin_means(
     config: dict, data_df: pd.DataFrame
 ) -> tuple[float, float, float]:
+    diff_stat, percentile, pvalue, _, _ = permutation_test_bin_means(config, data_df)
+    return (diff_stat, percentile, pvalue)
+
+
+def permutation_test_bin_means(
+    config: dict, data_df: pd.DataFrame
+) -> tuple[float, float, float, int, float]:
+    """func_difference_bin_means, also returning the number of permutations and
+    the Monte Carlo error of the p-value (with adaptive_bootstrap, permutations
+    stop once the p-value is precise enough, see bootstrap.pvalue_stopping)."""
     column = config["column"]  # need to specify what you want to bin
     step = config["step"]  # bin step
     # expects a dict with {column: {category1, category2}}
@@ -73,111 +101,98 @@ def func_difference_bin_means(
             f"Can only compare two groups, but 'compare_categories'is {comparison_dct}"
         )
 
-    # Need to determine min x value: take closest multiple to "step"
-    min_x = config.get(
-        "min_x",
-        (min(data_df["timestamp"]) // step) * step,
-    )
-    max_x = config.get(
-        "max_x",
-        # accomodate largest value                            | don't remember
-        int(np.ceil(max(data_df["timestamp"]) / step)) * step + step - 1,
+    # bin each datapoint: from closest multiple of "step" below the min x value
+    bins = bin_edges(
+        data_df["timestamp"], step, config.get("min_x"), config.get("max_x")
     )
-
-    # bin each datapoint
-    bins = np.arange(min_x, max_x + 1, step)
     n_bins = len(bins) - 1
     bin_labels = [i for i in range(n_bins)]
-    data_df["bins"] = pd.cut(data_df["timestamp"], bins=bins, labels=bin_labels)
-
-    # count number of words in each bin
-    counted_bins = data_df.groupby(["bins", comparison_column], observed=False).count()
-    n_observations_per_bin = counted_bins[counted_bins.columns[0]]
-    n_observations_per_bin.name = "n_bin"
-
-    data_with_n_bins_df = pd.merge(
-        data_df.reset_index(),
-        n_observations_per_bin.reset_index(),
-        on=["bins", comparison_column],
-    )
-    data_df = data_with_n_bins_df.loc[
-        data_with_n_bins_df["n_bin"] > config.get("min_bin_n", 1)
-    ].set_index("participantID")
 
     if config.get("within_participant_summary", True):
-        sample_df = (
-            data_df.groupby(["bins", comparison_column, "participantID"], observed=True)
-            .agg({column: "mean"})
-            .reset_index()
+        cube = binned_cube(data_df, "timestamp", [column], [comparison_column], bins)
+
+        # count number of words in each bin (of the first column, like
+        # data_df.groupby(["bins", comparison_column]).count())
+        counted_bins = cube.counts_by_group(
+            [comparison_column],
+            bin_labels,
+            measure=column if data_df.columns[0] == column else None,
+        )
+        n_observations_per_bin = counted_bins.to_numpy().reshape(-1, n_bins)
+        unit_groups = counted_bins.index.levels[0].get_indexer(
+            cube.units[comparison_column]
+        )
+        # only keep bins with enough words, and participants with words in them
+        in_bins = (n_observations_per_bin[unit_groups] > config.get("min_bin_n", 1)) & (
+            cube.n_rows > 0
+        )
+        kept_units = in_bins.any(axis=1)
+        kept_bins = in_bins.any(axis=0)
+
+        # Within participant mean (participants x bins)
+        sample_wide = np.where(in_bins, cube.means(column), np.nan)
+        sample_wide = sample_wide[kept_units][:, kept_bins]
+        comparison_codes, comparison_groups = pd.factorize(
+            cube.units.loc[kept_units, comparison_column], sort=True
         )
-
-        sample_wide_df = sample_df.pivot(
-            columns="bins",
-            index=["participantID", comparison_column],
-            values=column,
-        ).reset_index(1)
-
-        # Mean across participants
-        bin_mean_df = sample_wide_df.groupby(comparison_column).mean()
 
         # Sanity checks
-        if len(bin_mean_df.index) != 2:
+        if len(comparison_groups) != 2:
             raise ValueError("Something went wrong.")
+        first = comparison_groups.get_loc(comparison_categories[0])
+        second = comparison_groups.get_loc(comparison_categories[1])
+
+        def mean_bin_difference(sample_wide: np.ndarray, codes: np.ndarray) -> float:
+            # Mean across participants, subtract means and compute mean
+            bin_means = group_bin_means(sample_wide, codes, 2)
+            differences = bin_means[first] - bin_means[second]
+            differences = differences[~np.isnan(differences)]
+            if len(differences) == 0:
+                return np.nan
+            return differences.mean()
 
-        # Subtract means and compute mean
-        diff_stat = (
-            bin_mean_df.loc[comparison_categories[0]]
-            - bin_mean_df.loc[comparison_categories[1]]
-        ).mean()
+        diff_stat = mean_bin_difference(sample_wide, comparison_codes)
 
         def sample_diff_stat_func_within_participants(
-            sample_wide_df: pd.DataFrame,
-            comparison_categories: list[str],
-            comparison_column: str,
+            sample_wide: np.ndarray, comparison_codes: np.ndarray
         ) -> float:
-            sample_wide_df.loc[:, comparison_column] = (
-                sample_wide_df[comparison_column].sample(frac=1).values
+            return mean_bin_difference(
+                sample_wide, np.random.permutation(comparison_codes)
             )
-            bin_mean_df = sample_wide_df.groupby(comparison_column).mean()
-            return (
-                bin_mean_df.loc[comparison_categories[0]]
-                - bin_mean_df.loc[comparison_categories[1]]
-            ).mean()  # type: ignore
 
-        bootstrap_sample_df = sample_wide_df
+        bootstrap_sample_df = sample_wide
         bootstrap_func = sample_diff_stat_func_within_participants
-        bootstrap_args = dict(
-            comparison_categories=comparison_categories,
-            comparison_column=comparison_column,
-        )
+        bootstrap_args = dict(comparison_codes=comparison_codes)
     else:
         raise NotImplementedError(
             "Did not implement procedure for `within_participant_summary==False`"
         )
 
+    alternative = config.get("alternative", "two-sided")
+    get_pvalue(0.5, alternative)  # fail before permuting
+
+    # with adaptive_bootstrap: permute until the p-value is precise enough
+    stopping = pvalue_stopping(
+        config,
+        lambda estimates: get_pvalue(
+            percentile_of(estimates, diff_stat).item(), alternative
+        ),
+        two_sided=alternative == "two-sided",
+    )
     estimate_df = bootstrap_with_groups_get_estimates(
-        config, bootstrap_sample_df.copy(), bootstrap_func, bootstrap_args
+        config, bootstrap_sample_df.copy(), bootstrap_func, bootstrap_args, stopping
     )
 
     percentile = percentile_of(estimate_df, diff_stat).item()
-
-    alternative = config.get("alternative", "two-sided")
-    if alternative == "two-sided":
-        pvalue = min(1 - percentile, percentile) * 2
-    elif alternative == "greater":
-        pvalue = 1 - percentile
-    elif alternative == "less":
-        pvalue = percentile
-    else:
-        raise ValueError(
-            'config[\'alternative\'] has to be one of "two-sided", "greater", or "less"'
-            f'not "{alternative}"'
-        )
+    pvalue = get_pvalue(percentile, alternative)
+    n_permutations = estimate_df.shape[1]
+    mc_error = pvalue_mc_error(pvalue, n_permutations, alternative == "two-sided")
 
     if config.get("verbose", True):
         print(
             f"Data mean {diff_stat} lies in percentile: {percentile:.4f}"
-            f", p = {pvalue:.4f} ({alternative})"
+            f", p = {pvalue:.4f} ({alternative}, Monte Carlo error {mc_error:.4f}"
+            f" with {n_permutations} permutations)"
         )
 
     if config.get("plot"):
@@ -197,7 +212,7 @@ def func_difference_bin_means(
             },
         ]
         func_plot_distribution(plot_config, data_df=plot_df)
-    return (diff_stat, percentile, pvalue)
+    return (diff_stat, percentile, pvalue, n_permutations, mc_error)
 
 
 def test_difference_bin_means(config: dict) -> tuple[float, float, float]:
@@ -240,14 +255,17 @@ def test_difference_bin_means(config: dict) -> tuple[float, float, float]:
     config["column"] = config["measure"]
 
     data_df = pd.concat((data1_df, data2_df))
-    difference, percentile, pvalue = func_difference_bin_means(config, data_df)  # type: ignore
+    difference, percentile, pvalue, n_permutations, mc_error = (
+        permutation_test_bin_means(config, data_df)  # type: ignore
+    )
 
     alt = " (two-sided)"
     if config.get("alternative"):
         alt = f" ({config['alternative']})"
     print(
         f"Bootstrapped bin difference: diff = {difference:.5f},"
-        f" percentile = {percentile:.5f}, p={pvalue:.5f}{alt}"
+        f" percentile = {percentile:.5f}, p={pvalue:.5f}{alt},"
+        f" Monte Carlo error = {mc_error:.5f}"
     )
     # latex string
     name1 = config.get("name1", "name1")
@@ -276,11 +294,10 @@ def test_difference_bin_means(config: dict) -> tuple[float, float, float]:
     if config.get("alternative") == "greater" or config.get("alternative") == "less":
         alt_str = "one-sided, "
 
-    n_bootstrap = config["n_bootstrap"]
     print(
         f"$\\text{{diff}}{super_script}_{{\\text{{{name1} - {name2}}}}}"
         f"={round(difference, 2):.2f}, ${alt_str}permutation test,$"
-        f" n = {n_bootstrap}, {pvalue_str}$"
+        f" n = {n_permutations}, {pvalue_str}$"
     )
 
     return difference, percentile, pvalue
@@ -1,16 +1,11 @@
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import numpy as np
 import pandas as pd
-import plotly.graph_objects as go
-import statsmodels.formula.api as smf
-from plotly.subplots import make_subplots
-from scipy import stats
-from scipy.signal import savgol_filter
-from sklearn.linear_model import LinearRegression
-from statsmodels.regression.mixed_linear_model import MixedLMResults
-
-from oc_pmc import console, get_logger
+
+import oc_pmc
+from oc_pmc import get_logger
 from oc_pmc.load import (
     load_rated_wordchains,
     load_thought_entries_and_questionnaire,
@@ -22,16 +17,26 @@ from oc_pmc.utils import (
     cut_small_value,
     save_plot,
 )
+from oc_pmc.utils.binned_cube import bin_edges, binned_cube
+
+if TYPE_CHECKING:
+    from statsmodels.regression.mixed_linear_model import MixedLMResults
 
 log = get_logger(__name__)
 
 
 def check_model_assumptions(
-    config: dict, result: MixedLMResults, aggregated_df: pd.DataFrame
+    config: dict, result: "MixedLMResults", aggregated_df: pd.DataFrame
 ):
     """Check mixed-effects model assumptions and generate plots"""
+    # plotting and test dependencies are slow to import, only load them here
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    from scipy import stats
+    from scipy.signal import savgol_filter
+    from sklearn.linear_model import LinearRegression
 
-    console.print("\nChecking model assumptions", style="blue")
+    oc_pmc.console.print("\nChecking model assumptions", style="blue")
 
     # Extract residuals and fitted values
     fitted_values: pd.Series = result.fittedvalues
@@ -62,7 +67,7 @@ def check_model_assumptions(
     )
 
     ### 1. -----------------------------------------------------------------
-    console.print("\n1. Linearity of fixed effects", style="green")
+    oc_pmc.console.print("\n1. Linearity of fixed effects", style="green")
 
     # Create interactive subplot figure
     # fig_linearity = make_subplots(
@@ -180,19 +185,25 @@ def check_model_assumptions(
     fig_assumptions.update_yaxes(title_text="Residuals", row=1, col=1)
     fig_assumptions.update_yaxes(title_text="Residuals", row=1, col=2)
 
-    console.print(">> Check for random scatter around y=0 and no general patterns")
+    oc_pmc.console.print(
+        ">> Check for random scatter around y=0 and no general patterns"
+    )
 
     ### 2. -----------------------------------------------------------------
-    console.print("\n2. Normality of residuals", style="green")
+    oc_pmc.console.print("\n2. Normality of residuals", style="green")
 
     # Statistical tests for normality
     shapiro_stat, shapiro_p = stats.shapiro(residuals)
-    console.print(f"Wilk-Shapiro test: W = {shapiro_stat:.4f}, p = {shapiro_p:.4f}")
+    oc_pmc.console.print(
+        f"Wilk-Shapiro test: W = {shapiro_stat:.4f}, p = {shapiro_p:.4f}"
+    )
 
     if shapiro_p > 0.05:
-        console.print(">> Residuals appear normally distributed (p > 0.05")
+        oc_pmc.console.print(">> Residuals appear normally distributed (p > 0.05")
     else:
-        console.print(">> Residuals may violate normality (p < 0.05)", style="red")
+        oc_pmc.console.print(
+            ">> Residuals may violate normality (p < 0.05)", style="red"
+        )
 
     # Q-Q plot
 
@@ -266,21 +277,23 @@ def check_model_assumptions(
     fig_assumptions.update_yaxes(title_text="Density", row=2, col=2)
 
     ### 3. -----------------------------------------------------------------
-    console.print("\n3. Homoscedasticity (constant variance of errors)", style="green")
+    oc_pmc.console.print(
+        "\n3. Homoscedasticity (constant variance of errors)", style="green"
+    )
 
     abs_residuals = np.abs(residuals)
     squared_residuals = residuals**2
 
     # Test correlation
     corr_abs, p_abs = stats.pearsonr(fitted_values, abs_residuals)
-    console.print(
+    oc_pmc.console.print(
         f"Correlation fitted vs |residuals|: r = {corr_abs:.4f}, p = {p_abs:.4f}"
     )
 
     if p_abs > 0.05:  # type: ignore
-        console.print(">> Homoscedasticity assumption likely satisfied")
+        oc_pmc.console.print(">> Homoscedasticity assumption likely satisfied")
     else:
-        console.print(">> Possible heteroscedasticity detected", style="red")
+        oc_pmc.console.print(">> Possible heteroscedasticity detected", style="red")
 
     # Absolute residuals vs fitted
     fig_assumptions.add_trace(
@@ -332,7 +345,7 @@ def check_model_assumptions(
     fig_assumptions.update_yaxes(title_text="Squared Residuals", row=3, col=2)
 
     ### 4. -----------------------------------------------------------------
-    console.print("\n4. Normality of random effects", style="green")
+    oc_pmc.console.print("\n4. Normality of random effects", style="green")
 
     # Extract random effects
     random_effects = result.random_effects
@@ -349,15 +362,17 @@ def check_model_assumptions(
 
     if random_intercepts:
         shapiro_stat, shapiro_p = stats.shapiro(random_intercepts)
-        console.print(
+        oc_pmc.console.print(
             f">> Random intercepts normality:"
             f" W = {shapiro_stat:.4f}, p = {shapiro_p:.4f}"
         )
 
         if shapiro_p > 0.05:
-            console.print(">> Random intercepts appear normally distributed (p > 0.05")
+            oc_pmc.console.print(
+                ">> Random intercepts appear normally distributed (p > 0.05"
+            )
         else:
-            console.print(
+            oc_pmc.console.print(
                 ">> Random intercepts may violate normality (p < 0.05)", style="red"
             )
 
@@ -380,14 +395,16 @@ def check_model_assumptions(
     # Test normality of random slopes
     if random_slopes:
         shapiro_stat, shapiro_p = stats.shapiro(random_slopes)
-        console.print(
+        oc_pmc.console.print(
             f">> Random slopes normality: W = {shapiro_stat:.4f}, p = {shapiro_p:.4f}"
         )
 
         if shapiro_p > 0.05:
-            console.print(">> Random slopes appear normally distributed (p > 0.05")
+            oc_pmc.console.print(
+                ">> Random slopes appear normally distributed (p > 0.05"
+            )
         else:
-            console.print(
+            oc_pmc.console.print(
                 ">> Random slopes may violate normality (p < 0.05)", style="red"
             )
 
@@ -409,7 +426,7 @@ def check_model_assumptions(
     fig_assumptions.update_layout(barmode="overlay")
 
     ### 5. -----------------------------------------------------------------
-    console.print("\n5. Independence of residuals", style="green")
+    oc_pmc.console.print("\n5. Independence of residuals", style="green")
 
     # Check for temporal autocorrelation within participants
     autocorr_results = []
@@ -424,15 +441,15 @@ def check_model_assumptions(
         autocorr_results.append(dw_stat)
 
     mean_dw = np.mean(autocorr_results)
-    console.print(f">> Mean Durbin-Watson statistic: {mean_dw:.4f}")
-    console.print(
+    oc_pmc.console.print(f">> Mean Durbin-Watson statistic: {mean_dw:.4f}")
+    oc_pmc.console.print(
         ">> DW interpretation: ~2.0=no autocorr, <1.5 or >2.5=possible autocorr"
     )
 
     if 1.5 <= mean_dw <= 2.5:
-        console.print(">> Independence assumption likely satisfied")
+        oc_pmc.console.print(">> Independence assumption likely satisfied")
     else:
-        console.print(">> Possible autocorrelation in residuals", style="red")
+        oc_pmc.console.print(">> Possible autocorrelation in residuals", style="red")
 
     # Create Durbin-Watson distribution plot
     fig_assumptions.add_trace(
@@ -471,7 +488,7 @@ def check_model_assumptions(
     fig_assumptions.update_yaxes(title_text="Frequency", row=5, col=1)
 
     ### 6. -----------------------------------------------------------------
-    console.print("\n6. Number of outliers", style="green")
+    oc_pmc.console.print("\n6. Number of outliers", style="green")
 
     # Calculate standardized residuals
     residual_std = residuals.std()
@@ -481,13 +498,15 @@ def check_model_assumptions(
     outliers = np.abs(standardized_residuals) > 2.5
     n_outliers = np.sum(outliers)
 
-    console.print(f"Potential outliers (|std residual| > 2.5): {n_outliers}")
-    console.print(f"Percentage of outliers: {100 * n_outliers / len(residuals):.1f}%")
+    oc_pmc.console.print(f"Potential outliers (|std residual| > 2.5): {n_outliers}")
+    oc_pmc.console.print(
+        f"Percentage of outliers: {100 * n_outliers / len(residuals):.1f}%"
+    )
 
     if n_outliers > len(residuals) * 0.05:  # More than 5% outliers
-        console.print(">> High proportion of outliers detected", style="red")
+        oc_pmc.console.print(">> High proportion of outliers detected", style="red")
     else:
-        console.print(">> Acceptable proportion of outliers")
+        oc_pmc.console.print(">> Acceptable proportion of outliers")
 
     # -------------------------------
     # Finish plot
@@ -527,24 +546,63 @@ def check_model_assumptions(
         )
 
 
+def fit_mlm(
+    config: dict,
+    aggregated_df: pd.DataFrame,
+    outcome_name: str,
+    comparison_category: str,
+) -> "MixedLMResults":
+    """Fits `outcome_name ~ bin_time * comparison_category` with random intercepts
+    (config['model_kind'] == 'simple') or random intercepts and slopes ('slopes')
+    per participant."""
+    import statsmodels.formula.api as smf
+
+    model_kind = config.get("model_kind", "slopes")  # slopes | simple
+    model_method = config.get(
+        "model_method", None
+    )  # https://www.statsmodels.org/dev/generated/statsmodels.regression.mixed_linear_model.MixedLM.fit.html#statsmodels.regression.mixed_linear_model.MixedLM.fit
+    if model_kind == "simple":
+        model = smf.mixedlm(
+            f"{outcome_name} ~ bin_time * {comparison_category}",
+            aggregated_df,
+            groups=aggregated_df["participantID"],
+        )
+    elif model_kind == "slopes":
+        model = smf.mixedlm(
+            f"{outcome_name} ~ bin_time * {comparison_category}",
+            aggregated_df,
+            groups=aggregated_df["participantID"],
+            re_formula="~bin_time",
+        )
+    else:
+        raise ValueError(f"Not valid {model_kind=}")
+    return model.fit(method=model_method)
+
+
+def interaction_param(aggregated_df: pd.DataFrame, comparison_category: str) -> str:
+    """Name of the bin_time x comparison_category parameter fitted by fit_mlm."""
+    interaction_val_name = list(
+        set(aggregated_df[comparison_category].unique()).difference(
+            [aggregated_df[comparison_category].iloc[0]]
+        )
+    )[0]
+    return f"bin_time:{comparison_category}[T.{interaction_val_name}]"
+
+
 def test_mlm(config: dict):
     """Runs a mixed-linear-model on config, outputs in terminal and as latex."""
-
     measure = config["measure"]
     comparison_category = config["comparison_category"]
     step = config["step"]
     x_column = "timestamp" if not config.get("x_column") else config["x_column"]
     model_kind = config.get("model_kind", "slopes")  # slopes | simple
-    model_method = config.get(
-        "model_method", None
-    )  # https://www.statsmodels.org/dev/generated/statsmodels.regression.mixed_linear_model.MixedLM.fit.html#statsmodels.regression.mixed_linear_model.MixedLM.fit
     pvalue_exact = config.get("pvalue_exact", False)
     threshold = config.get("threshold", 0.05)
     transform = config.get("transform", "") or ""
 
     if config.get("name1") and config.get("name2"):
         console_comment = config.get("console_comment", "")
-        console.print(
+        oc_pmc.console.print(
             f"\n > Test_two: {measure}: {config['name1']} v"
             f" {config['name2']}{console_comment}",
             style="yellow",
@@ -605,30 +663,25 @@ def test_mlm(config: dict):
     if config.get("additional_grouping_columns"):
         grouping_columns += config["additional_grouping_columns"]
 
-    # Need to determine min x value: take closest multiple to "step"
-    min_x = config.get(
-        "min_x",
-        (min(data_df[x_column]) // step) * step,
-    )
-    max_x = config.get(
-        "max_x",
-        # accomodate largest value                          | not sure why
-        int(np.ceil(max(data_df[x_column]) / step)) * step + step - 1,
-    )
-
-    # bin
-    bins = np.arange(min_x, max_x + 1, step)
+    # bin: from closest multiple of "step" below the min x value
+    bins = bin_edges(data_df[x_column], step, config.get("min_x"), config.get("max_x"))
     n_bins = len(bins) - 1
     step_s = step // 1000
     bin_labels = [i * step_s + step_s // 2 for i in range(n_bins)]
-    data_df["bins"] = pd.cut(data_df[x_column], bins=bins, labels=bin_labels)
 
-    family = None
     outcome_name = ""
     if measure == "thought_entries":
+        # double presses per participant and bin (all combinations, 0 if none)
+        cube = binned_cube(
+            data_df,
+            x_column,
+            ["double_press"],
+            [c for c in grouping_columns if c not in ("participantID", "bins")],
+            bins,
+        )
         aggregated_df = (
-            data_df.groupby(grouping_columns, observed=False)[["double_press"]]
-            .count()
+            cube.counts_by_group(grouping_columns, bin_labels, measure="double_press")
+            .rename("double_press")
             .reset_index()
         )
         outcome_name = "double_press"
@@ -648,38 +701,14 @@ def test_mlm(config: dict):
 
     if transform != "":
         outcome_name = f"{transform}_{outcome_name}"
+    result = fit_mlm(config, aggregated_df, outcome_name, comparison_category)
     if model_kind == "simple":
-        model = smf.mixedlm(
-            f"{outcome_name} ~ bin_time * {comparison_category}",
-            aggregated_df,
-            groups=aggregated_df["participantID"],
-            family=family,
-        )
-        result = model.fit(method=model_method)
-        console.print("\nRandom intercepts results", style="blue")
-
-    elif model_kind == "slopes":
-        model = smf.mixedlm(
-            f"{outcome_name} ~ bin_time * {comparison_category}",
-            aggregated_df,
-            groups=aggregated_df["participantID"],
-            re_formula="~bin_time",
-        )
-        result = model.fit(method=model_method)
-        console.print("\nRandom intercepts & slopes results", style="blue")
+        oc_pmc.console.print("\nRandom intercepts results", style="blue")
     else:
-        raise ValueError(f"Not valid {model_kind=}")
+        oc_pmc.console.print("\nRandom intercepts & slopes results", style="blue")
 
     print(result.summary())
-    # get interaction term
-    # determine interaction parameter name
-    interaction_val_name = list(
-        set(aggregated_df[comparison_category].unique()).difference(
-            [aggregated_df[comparison_category].iloc[0]]
-        )
-    )[0]
-    param_interaction = f"bin_time:{comparison_category}[T.{interaction_val_name}]"
-
+    param_interaction = interaction_param(aggregated_df, comparison_category)
     interaction_coef = result.params.loc[param_interaction]
     interaction_z = result.tvalues.loc[param_interaction]
     interaction_pvalue = result.pvalues.loc[param_interaction]
@@ -705,7 +734,7 @@ def test_mlm(config: dict):
     )
 
     if config.get("latex"):
-        console.print("\nTable in latex", style="blue")
+        oc_pmc.console.print("\nTable in latex", style="blue")
         print(result.summary().as_latex())
 
     # check assumptions
@@ -1,5 +1,6 @@
 from typing import Any, Dict, Optional
 
+import numpy as np
 import pandas as pd
 from scipy.stats import (
     kruskal,
@@ -142,7 +143,7 @@ def test_two(
         data2_sr = data2_sr.loc[overlap]
 
     # Assumptions
-    if test_type in ["rel", "ind"]:
+    if test_type in ["rel", "ind"] and verbose:
         # 1. check normality
         stat1, pval1 = normaltest(data1_sr)
         stat2, pval2 = normaltest(data2_sr)
@@ -155,7 +156,7 @@ def test_two(
         print("\nNeeds to be not significant to use t-test:")
         print(f" - Levene test: F={statistic:.3f} p={pvalue:.5f}\n")
 
-    if "levene" in test_type:
+    if "levene" in test_type and verbose:
         statistic, pvalue = levene(data1_sr, data2_sr)
         print(
             "Levene test (if significant, do not use t-test):"
@@ -179,13 +180,13 @@ def test_two(
             alternative=config.get("alternative", "two-sided"),
         )
         pvalue, statistic, df = result.pvalue, result.statistic, result.df  # type: ignore
-        print(f"Dependent t-test: {statistic:.3f}, p={pvalue:.5f}, df={df} {alt}")
-
         cohens_d = cohens_d_1d(
             {"paired": True}, data1_sr.to_numpy(), data2_sr.to_numpy()
         )
-        print(f"Cohen's d paired: {cohens_d}")
-        print(stat_latex_str(config, data1_sr, data2_sr, statistic, pvalue, df=df))
+        if verbose:
+            print(f"Dependent t-test: {statistic:.3f}, p={pvalue:.5f}, df={df} {alt}")
+            print(f"Cohen's d paired: {cohens_d}")
+            print(stat_latex_str(config, data1_sr, data2_sr, statistic, pvalue, df=df))
 
     if "ind" in test_type:
         result = ttest_ind(
@@ -246,6 +247,25 @@ def test_two(
             f" n = {data2_sr.count()}"
         )
 
+    # CI of the difference of means of independent samples
+    if (
+        verbose
+        and config.get("bootstrap_mode") == "poisson"
+        and test_type not in ["rel", "wilcoxon"]
+    ):
+        from oc_pmc.utils.bootstrap import poisson_bootstrap_difference
+
+        ci = config.get("ci", 0.95)
+        lower, upper = poisson_bootstrap_difference(
+            {"n_bootstrap": 5000, "ci": ci, **config},
+            np.concatenate((data1_sr.to_numpy(), data2_sr.to_numpy())),
+            np.repeat([0, 1], [len(data1_sr), len(data2_sr)]),
+        )
+        print(
+            f"Difference of means: {data1_sr.mean() - data2_sr.mean():.3f},"
+            f" {ci:.0%} CI [{lower:.3f}, {upper:.3f}] (Poisson bootstrap)"
+        )
+
     if not config.get("no_effect_size", False):
         if "paired" not in config:
             config["paired"] = (
@@ -3,18 +3,19 @@ import os
 from copy import deepcopy
 from numbers import Number
 from pathlib import Path
-from typing import Any, Callable, Optional, Sequence, Tuple, Union, cast
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence, Tuple, Union, cast
 
 import numpy as np
 import pandas as pd
-import plotly.graph_objects as go
 from numpy.random import Generator, default_rng
-from rich.console import Console
 
+import oc_pmc
 from oc_pmc import OUTPUTS_DIR, PLOTS_DIR, STUDYPLOTS_DIR, get_logger
 
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
 log = get_logger(__name__)
-console = Console()
 
 
 def permute_theme_words(
@@ -183,10 +184,13 @@ def config_to_descriptive_string(
 
 def save_plot(
     config: dict[str, Any],
-    fig: go.Figure,
+    fig: "go.Figure",
     path: Union[str, Path],
     verbose: bool = True,
 ):
+    # not imported on module level: `python -m oc_pmc.utils.profiling` would warn
+    from oc_pmc.utils.profiling import span
+
     if "verbose" in config.keys():
         verbose = config["verbose"]
     if STUDYPLOTS_DIR:
@@ -197,12 +201,13 @@ def save_plot(
     check_make_dirs(output_path, verbose=False)
     if "margin" in config:
         fig.update_layout(margin=config["margin"])
-    fig.write_image(
-        file=output_path,
-        width=config.get("width"),
-        height=config.get("height"),
-        scale=config.get("scale"),
-    )
+    with span("save_plot", "plot", path=str(path)):
+        fig.write_image(
+            file=output_path,
+            width=config.get("width"),
+            height=config.get("height"),
+            scale=config.get("scale"),
+        )
     if verbose:
         log.info(f"Save plot to {output_path}")
 
@@ -418,7 +423,7 @@ def add_config_columns(
 def print_config(config: dict[str, Any]):
     """Pretty print the config."""
     config_copy = deepcopy(config)
-    console.print(json.dumps(config_copy, indent=4))
+    oc_pmc.console.print(json.dumps(config_copy, indent=4))
 
 
 def zscore(
@@ -4,6 +4,8 @@ from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union, cast
 
 import pandas as pd
 
+from oc_pmc.utils import schema
+from oc_pmc.utils.profiling import span
 from oc_pmc.utils.types import Loadspec
 
 
@@ -15,6 +17,16 @@ def ensure_not_none(config_arg: Any, arg: Any, arg_name: str) -> Any:
     return arg
 
 
+def group_name_str(resolved: Dict[str, Any]) -> str:
+    """'story/condition/...' of the resolved group names, for profiling.
+    Resolved dicts list the innermost group first."""
+    return "/".join(
+        str(value)
+        for key, value in reversed(list(resolved.items()))
+        if key not in ("include", "exclude") and isinstance(value, (str, Number))
+    )
+
+
 def aggregator(
     config: Dict[str, Any],
     load_spec: Optional[Loadspec] = None,  # type: ignore
@@ -185,7 +197,14 @@ def aggregator(
                         **copy.deepcopy(config),
                         **resolved_sub_group_load_spec,
                     }
-                    group_df: pd.DataFrame = load_func(config=sub_group_load_config)
+                    with span(
+                        "aggregator.load",
+                        "aggregator",
+                        func=getattr(load_func, "__name__", str(load_func)),
+                        group=group_name_str(resolved_sub_group_load_spec),
+                    ) as load_span:
+                        group_df: pd.DataFrame = load_func(config=sub_group_load_config)
+                        load_span.add(rows=len(group_df))
                     # add resolved group_categories as columns
 
                     if not no_extra_columns:
@@ -202,7 +221,16 @@ def aggregator(
                             # if the loaded data has the selector as a column, skip this
                             if sub_group_category in group_df.columns:
                                 continue
-                            group_df.insert(0, sub_group_category, sub_group_name)
+                            if schema.is_compact(sub_group_load_config):
+                                group_df.insert(
+                                    0,
+                                    sub_group_category,
+                                    schema.categorical(
+                                        [sub_group_name] * len(group_df)
+                                    ),
+                                )
+                            else:
+                                group_df.insert(0, sub_group_category, sub_group_name)
 
                     # keep track of columns over which was aggregated
                     for (
@@ -223,14 +251,24 @@ def aggregator(
                         group_df.index.rename("participantID", inplace=True)
                     data_dfs.append(group_df)
 
-                data_df = pd.concat(data_dfs, axis=0)
+                data_df = schema.concat(data_dfs, axis=0)
+                # only keep the concatenated frame alive during call_func
+                del data_dfs, group_df
 
                 # call call_func
                 group_call_config = {**copy.deepcopy(config), **resolved_group}
                 group_call_config["aggregate_over"] = sub_group_categories
                 group_call_config["aggregate_on"] = aggregate_on
                 group_call_config["iteration"] = iteration[0]
-                result = call_func(config=group_call_config, data_df=data_df)
+                with span(
+                    "aggregator.call",
+                    "aggregator",
+                    func=getattr(call_func, "__name__", str(call_func)),
+                    group=group_name_str(resolved_group),
+                ) as call_span:
+                    call_span.add(rows=len(data_df))
+                    result = call_func(config=group_call_config, data_df=data_df)
+                del data_df
                 results.append((group_call_config, result))
                 iteration[0] += 1
 
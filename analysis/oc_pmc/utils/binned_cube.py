@@ -0,0 +1,331 @@
+"""Participant x time bin aggregates of word level data.
+
+The time course analyses (`func_plot_by_time`, `func_difference_bin_means` and
+`test_mlm`) bin rows by time, aggregate within participant and bin and continue
+with one value per participant and bin. A `BinnedCube` holds these aggregates as
+dense arrays: one row per unit (a participant within a group, e.g. a condition
+and position), one column per bin, with the sums, counts and sums of squares of
+every measure and the number of rows in each cell.
+
+Rows are binned like `pd.cut(x, bins=edges)` (bins are closed on the right, rows
+outside the edges are dropped) with `np.searchsorted`, and aggregated with one
+`np.bincount` per array. `binned_cube` caches the cubes of the last frames it was
+called with, so analyses on the same data and bins share one cube.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from oc_pmc.utils.grouped_stats import grouped_sum
+from oc_pmc.utils.profiling import span
+
+CACHE_SIZE = 8
+_cubes: "OrderedDict[Tuple, BinnedCube]" = OrderedDict()
+
+
+def bin_edges(
+    x: Sequence,
+    step: int,
+    min_x: Optional[int] = None,
+    max_x: Optional[int] = None,
+    shift: int = 0,
+) -> np.ndarray:
+    """Edges of bins of width step covering x: from the multiple of step below
+    min(x) up to past max(x) (plus shift)."""
+    if min_x is None:
+        min_x = (np.nanmin(x) // step) * step
+    if max_x is None:
+        # accomodate largest value                    | shift | don't remember
+        max_x = int(np.ceil(np.nanmax(x) / step)) * step + shift + step - 1
+    return np.arange(min_x, max_x + 1, step)
+
+
+def _unique_sorted(values: pd.Series) -> pd.Index:
+    """Values of a grouping column, as groupby(..., observed=False) lists them."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return pd.Index(values.cat.categories)
+    return pd.Index(values.dropna().unique()).sort_values()
+
+
+class BinnedCube:
+    """Sums, counts and sums of squares of measures per unit and bin.
+
+    Parameters
+    ----------
+    units : pd.DataFrame
+        One row per unit with the group columns and 'participantID', sorted.
+    edges : np.ndarray
+        Bin edges, bin i holds rows with edges[i] < x <= edges[i + 1].
+    n_rows : np.ndarray
+        Rows per unit and bin, shape (n_units, n_bins).
+    sums, counts, sumsqs : Dict[str, np.ndarray]
+        Per measure: sum, number and sum of squares of the non-nan values per unit
+        and bin.
+    """
+
+    def __init__(
+        self,
+        units: pd.DataFrame,
+        edges: np.ndarray,
+        n_rows: np.ndarray,
+        sums: Dict[str, np.ndarray],
+        counts: Dict[str, np.ndarray],
+        sumsqs: Dict[str, np.ndarray],
+    ) -> None:
+        self.units = units
+        self.group_columns = [c for c in units.columns if c != "participantID"]
+        self.edges = edges
+        self.n_rows = n_rows
+        self.sums = sums
+        self.counts = counts
+        self.sumsqs = sumsqs
+
+    def __len__(self) -> int:
+        return len(self.units)
+
+    @property
+    def n_bins(self) -> int:
+        return len(self.edges) - 1
+
+    def means(self, measure: str) -> np.ndarray:
+        """Mean of measure per unit and bin, nan for cells without values."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sums[measure] / self.counts[measure]
+
+    def variances(self, measure: str) -> np.ndarray:
+        """Sample variance of measure per unit and bin, nan for fewer than 2 values."""
+        counts = self.counts[measure]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = self.sums[measure] / counts
+            variances = (self.sumsqs[measure] - counts * means**2) / (counts - 1)
+        variances[counts < 2] = np.nan
+        return np.maximum(variances, 0)
+
+    def long(self, measure: str, labels: Sequence) -> pd.DataFrame:
+        """Mean of measure per participant, group and bin as rows, for cells with
+        rows, like `data_df.groupby(["participantID", *group_columns, "bins"],
+        observed=True).agg({measure: "mean"}).reset_index()` of the binned rows."""
+        idx_units, idx_bins = np.nonzero(self.n_rows > 0)
+        long_df = self.units.iloc[idx_units].reset_index(drop=True)
+        long_df = long_df[["participantID", *self.group_columns]]
+        long_df["bins"] = pd.Categorical.from_codes(
+            idx_bins, categories=labels, ordered=True
+        )
+        long_df[measure] = self.means(measure)[idx_units, idx_bins]
+        return long_df.sort_values(
+            ["participantID", *self.group_columns, "bins"], kind="stable"
+        ).reset_index(drop=True)
+
+    def counts_by_group(
+        self,
+        columns: List[str],
+        labels: Sequence,
+        measure: Optional[str] = None,
+        units: bool = False,
+    ) -> pd.Series:
+        """Rows per group of columns and bin (values of measure, or units with rows
+        if units), over all combinations of groups and bins like
+        `data_df.groupby(columns, observed=False).count()` of the binned rows.
+
+        columns can contain 'participantID' and 'bins' (appended if missing).
+        """
+        if "bins" not in columns:
+            columns = [*columns, "bins"]
+        if units:
+            cells = (self.n_rows > 0).astype(np.int64)
+        elif measure is not None:
+            cells = self.counts[measure]
+        else:
+            cells = self.n_rows
+
+        levels = list()
+        codes = list()
+        for column in columns:
+            if column == "bins":
+                levels.append(
+                    pd.CategoricalIndex(labels, categories=labels, ordered=True)
+                )
+                codes.append(np.arange(self.n_bins)[None, :])
+            else:
+                level = _unique_sorted(self.units[column])
+                levels.append(level)
+                codes.append(level.get_indexer(self.units[column])[:, None])
+        shape = [len(level) for level in levels]
+        group_codes = np.ravel_multi_index(
+            np.broadcast_arrays(*codes),
+            shape,  # type: ignore
+        )
+        counts = np.bincount(
+            group_codes.ravel(), weights=cells.ravel(), minlength=int(np.prod(shape))
+        )
+        index = pd.MultiIndex.from_product(levels, names=columns)
+        return pd.Series(counts.astype(np.int64), index=index)
+
+
+def build_binned_cube(
+    data_df: pd.DataFrame,
+    x_column: str,
+    measures: Sequence[str],
+    group_columns: Sequence[str],
+    edges: np.ndarray,
+) -> BinnedCube:
+    """Returns the BinnedCube of data_df (indexed by participantID).
+
+    Units are all combinations of group_columns and participantID in data_df,
+    including those without rows in any bin.
+    """
+    x = data_df[x_column].to_numpy(dtype=float)
+    idx_bins = np.searchsorted(edges, x, side="left") - 1
+    in_bins = ~np.isnan(x) & (idx_bins >= 0) & (idx_bins < len(edges) - 1)
+
+    # units of all rows (also those outside the bins), like groupby
+    keys_df = pd.DataFrame(
+        {
+            **{column: data_df[column].to_numpy() for column in group_columns},
+            "participantID": data_df.index.get_level_values("participantID"),
+        }
+    )
+    keys = [*group_columns, "participantID"]
+    grouped = keys_df.groupby(keys, sort=True, observed=True)
+    idx_units_sr = grouped.ngroup()
+    in_cells = in_bins & idx_units_sr.notna().to_numpy()  # nan keys have no unit
+    idx_units = idx_units_sr.to_numpy()[in_cells].astype(np.int64)
+    units = grouped.size().index.to_frame(index=False)
+
+    n_bins = len(edges) - 1
+    n_cells = len(units) * n_bins
+    cells = idx_units * n_bins + idx_bins[in_cells]
+    shape = (len(units), n_bins)
+    sums, counts, sumsqs = dict(), dict(), dict()
+    for measure in measures:
+        values = data_df[measure].to_numpy(dtype=float)[in_cells]
+        valid = ~np.isnan(values)
+        sums[measure] = np.bincount(
+            cells[valid], weights=values[valid], minlength=n_cells
+        ).reshape(shape)
+        counts[measure] = np.bincount(cells[valid], minlength=n_cells).reshape(shape)
+        sumsqs[measure] = np.bincount(
+            cells[valid], weights=values[valid] ** 2, minlength=n_cells
+        ).reshape(shape)
+    n_rows = np.bincount(cells, minlength=n_cells).reshape(shape)
+    return BinnedCube(units, edges, n_rows, sums, counts, sumsqs)
+
+
+def binned_cube(
+    data_df: pd.DataFrame,
+    x_column: str,
+    measures: Sequence[str],
+    group_columns: Sequence[str],
+    edges: np.ndarray,
+) -> BinnedCube:
+    """build_binned_cube, cached for the last CACHE_SIZE frames and bins."""
+    columns = list(dict.fromkeys([x_column, *group_columns, *measures]))
+    with span("binned_cube", "stat", rows=len(data_df)) as s_cube:
+        row_hashes = pd.util.hash_pandas_object(data_df[columns], index=True)
+        key = (
+            hashlib.sha256(row_hashes.to_numpy().tobytes()).hexdigest(),
+            tuple(columns),
+            tuple(measures),
+            tuple(group_columns),
+            tuple(edges.tolist()),
+        )
+        if key in _cubes:
+            _cubes.move_to_end(key)
+            s_cube.add(cache_hits=1)
+            return _cubes[key]
+        s_cube.add(cache_misses=1)
+        cube = build_binned_cube(data_df, x_column, measures, group_columns, edges)
+        _cubes[key] = cube
+        if len(_cubes) > CACHE_SIZE:
+            _cubes.popitem(last=False)
+    return cube
+
+
+def group_bin_means(
+    values: np.ndarray, group_codes: np.ndarray, n_groups: int
+) -> np.ndarray:
+    """Nan-mean of the rows of values (rows x bins) per group, (n_groups x bins)."""
+    n_bins = values.shape[1]
+    valid = ~np.isnan(values)
+    cells = (group_codes[:, None] * n_bins + np.arange(n_bins))[valid]
+    sums = np.bincount(cells, weights=values[valid], minlength=n_groups * n_bins)
+    counts = np.bincount(cells, minlength=n_groups * n_bins)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (sums / counts).reshape(n_groups, n_bins)
+
+
+def resample_participant_rows_batch(
+    participant_codes: np.ndarray, group_codes: np.ndarray, n_replicates: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows of a participant x bin table for n_replicates bootstrap samples, and
+    the replicate of every row.
+
+    Within every group, as many participants as the group has rows are drawn with
+    replacement; every drawn participant contributes all its rows (of all groups),
+    like `wide_df.loc[wide_df.groupby(groups)["participantID"].sample(frac=1,
+    replace=True)]`. Uses the global numpy random state.
+    """
+    by_group = np.argsort(group_codes, kind="stable")
+    group_sizes = np.bincount(group_codes)
+    group_starts = np.cumsum(group_sizes) - group_sizes
+    sorted_groups = group_codes[by_group]
+    draws = group_starts[sorted_groups] + np.floor(
+        np.random.random_sample((n_replicates, len(group_codes)))
+        * group_sizes[sorted_groups]
+    ).astype(np.int64)
+    chosen = participant_codes[by_group[draws]].ravel()
+
+    by_participant = np.argsort(participant_codes, kind="stable")
+    participant_sizes = np.bincount(participant_codes)
+    participant_starts = np.cumsum(participant_sizes) - participant_sizes
+    lengths = participant_sizes[chosen]
+    offsets = np.repeat(
+        participant_starts[chosen] - (np.cumsum(lengths) - lengths), lengths
+    )
+    rows = by_participant[offsets + np.arange(lengths.sum())]
+    replicates = np.repeat(
+        np.arange(n_replicates), lengths.reshape(n_replicates, -1).sum(axis=1)
+    )
+    return rows, replicates
+
+
+def resample_participant_rows(
+    participant_codes: np.ndarray, group_codes: np.ndarray
+) -> np.ndarray:
+    """Rows of a participant x bin table for one bootstrap sample (see
+    resample_participant_rows_batch)."""
+    return resample_participant_rows_batch(participant_codes, group_codes, 1)[0]
+
+
+def word_offsets(
+    row_codes: np.ndarray, bin_codes: np.ndarray, n_rows: int, n_bins: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Order of the words by cell (row, bin) of a participant x bin table and the
+    offsets of the cells in it: the words of cell c = row * n_bins + bin are
+    order[offsets[c]:offsets[c + 1]]."""
+    cells = row_codes * n_bins + bin_codes
+    order = np.argsort(cells, kind="stable")
+    counts = np.bincount(cells, minlength=n_rows * n_bins)
+    return order, np.r_[0, np.cumsum(counts)].astype(np.int64)
+
+
+def resample_word_means(
+    word_values: np.ndarray, offsets: np.ndarray, cells: np.ndarray
+) -> np.ndarray:
+    """Means of words drawn with replacement within each of cells: as many words
+    as the cell has, nan for cells without words. word_values are sorted by cell,
+    cell c spans offsets[c]:offsets[c + 1]. Uses the global numpy random state.
+    """
+    starts = offsets[cells]
+    sizes = offsets[cells + 1] - starts
+    drawn_sizes = np.repeat(sizes, sizes)
+    draws = np.repeat(starts, sizes) + np.floor(
+        np.random.random_sample(len(drawn_sizes)) * drawn_sizes
+    ).astype(np.int64)
+    sums = grouped_sum(word_values[draws], np.r_[0, np.cumsum(sizes)])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / sizes
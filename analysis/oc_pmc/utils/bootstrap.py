@@ -1,13 +1,207 @@
-from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import warnings
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
-from oc_pmc import get_logger
+from oc_pmc import ADAPTIVE_BOOTSTRAP, MEMORY_BUDGET_MB, get_logger
+from oc_pmc.utils.binned_cube import (
+    group_bin_means,
+    resample_participant_rows_batch,
+    resample_word_means,
+)
+from oc_pmc.utils.grouped_stats import group_offsets
+from oc_pmc.utils.profiling import span
 
 log = get_logger(__name__)
 
+# estimates kept in memory at once: the list of estimates and its concatenation
+NAIVE_COPIES = 2
+# memory of one chunk of rows or replicates, without a memory budget
+CHUNK_MB = 64
+# replicates of adaptive bootstraps between two checks of their Monte Carlo error
+BOOTSTRAP_CHUNK = 500
+# default targets of adaptive bootstraps: standard error of the CI endpoints
+# relative to the CI width, and absolute standard error of p-values
+CI_MC_ERROR = 0.02
+PVALUE_MC_ERROR = 0.002
+# p-values further than MC_Z standard errors from alpha do not need more precision
+MC_Z = 3
+
+# returns the Monte Carlo error of estimates (rows x replicates drawn so far) and
+# whether it is small enough to stop
+Stopping = Callable[[np.ndarray], Tuple[float, bool]]
+
+
+def memory_budget(config: Dict[str, Any]) -> Optional[float]:
+    """Memory budget for bootstrap estimates in bytes: config['memory_budget_mb'],
+    MEMORY_BUDGET_MB of the .env, or None (no budget)."""
+    budget_mb = config.get("memory_budget_mb", MEMORY_BUDGET_MB)
+    if budget_mb is None:
+        return None
+    return float(budget_mb) * 2**20
+
+
+def over_memory_budget(
+    config: Dict[str, Any], bytes_per_estimate: int, n_bootstrap: int
+) -> bool:
+    """Whether collecting n_bootstrap estimates in a list would exceed the budget."""
+    budget = memory_budget(config)
+    if budget is None:
+        return False
+    over = NAIVE_COPIES * bytes_per_estimate * n_bootstrap > budget
+    if over:
+        log.info(
+            f"{n_bootstrap} estimates of {bytes_per_estimate} bytes exceed the memory"
+            f" budget of {budget / 2**20:.0f}MB, using a float32 buffer"
+        )
+    return over
+
+
+def quantile_mc_errors(estimates: np.ndarray, q: float) -> np.ndarray:
+    """Monte Carlo standard errors of the q-quantiles of the rows of estimates
+    (replicates along axis 1).
+
+    The q-quantile of n replicates is about their k-th smallest value, with k
+    binomial(n, q); its standard error is taken as half the distance between the
+    quantiles one binomial standard deviation below and above q.
+    """
+    delta = np.sqrt(q * (1 - q) / estimates.shape[1])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all nan rows
+        lower, upper = np.nanquantile(
+            estimates, [max(q - delta, 0), min(q + delta, 1)], axis=1
+        )
+    return (upper - lower) / 2
+
+
+def ci_mc_error(config: Dict[str, Any], estimates: np.ndarray) -> float:
+    """Largest Monte Carlo standard error of the CI endpoints of the rows of
+    estimates, relative to the width of their CI (nan if no row has a CI)."""
+    quant_lower = (1 - config["ci"]) / 2
+    quant_higher = config["ci"] + quant_lower
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        lowers, uppers = np.nanquantile(estimates, [quant_lower, quant_higher], axis=1)
+    errors = np.maximum(
+        quantile_mc_errors(estimates, quant_lower),
+        quantile_mc_errors(estimates, quant_higher),
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        relative = errors / (uppers - lowers)
+    relative = relative[np.isfinite(relative)]
+    return float(relative.max()) if len(relative) > 0 else np.nan
+
+
+def pvalue_mc_error(pvalue: float, n_replicates: int, two_sided: bool) -> float:
+    """Monte Carlo standard error of a permutation p-value from n_replicates
+    (the two-sided p-value is twice a binomial proportion).
+
+    The proportion is estimated as (k + 1) / (n + 2) from its k of n replicates,
+    so the error is not 0 when no (or every) replicate is as extreme as the data.
+    """
+    factor = 2 if two_sided else 1
+    n_extreme = pvalue / factor * n_replicates
+    proportion = (n_extreme + 1) / (n_replicates + 2)
+    return float(factor * np.sqrt(proportion * (1 - proportion) / n_replicates))
+
+
+def ci_stopping(config: Dict[str, Any]) -> Stopping:
+    """Stops once `ci_mc_error` is at most config['ci_mc_error'] (CI_MC_ERROR)."""
+    target = config.get("ci_mc_error", CI_MC_ERROR)
+
+    def stopping(estimates: np.ndarray) -> Tuple[float, bool]:
+        error = ci_mc_error(config, estimates)
+        return error, bool(np.isnan(error) or error <= target)
+
+    return stopping
+
+
+def pvalue_stopping(
+    config: Dict[str, Any],
+    pvalue_of: Callable[[np.ndarray], float],
+    two_sided: bool,
+) -> Stopping:
+    """Stops once the Monte Carlo error of the p-value (pvalue_of the replicates)
+    is at most config['pvalue_mc_error'] (PVALUE_MC_ERROR), or the p-value is more
+    than MC_Z errors away from config['alpha'] (else config['threshold'] or 0.05):
+    then the test decision is settled."""
+    target = config.get("pvalue_mc_error", PVALUE_MC_ERROR)
+    alpha = config.get("alpha", config.get("threshold", 0.05))
+
+    def stopping(estimates: np.ndarray) -> Tuple[float, bool]:
+        pvalue = pvalue_of(estimates)
+        error = pvalue_mc_error(pvalue, estimates.shape[1], two_sided)
+        return error, bool(error <= target or abs(pvalue - alpha) > MC_Z * error)
+
+    return stopping
+
+
+def adaptive_stopping(
+    config: Dict[str, Any], stopping: Optional[Stopping] = None
+) -> Optional[Stopping]:
+    """The stopping rule of a bootstrap: None (all n_bootstrap replicates) unless
+    config['adaptive_bootstrap'] (ADAPTIVE_BOOTSTRAP of the .env), then stopping,
+    by default `ci_stopping`."""
+    if not config.get("adaptive_bootstrap", ADAPTIVE_BOOTSTRAP):
+        return None
+    return stopping if stopping is not None else ci_stopping(config)
+
+
+def bootstrap_chunk(config: Dict[str, Any]) -> int:
+    """Replicates between two checks of an adaptive bootstrap (and its minimum)."""
+    return int(config.get("bootstrap_chunk", BOOTSTRAP_CHUNK))
+
+
+def log_mc_error(n_replicates: int, n_bootstrap: int, mc_error: float):
+    log.info(
+        f"Adaptive bootstrap: {n_replicates} of at most {n_bootstrap} replicates,"
+        f" Monte Carlo error {mc_error:.4f}"
+    )
+
+
+def collect_estimates(
+    config: Dict[str, Any],
+    n_bootstrap: int,
+    draw_estimate: Callable[[], Any],
+    progress: tqdm,
+    stopping: Optional[Stopping] = None,
+) -> np.ndarray:
+    """Returns the n_bootstrap estimates of draw_estimate stacked on axis 0.
+
+    Estimates are collected in a list and stacked, unless that would exceed the
+    memory budget: then they are written into a preallocated float32 buffer.
+    With a stopping rule (see `adaptive_stopping`), estimates are drawn in chunks
+    until it is met, and only the ones drawn are returned.
+    """
+    first = np.asarray(draw_estimate())
+    progress.update()
+    over = over_memory_budget(config, max(first.nbytes, 8), n_bootstrap)
+    if not over and stopping is None:
+        estimates = [first]
+        for _ in range(1, n_bootstrap):
+            estimates.append(draw_estimate())
+            progress.update()
+        return np.stack(estimates, axis=0)
+
+    buffer = np.empty(
+        (n_bootstrap, *first.shape), dtype=np.float32 if over else np.float64
+    )
+    buffer[0] = first
+    chunk_size = n_bootstrap if stopping is None else bootstrap_chunk(config)
+    for start in range(0, n_bootstrap, chunk_size):
+        end = min(start + chunk_size, n_bootstrap)
+        for idx in range(max(start, 1), end):
+            buffer[idx] = draw_estimate()
+            progress.update()
+        if stopping is not None:
+            mc_error, done = stopping(buffer[:end].reshape(end, -1).T)
+            if done or end == n_bootstrap:
+                log_mc_error(end, n_bootstrap, mc_error)
+                return buffer[:end]
+    return buffer
+
 
 def bootstrap_1d(
     config: Dict, sample: Union[List, np.ndarray], func: Callable
@@ -24,6 +218,9 @@ def bootstrap_1d(
                 confidence interval
             bootstrap_seed : int
                 seed for random number generator used to resample
+            adaptive_bootstrap : bool
+                stop before n_bootstrap once the CI is precise enough (see
+                `adaptive_stopping`)
     sample : List or np.ndarray
         1 dimensional sample of observations
     func : Callable
@@ -36,15 +233,21 @@ def bootstrap_1d(
     n_bootstrap = config.get("n_bootstrap", 5000)
 
     # bootstrapping
-    estimate_population = list()
-    for _ in tqdm(range(n_bootstrap), desc="bootstrapping", total=n_bootstrap):
-        resampled = rng.choice(sample, size=len(sample), replace=True)
-        estimate_population.append(func(resampled))
+    with span("bootstrap_1d", "bootstrap", n_bootstrap=n_bootstrap) as s_boot:
+        s_boot.add(rows=len(sample))
+        with tqdm(desc="bootstrapping", total=n_bootstrap) as progress:
+            estimate_population = collect_estimates(
+                config,
+                n_bootstrap,
+                lambda: func(rng.choice(sample, size=len(sample), replace=True)),
+                progress,
+                adaptive_stopping(config),
+            )
+        s_boot.add(replicates=len(estimate_population))
 
     ci = config.get("ci", 0.95)
     quant_lower = (1 - ci) / 2
     quant_higher = ci + quant_lower
-    estimate_population = np.stack(estimate_population, axis=0)
     lowers = np.quantile(estimate_population, q=quant_lower, axis=0)
     uppers = np.quantile(estimate_population, q=quant_higher, axis=0)
     return lowers, uppers
@@ -81,21 +284,22 @@ def bootstrap_2d(
 
     sorted_sample = sample[np.argsort(sample, axis=0), np.arange(sample.shape[1])]
 
-    estimate_population_ls: List = list()
-
-    for _ in tqdm(
-        range(config["n_bootstrap"]),
-        desc="bootstrapping",
-        total=config["n_bootstrap"],
-    ):
-        # resample
-        resampled = resample_2d(sorted_sample, nums_per_col, rng)
-
-        estimate_population_ls.append(np.nanmean(resampled, axis=0))
+    with span("bootstrap_2d", "bootstrap", n_bootstrap=config["n_bootstrap"]) as s_boot:
+        s_boot.add(rows=len(sample))
+        with tqdm(desc="bootstrapping", total=config["n_bootstrap"]) as progress:
+            estimate_population = collect_estimates(
+                config,
+                config["n_bootstrap"],
+                lambda: np.nanmean(
+                    resample_2d(sorted_sample, nums_per_col, rng), axis=0
+                ),
+                progress,
+                adaptive_stopping(config),
+            )
+        s_boot.add(replicates=len(estimate_population))
 
     quant_lower = (1 - config["ci"]) / 2
     quant_higher = config["ci"] + quant_lower
-    estimate_population = np.stack(estimate_population_ls, axis=0)
     lowers = np.quantile(estimate_population, q=quant_lower, axis=0)
     uppers = np.quantile(estimate_population, q=quant_higher, axis=0)
     return lowers, uppers
@@ -106,26 +310,151 @@ def bootstrap_with_groups_get_estimates(
     data_df: pd.DataFrame,
     sample_agg_func: Callable,
     aggregation_args: Optional[Dict] = None,
+    stopping: Optional[Stopping] = None,
 ) -> pd.DataFrame:
-    estimates: List[pd.DataFrame] = []
-    for _ in tqdm(
-        range(config["n_bootstrap"]),
-        desc="bootstrapping",
-        total=config["n_bootstrap"],
-        position=config.get("bootstrap_tqdm_position"),
-        leave=config.get("bootstrap_tqdm_leave", True),
-    ):
+    """Returns n_bootstrap estimates of sample_agg_func(data_df) as columns.
+
+    Estimates (Series or DataFrames) are concatenated at the end, unless keeping
+    all of them would exceed the memory budget (see `memory_budget`): then they
+    are concatenated in chunks and written into a preallocated float32 buffer.
+
+    Adaptive bootstraps (see `adaptive_stopping`) draw chunks of estimates until
+    stopping (default `ci_stopping`) is met, with n_bootstrap as the cap. Their
+    estimates carry the number of replicates and the achieved Monte Carlo error
+    in attrs['n_bootstrap'] and attrs['mc_error'].
+    """
+    n_bootstrap = config["n_bootstrap"]
+    stopping = adaptive_stopping(config, stopping)
+
+    def draw_estimate() -> Any:
         if aggregation_args is not None:
-            estimates.append(sample_agg_func(data_df, **aggregation_args))
-        else:
-            estimates.append(sample_agg_func(data_df))
+            return sample_agg_func(data_df, **aggregation_args)
+        return sample_agg_func(data_df)
 
-    if not isinstance(estimates[0], (pd.DataFrame, pd.Series)):
-        return pd.DataFrame(np.array(estimates)[None, :])
+    with (
+        span(
+            "bootstrap_with_groups",
+            "bootstrap",
+            n_bootstrap=n_bootstrap,
+            func=getattr(sample_agg_func, "__name__", str(sample_agg_func)),
+        ) as s_boot,
+        tqdm(
+            desc="bootstrapping",
+            total=n_bootstrap,
+            position=config.get("bootstrap_tqdm_position"),
+            leave=config.get("bootstrap_tqdm_leave", True),
+            disable=config.get("bootstrap_tqdm_disable", False),
+        ) as progress,
+    ):
+        s_boot.add(rows=len(data_df))
+        first = draw_estimate()
+        progress.update()
 
+        if stopping is not None:
+            draw_series = draw_estimate
+            if not isinstance(first, (pd.DataFrame, pd.Series)):
+                # scalar estimates: one row
+                first = pd.Series(np.ravel(first))
+
+                def draw_series() -> pd.Series:
+                    return pd.Series(np.ravel(draw_estimate()))
+
+            estimates_df = _chunked_estimates(
+                config, n_bootstrap, first, draw_series, progress, stopping
+            )
+            s_boot.add(
+                replicates=estimates_df.attrs["n_bootstrap"],
+                mc_error=estimates_df.attrs["mc_error"],
+            )
+            return estimates_df
+
+        if not isinstance(first, (pd.DataFrame, pd.Series)):
+            estimates = collect_estimates(
+                config, n_bootstrap - 1, draw_estimate, progress
+            )
+            return pd.DataFrame(
+                np.concatenate((np.asarray(first)[None], estimates))[None, :]
+            )
+
+        bytes_per_estimate = int(np.sum(first.memory_usage(index=True, deep=True)))
+        if over_memory_budget(config, bytes_per_estimate, n_bootstrap):
+            return _chunked_estimates(
+                config, n_bootstrap, first, draw_estimate, progress
+            )
+
+        estimates: List[Union[pd.DataFrame, pd.Series]] = [first]
+        for _ in range(1, n_bootstrap):
+            estimates.append(draw_estimate())
+            progress.update()
     return pd.concat(estimates, axis=1)
 
 
+def _chunked_estimates(
+    config: Dict[str, Any],
+    n_bootstrap: int,
+    first: Union[pd.DataFrame, pd.Series],
+    draw_estimate: Callable[[], Union[pd.DataFrame, pd.Series]],
+    progress: tqdm,
+    stopping: Optional[Stopping] = None,
+) -> pd.DataFrame:
+    """pd.concat of n_bootstrap estimates along axis 1, in chunks that fit into
+    the memory budget and written into a float32 buffer.
+
+    With a stopping rule, the buffer is float64 unless over the memory budget,
+    and estimates are drawn until the rule is met, checked about every
+    `bootstrap_chunk` estimates.
+    """
+    width = 1 if isinstance(first, pd.Series) else first.shape[1]
+    columns = [first.name] if isinstance(first, pd.Series) else list(first.columns)
+    bytes_per_estimate = int(np.sum(first.memory_usage(index=True, deep=True)))
+    budget = memory_budget(config)
+    # without a stopping rule, estimates only get here over the budget
+    over = stopping is None or over_memory_budget(
+        config, bytes_per_estimate, n_bootstrap
+    )
+    chunk_size = n_bootstrap
+    if budget is not None:
+        chunk_size = int(max(1, budget / 4 // (NAIVE_COPIES * bytes_per_estimate)))
+    if stopping is not None:
+        chunk_size = min(chunk_size, bootstrap_chunk(config))
+    next_check = bootstrap_chunk(config)
+
+    index = first.index
+    buffer = np.empty(
+        (len(index), n_bootstrap * width),
+        dtype=np.float32 if over else np.float64,
+    )
+    for start in range(0, n_bootstrap, chunk_size):
+        chunk = [first] if start == 0 else list()
+        while len(chunk) < min(chunk_size, n_bootstrap - start):
+            chunk.append(draw_estimate())
+            progress.update()
+        chunk_df = pd.concat(chunk, axis=1)
+        # groups missing in all earlier estimates: grow the buffer
+        new_index = chunk_df.index.difference(index)
+        if len(new_index) > 0:
+            index = index.append(new_index)
+            buffer = np.concatenate(
+                (buffer, np.full((len(new_index), buffer.shape[1]), np.nan, np.float32))
+            )
+        end = start + len(chunk)
+        buffer[:, start * width : end * width] = chunk_df.reindex(index).to_numpy(
+            dtype=buffer.dtype
+        )
+        if stopping is None or (end < next_check and end < n_bootstrap):
+            continue
+        next_check = end + bootstrap_chunk(config)
+        mc_error, done = stopping(buffer[:, : end * width])
+        if done or end == n_bootstrap:
+            log_mc_error(end, n_bootstrap, mc_error)
+            estimates_df = pd.DataFrame(
+                buffer[:, : end * width], index=index, columns=columns * end
+            )
+            estimates_df.attrs.update(n_bootstrap=end, mc_error=mc_error)
+            return estimates_df
+    return pd.DataFrame(buffer, index=index, columns=columns * n_bootstrap)
+
+
 def get_confidence_intervals(
     config: dict, estimates_df: pd.DataFrame
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
@@ -136,6 +465,9 @@ def get_confidence_intervals(
     uppers = np.nanquantile(estimates_df, q=quant_higher, axis=1)
     lowers_df = pd.DataFrame(lowers, index=estimates_df.index, columns=["ci_lower"])  # type: ignore
     uppers_df = pd.DataFrame(uppers, index=estimates_df.index, columns=["ci_upper"])  # type: ignore
+    # replicates and Monte Carlo error of adaptive bootstraps
+    lowers_df.attrs.update(estimates_df.attrs)
+    uppers_df.attrs.update(estimates_df.attrs)
     return lowers_df, uppers_df
 
 
@@ -149,3 +481,237 @@ def bootstrap_with_groups(
         config, data_df, sample_agg_func, aggregation_args
     )
     return get_confidence_intervals(config, estimates_df)
+
+
+def poisson_chunk_rows(config: Dict[str, Any], n_bootstrap: int) -> int:
+    """Rows per chunk of the Poisson bootstrap, such that the weights of a chunk
+    and their products with the values fit into the memory budget (or
+    CHUNK_MB)."""
+    budget = memory_budget(config) or CHUNK_MB * 2**20
+    return int(max(1, budget // (NAIVE_COPIES * 8 * n_bootstrap)))
+
+
+def array_chunks(
+    values: np.ndarray, codes: np.ndarray, chunk_rows: int
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Chunks of chunk_rows rows of values and their group codes."""
+    for start in range(0, len(values), chunk_rows):
+        yield values[start : start + chunk_rows], codes[start : start + chunk_rows]
+
+
+def group_codes(
+    data_df: pd.DataFrame, grouping_columns: List[str], index: pd.Index
+) -> np.ndarray:
+    """Position in index of the group (grouping_columns) of every row, -1 for
+    groups not in index."""
+    if len(grouping_columns) == 1:
+        keys = pd.Index(data_df[grouping_columns[0]])
+    else:
+        keys = pd.MultiIndex.from_frame(data_df[grouping_columns])
+    return index.get_indexer(keys)
+
+
+def csv_chunks(
+    path: str,
+    column: str,
+    grouping_columns: List[str],
+    index: pd.Index,
+    chunk_rows: int,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Chunks of chunk_rows rows of a CSV file: values of column and codes of
+    their group (grouping_columns) in the fixed index, see `group_codes`. The
+    index has to be known up front, as codes have to agree across chunks."""
+    for chunk_df in pd.read_csv(
+        path, usecols=[column, *grouping_columns], chunksize=chunk_rows
+    ):
+        yield (
+            chunk_df[column].to_numpy(dtype=float),
+            group_codes(chunk_df, grouping_columns, index),
+        )
+
+
+def poisson_bootstrap_sums(
+    config: Dict[str, Any],
+    chunks: Iterable[Tuple[np.ndarray, np.ndarray]],
+    n_groups: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Poisson bootstrap in one pass over chunks of rows.
+
+    Every row gets a Poisson(1) weight in each of the config['n_bootstrap']
+    replicates (instead of being drawn a multinomial number of times), so the
+    replicates only need the weighted sums and sums of weights per group, which
+    are accumulated chunk by chunk. Memory does not grow with the number of rows.
+    As all replicates advance together, adaptive stopping does not apply.
+
+    Parameters
+    ----------
+    config : Dict
+        Config dict with fields n_bootstrap and (optionally) bootstrap_seed.
+    chunks : Iterable[Tuple[np.ndarray, np.ndarray]]
+        Chunks of (values, group codes in [0, n_groups)), e.g. from `array_chunks`
+        or, to stream a file, `csv_chunks`. Rows with nan values or negative codes
+        are skipped.
+    n_groups : int
+        Number of groups.
+
+    Returns
+    -------
+    sums, weights : np.ndarray
+        Weighted sums of the values and sums of the weights, (n_groups, n_bootstrap).
+    """
+    rng = np.random.default_rng(config.get("bootstrap_seed"))
+    n_bootstrap = config["n_bootstrap"]
+    sums = np.zeros((n_groups, n_bootstrap))
+    weights_sums = np.zeros((n_groups, n_bootstrap))
+    with span("poisson_bootstrap", "bootstrap", n_bootstrap=n_bootstrap) as s_boot:
+        for values, codes in chunks:
+            values = np.asarray(values, dtype=float)
+            codes = np.asarray(codes, dtype=np.int64)
+            valid = ~np.isnan(values) & (codes >= 0)
+            if not valid.any():
+                continue
+            # weights are i.i.d., so they can be drawn for the rows sorted by group
+            order, groups, offsets = group_offsets(codes[valid])
+            values = values[valid][order]
+            weights = rng.poisson(1.0, size=(len(values), n_bootstrap))
+            weights_sums[groups] += np.add.reduceat(weights, offsets[:-1], axis=0)
+            sums[groups] += np.add.reduceat(
+                weights * values[:, None], offsets[:-1], axis=0
+            )
+            s_boot.add(rows=len(values))
+    return sums, weights_sums
+
+
+def poisson_bootstrap_means(
+    config: Dict[str, Any], values: np.ndarray, codes: np.ndarray, n_groups: int
+) -> np.ndarray:
+    """Poisson bootstrap estimates of the mean of values per group (codes),
+    (n_groups, n_bootstrap). Replicates without weight in a group are nan."""
+    chunk_rows = poisson_chunk_rows(config, config["n_bootstrap"])
+    sums, weights_sums = poisson_bootstrap_sums(
+        config, array_chunks(values, codes, chunk_rows), n_groups
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / weights_sums
+
+
+def poisson_bootstrap_with_groups(
+    config: Dict[str, Any],
+    data_df: pd.DataFrame,
+    grouping_columns: List[str],
+    column: str,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Confidence intervals of the mean of column per group of grouping_columns
+    with the Poisson bootstrap: `bootstrap_with_groups` with rows resampled within
+    groups, without materializing any resample.
+
+    The intervals are indexed like data_df.groupby(grouping_columns,
+    observed=False)[column].mean().
+    """
+    index = data_df.groupby(grouping_columns, observed=False)[column].mean().index
+    estimates = poisson_bootstrap_means(
+        config,
+        data_df[column].to_numpy(dtype=float),
+        group_codes(data_df, grouping_columns, index),
+        len(index),
+    )
+    return get_confidence_intervals(config, pd.DataFrame(estimates, index=index))
+
+
+def poisson_bootstrap_difference(
+    config: Dict[str, Any], values: np.ndarray, codes: np.ndarray
+) -> Tuple[float, float]:
+    """Confidence interval of the difference of the means of the rows with code 0
+    and the rows with code 1, with the Poisson bootstrap."""
+    estimates = poisson_bootstrap_means(config, values, codes, 2)
+    quant_lower = (1 - config["ci"]) / 2
+    quant_higher = config["ci"] + quant_lower
+    differences = estimates[0] - estimates[1]
+    return (
+        float(np.nanquantile(differences, quant_lower)),
+        float(np.nanquantile(differences, quant_higher)),
+    )
+
+
+def hierarchical_bootstrap_bin_means(
+    config: Dict[str, Any],
+    word_values: np.ndarray,
+    offsets: np.ndarray,
+    participant_codes: np.ndarray,
+    group_codes: np.ndarray,
+    n_groups: int,
+    n_bins: int,
+) -> np.ndarray:
+    """Two stage bootstrap of the mean across participants of participant bin means.
+
+    Every replicate first resamples participants within groups (with all their
+    rows, see `resample_participant_rows_batch`), then the words of every chosen
+    participant and bin. Replicates are drawn in chunks that fit into the memory
+    budget (or CHUNK_MB), with all draws of a chunk at once. Adaptive bootstraps
+    (see `adaptive_stopping`) stop after the chunk that meets `ci_stopping`.
+
+    Parameters
+    ----------
+    config : Dict
+        Config dict with field n_bootstrap.
+    word_values : np.ndarray
+        Non-nan word values, sorted by cell (row, bin) of a participant x bin table.
+    offsets : np.ndarray
+        Offsets of the cells in word_values (see binned_cube.word_offsets).
+    participant_codes, group_codes : np.ndarray
+        Participant and group of every row of the participant x bin table.
+    n_groups, n_bins : int
+        Number of groups and bins.
+
+    Returns
+    -------
+    estimates : np.ndarray
+        Bin means per group, (replicates, n_groups, n_bins).
+    """
+    n_bootstrap = config["n_bootstrap"]
+    budget = memory_budget(config) or CHUNK_MB * 2**20
+    # per replicate: the drawn words and cells (positions, values, sizes)
+    bytes_per_replicate = 4 * 8 * (len(word_values) + len(group_codes) * n_bins)
+    chunk_size = int(max(1, budget // bytes_per_replicate))
+    stopping = adaptive_stopping(config)
+    if stopping is not None:
+        chunk_size = min(chunk_size, bootstrap_chunk(config))
+    next_check = bootstrap_chunk(config)
+
+    estimates = np.empty((n_bootstrap, n_groups, n_bins))
+    with (
+        span("hierarchical_bootstrap", "bootstrap", n_bootstrap=n_bootstrap) as s_boot,
+        tqdm(
+            desc="bootstrapping",
+            total=n_bootstrap,
+            position=config.get("bootstrap_tqdm_position"),
+            leave=config.get("bootstrap_tqdm_leave", True),
+            disable=config.get("bootstrap_tqdm_disable", False),
+        ) as progress,
+    ):
+        s_boot.add(rows=len(word_values))
+        for start in range(0, n_bootstrap, chunk_size):
+            n_replicates = min(chunk_size, n_bootstrap - start)
+            # 1. participants
+            rows, replicates = resample_participant_rows_batch(
+                participant_codes, group_codes, n_replicates
+            )
+            # 2. words within the participants' bins
+            cells = (rows[:, None] * n_bins + np.arange(n_bins)).ravel()
+            means = resample_word_means(word_values, offsets, cells)
+            estimates[start : start + n_replicates] = group_bin_means(
+                means.reshape(len(rows), n_bins),
+                replicates * n_groups + group_codes[rows],
+                n_replicates * n_groups,
+            ).reshape(n_replicates, n_groups, n_bins)
+            progress.update(n_replicates)
+            end = start + n_replicates
+            if stopping is None or (end < next_check and end < n_bootstrap):
+                continue
+            next_check = end + bootstrap_chunk(config)
+            mc_error, done = stopping(estimates[:end].reshape(end, -1).T)
+            if done or end == n_bootstrap:
+                log_mc_error(end, n_bootstrap, mc_error)
+                s_boot.add(replicates=end, mc_error=mc_error)
+                return estimates[:end]
+    return estimates
@@ -0,0 +1,242 @@
+"""Content-addressed on-disk cache of model outputs (embeddings, pair scores).
+
+Values are keyed by (model name, sha256 of the input texts), so the same text is
+never passed through a model twice, across runs and functions. New values are
+buffered in memory and written as one immutable shard per `flush_size` rows (and
+on exit) into CACHE_DIR/<kind>/<model name>/:
+    <shard>.npy : values, shape (n, ...) float32
+    <shard>.keys.npy : hex digest of the input of each row
+Shards are named after the hash of their keys and are written to temporary files
+first, so concurrent processes never see a partial shard. Values are memory
+mapped when read. Once a directory holds more than `max_shards` shards, they are
+merged into one.
+
+Use `get_array_cache` to get the cache of a kind and model: it is created (and
+its shards are indexed) once per process.
+"""
+
+import atexit
+import hashlib
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from oc_pmc import CACHE_DIR, get_logger
+from oc_pmc.utils.profiling import record_cache
+
+log = get_logger(__name__)
+
+
+def text_hash(*texts: str) -> str:
+    """Returns the sha256 hex digest of the texts."""
+    sha = hashlib.sha256()
+    for text in texts:
+        sha.update(text.encode("utf-8"))
+        sha.update(b"\0")
+    return sha.hexdigest()
+
+
+def _save_atomic(path: Path, array: np.ndarray):
+    path_tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+    np.save(path_tmp, array)
+    os.replace(path_tmp, path)
+
+
+class ArrayCache:
+    """Cache of float32 arrays of one kind (e.g. "embeddings") and model."""
+
+    def __init__(
+        self,
+        kind: str,
+        model_name: str,
+        cache_dir: Optional[Union[str, Path]] = None,
+        flush_size: int = 1024,
+        max_shards: int = 32,
+    ) -> None:
+        if cache_dir is None:
+            cache_dir = CACHE_DIR
+        self.path = Path(cache_dir, kind, model_name.replace("/", "__"))
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.flush_size = flush_size
+        self.max_shards = max_shards
+        self.shards: List[np.ndarray] = list()
+        self.shard_paths: List[Path] = list()
+        # key -> (shard index, row)
+        self.index: Dict[str, Tuple[int, int]] = dict()
+        # values not yet written to a shard
+        self.pending: Dict[str, np.ndarray] = dict()
+        self.refresh()
+        if len(self.shards) > self.max_shards:
+            self.compact()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index or key in self.pending
+
+    def _load_shard(self, path_keys: Path):
+        path_values = path_keys.with_name(path_keys.name.replace(".keys.npy", ".npy"))
+        try:
+            keys = np.load(path_keys)
+            values = np.load(path_values, mmap_mode="r")
+        except FileNotFoundError:  # merged into another shard meanwhile
+            return
+        shard_idx = len(self.shards)
+        self.shards.append(values)
+        self.shard_paths.append(path_keys)
+        for row, key in enumerate(keys):
+            self.index.setdefault(key.decode("ascii"), (shard_idx, row))
+
+    def refresh(self):
+        """Indexes shards written (e.g. by other processes) since the last call."""
+        loaded = set(self.shard_paths)
+        for path_keys in sorted(self.path.glob("*.keys.npy")):
+            if path_keys not in loaded:
+                self._load_shard(path_keys)
+
+    def get(self, keys: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the cached values of keys and a mask of cached keys. Rows of
+        keys not in the cache are 0."""
+        mask = np.array([key in self for key in keys], dtype=bool)
+        item_shape: Tuple[int, ...] = ()
+        if len(self.shards) > 0:
+            item_shape = self.shards[0].shape[1:]
+        elif len(self.pending) > 0:
+            item_shape = next(iter(self.pending.values())).shape
+        values = np.zeros((len(keys), *item_shape), dtype=np.float32)
+        rows_by_shard: Dict[int, Tuple[List[int], List[int]]] = dict()
+        for idx in np.flatnonzero(mask):
+            if keys[idx] in self.pending:
+                values[idx] = self.pending[keys[idx]]
+                continue
+            shard_idx, row = self.index[keys[idx]]
+            idxs, rows = rows_by_shard.setdefault(shard_idx, (list(), list()))
+            idxs.append(idx)
+            rows.append(row)
+        for shard_idx, (idxs, rows) in rows_by_shard.items():
+            values[idxs] = self.shards[shard_idx][rows]
+        return values, mask
+
+    def put(self, keys: Sequence[str], values: np.ndarray):
+        """Adds values (one row per key), written once flush_size rows are
+        pending."""
+        values = np.asarray(values, dtype=np.float32)
+        for key, value in zip(keys, values):
+            if key not in self.index:
+                self.pending[key] = value
+        if len(self.pending) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the pending values as new shard."""
+        if len(self.pending) == 0:
+            return
+        keys = list(self.pending.keys())
+        path_keys = self._write_shard(keys, np.stack(list(self.pending.values())))
+        self.pending = dict()
+        self._load_shard(path_keys)
+        if len(self.shards) > self.max_shards:
+            self.compact()
+
+    def _write_shard(self, keys: List[str], values: np.ndarray) -> Path:
+        shard_name = text_hash(*keys)[:16]
+        path_keys = self.path / f"{shard_name}.keys.npy"
+        # values first: a shard exists once its keys exist
+        _save_atomic(self.path / f"{shard_name}.npy", values)
+        _save_atomic(path_keys, np.array([key.encode("ascii") for key in keys]))
+        return path_keys
+
+    def compact(self):
+        """Merges all indexed shards into one and deletes them."""
+        keys = list(self.index.keys())
+        item_shape = self.shards[0].shape[1:]
+        values = np.empty((len(keys), *item_shape), dtype=np.float32)
+        rows_by_shard: Dict[int, Tuple[List[int], List[int]]] = dict()
+        for idx, key in enumerate(keys):
+            shard_idx, row = self.index[key]
+            idxs, rows = rows_by_shard.setdefault(shard_idx, (list(), list()))
+            idxs.append(idx)
+            rows.append(row)
+        for shard_idx, (idxs, rows) in rows_by_shard.items():
+            values[idxs] = self.shards[shard_idx][rows]
+        path_merged = self._write_shard(keys, values)
+        log.info(
+            f"Merged {len(self.shards)} shards ({len(keys)} values) of {self.path}"
+        )
+        for path_keys in self.shard_paths:
+            if path_keys == path_merged:
+                continue
+            path_keys.unlink(missing_ok=True)
+            path_keys.with_name(path_keys.name.replace(".keys.npy", ".npy")).unlink(
+                missing_ok=True
+            )
+        self.shards = list()
+        self.shard_paths = list()
+        self.index = dict()
+        self.refresh()
+
+    def compute(
+        self,
+        keys: Sequence[str],
+        inputs: Sequence[Any],
+        func: Callable[[List[Any]], np.ndarray],
+    ) -> np.ndarray:
+        """Returns values of all keys, calling func once on the inputs of all
+        keys not in the cache (each unique key once) and caching the result."""
+        if any(key not in self for key in keys):
+            self.refresh()
+        missing: Dict[str, Any] = dict()
+        for key, input_ in zip(keys, inputs):
+            if key not in self and key not in missing:
+                missing[key] = input_
+        record_cache(hits=len(keys) - len(missing), misses=len(missing))
+        if len(missing) > 0:
+            log.info(f"Computing {len(missing)} values not in cache {self.path}")
+            self.put(list(missing.keys()), func(list(missing.values())))
+        values, _ = self.get(keys)
+        return values
+
+
+@lru_cache(maxsize=None)
+def get_array_cache(
+    kind: str, model_name: str, cache_dir: Optional[str] = None
+) -> ArrayCache:
+    """Returns the (per process) ArrayCache of kind and model, its pending values
+    are written on exit."""
+    cache = ArrayCache(kind, model_name, cache_dir)
+    atexit.register(cache.flush)
+    return cache
+
+
+def cached_encode(
+    model: Any,
+    model_name: str,
+    texts: Sequence[str],
+    batch_size: int = 64,
+) -> np.ndarray:
+    """`SentenceTransformer.encode` of texts, through the embedding cache."""
+    return get_array_cache("embeddings", model_name).compute(
+        keys=[text_hash(text) for text in texts],
+        inputs=texts,
+        func=lambda missing: model.encode(
+            missing, batch_size=batch_size, convert_to_numpy=True
+        ),
+    )
+
+
+def cached_pair_scores(
+    model: Any,
+    model_name: str,
+    pairs: Sequence[Tuple[str, str]],
+    batch_size: int = 256,
+) -> np.ndarray:
+    """`CrossEncoder.predict` of (text_a, text_b) pairs, through the score cache.
+    Each pair is scored once, in batches of batch_size."""
+    return get_array_cache("pair_scores", model_name).compute(
+        keys=[text_hash(text_a, text_b) for text_a, text_b in pairs],
+        inputs=pairs,
+        func=lambda missing: model.predict(
+            missing, batch_size=batch_size, show_progress_bar=True
+        ),
+    )
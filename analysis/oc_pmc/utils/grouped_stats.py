@@ -0,0 +1,190 @@
+"""Per-group statistics computed in one pass over all groups.
+
+Rows are sorted by group once, after which every group is a contiguous slice
+described by `offsets` (group i spans `offsets[i]:offsets[i + 1]`). Sums over
+groups are computed with `np.add.reduceat`, so no python-level loop over groups
+is needed.
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def group_offsets(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the stable sort order of keys, the sorted unique keys and the
+    offsets of each group in the sorted array (length n_groups + 1)."""
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    if len(sorted_keys) == 0:
+        return order, sorted_keys, np.zeros(1, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    offsets = np.r_[starts, len(sorted_keys)].astype(np.int64)
+    return order, sorted_keys[starts], offsets
+
+
+def grouped_sum(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Sums values (sorted by group) within each group. Empty groups are 0."""
+    sums = np.zeros(len(offsets) - 1, dtype=np.float64)
+    nonempty = offsets[1:] > offsets[:-1]
+    if nonempty.any():
+        sums[nonempty] = np.add.reduceat(values, offsets[:-1][nonempty])
+    return sums
+
+
+def grouped_quantile(values: np.ndarray, offsets: np.ndarray, q: float) -> np.ndarray:
+    """Returns the q-quantile (linear interpolation, as `pd.Series.quantile`) of
+    each group. `values` have to be sorted within each group."""
+    sizes = offsets[1:] - offsets[:-1]
+    positions = q * (sizes - 1)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, np.maximum(sizes - 1, 0))
+    frac = positions - lower
+    quantiles = np.full(len(sizes), np.nan)
+    nonempty = sizes > 0
+    start = offsets[:-1][nonempty]
+    lower_vals = values[start + lower[nonempty]]
+    upper_vals = values[start + upper[nonempty]]
+    quantiles[nonempty] = lower_vals + (upper_vals - lower_vals) * frac[nonempty]
+    return quantiles
+
+
+def grouped_trim_mask(
+    groups: np.ndarray,
+    values: np.ndarray,
+    lower_trim: float,
+    upper_trim: float,
+) -> np.ndarray:
+    """Returns a bool mask keeping values strictly between the lower_trim and
+    upper_trim quantile of their group."""
+    order = np.lexsort((values, groups))
+    _, _, offsets = group_offsets(groups[order])
+    sizes = np.diff(offsets)
+    lowers = np.repeat(grouped_quantile(values[order], offsets, lower_trim), sizes)
+    uppers = np.repeat(grouped_quantile(values[order], offsets, upper_trim), sizes)
+    mask = np.empty(len(values), dtype=bool)
+    mask[order] = (values[order] > lowers) & (values[order] < uppers)
+    return mask
+
+
+def grouped_linear_stats(
+    x: np.ndarray, y: np.ndarray, offsets: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Returns n, means, pearson correlation and least squares slope/intercept of
+    y ~ x for each group. x and y have to be sorted by group."""
+    n = np.diff(offsets).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = grouped_sum(x, offsets) / n
+        mean_y = grouped_sum(y, offsets) / n
+        sizes = np.diff(offsets)
+        dx = x - np.repeat(mean_x, sizes)
+        dy = y - np.repeat(mean_y, sizes)
+        sxx = grouped_sum(dx * dx, offsets)
+        syy = grouped_sum(dy * dy, offsets)
+        sxy = grouped_sum(dx * dy, offsets)
+        slope = sxy / sxx
+        return {
+            "n": n,
+            "mean_x": mean_x,
+            "mean_y": mean_y,
+            "r": np.clip(sxy / np.sqrt(sxx * syy), -1, 1),
+            "slope": slope,
+            "intercept": mean_y - slope * mean_x,
+        }
+
+
+def grouped_ranks(groups: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Returns the within-group rank of each value (ties get the average rank)."""
+    return (
+        pd.Series(values)
+        .groupby(groups, sort=False)
+        .rank(method="average")
+        .to_numpy(dtype=np.float64)
+    )
+
+
+def grouped_xy_stats(
+    groups: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    lower_trim: float = 0.0,
+    upper_trim: float = 1.0,
+) -> pd.DataFrame:
+    """Returns per-group correlation and regression statistics of y ~ x.
+
+    Rows with non-finite x or y are ignored. If lower_trim > 0 or upper_trim < 1,
+    only rows with y strictly between the lower_trim and upper_trim quantile of
+    their group are used, which makes correlations and slopes robust to outliers
+    in y.
+
+    Parameters
+    ----------
+    groups : np.ndarray
+        Group label per row.
+    x, y : np.ndarray
+        Values per row.
+
+    Returns
+    -------
+    pd.DataFrame
+        Sorted group labels as index and columns `n`, `mean_x`, `mean_y`,
+        `pearson`, `spearman`, `slope`, `intercept` and `resid_std`.
+        Groups without any row left after trimming are NaN with n = 0.
+    """
+    groups = np.asarray(groups)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(x) & np.isfinite(y)
+    all_groups = np.unique(groups)
+    groups, x, y = groups[finite], x[finite], y[finite]
+
+    if lower_trim > 0 or upper_trim < 1:
+        keep = grouped_trim_mask(groups, y, lower_trim, upper_trim)
+        groups, x, y = groups[keep], x[keep], y[keep]
+
+    order, group_keys, offsets = group_offsets(groups)
+    groups, x, y = groups[order], x[order], y[order]
+
+    stats = grouped_linear_stats(x, y, offsets)
+    rank_stats = grouped_linear_stats(
+        grouped_ranks(groups, x), grouped_ranks(groups, y), offsets
+    )
+    sizes = np.diff(offsets)
+    residuals = y - (
+        np.repeat(stats["intercept"], sizes) + np.repeat(stats["slope"], sizes) * x
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        resid_std = np.sqrt(grouped_sum(residuals**2, offsets) / (stats["n"] - 2))
+
+    stats_df = pd.DataFrame(
+        {
+            "n": stats["n"].astype(np.int64),
+            "mean_x": stats["mean_x"],
+            "mean_y": stats["mean_y"],
+            "pearson": stats["r"],
+            "spearman": rank_stats["r"],
+            "slope": stats["slope"],
+            "intercept": stats["intercept"],
+            "resid_std": resid_std,
+        },
+        index=group_keys,
+    )
+    stats_df = stats_df.reindex(all_groups)
+    stats_df["n"] = stats_df["n"].fillna(0).astype(np.int64)
+    return stats_df
+
+
+def grouped_residuals(
+    groups: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    stats_df: pd.DataFrame,
+) -> np.ndarray:
+    """Returns y minus the per-group linear prediction from `grouped_xy_stats`,
+    in the original row order."""
+    intercept = stats_df["intercept"].reindex(groups).to_numpy(dtype=np.float64)
+    slope = stats_df["slope"].reindex(groups).to_numpy(dtype=np.float64)
+    return np.asarray(y, dtype=np.float64) - (
+        intercept + slope * np.asarray(x, dtype=np.float64)
+    )
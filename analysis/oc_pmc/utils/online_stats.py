@@ -0,0 +1,318 @@
+"""Streaming accumulators of word level measures per participant and time bin.
+
+An `OnlineCurve` holds, for one measure of one condition, Welford accumulators
+(count, mean and sum of squared deviations, from which sums and variances
+follow) of
+
+- every participant in every time bin (`within`, participants x bins),
+- every participant over all their words (`participant`),
+- the participant means of every bin across participants (`bins`).
+
+Participants are folded in and out one at a time: `update` compares the
+participants of newly loaded data with the ones already in the curve, removes the
+ones that are gone or changed and adds the new ones, without touching the others.
+The curve therefore gives the point estimates of time course plots and the
+participant means of tests for ongoing studies without recomputing them from all
+rows (bootstrap CIs still need the rows).
+
+Bins are absolute: bin k holds rows with k * step < x <= (k + 1) * step, like
+`pd.cut` with edges at multiples of step.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class Welford:
+    """Count, mean and sum of squared deviations (m2) of values, elementwise.
+
+    Accumulators of the same shape are combined with `merge` and split again with
+    `remove` (Chan et al.'s parallel update and its inverse).
+    """
+
+    def __init__(self, n: np.ndarray, mean: np.ndarray, m2: np.ndarray) -> None:
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+
+    @classmethod
+    def zeros(cls, shape: Any) -> "Welford":
+        return cls(
+            np.zeros(shape, dtype=np.int64),
+            np.zeros(shape, dtype=np.float64),
+            np.zeros(shape, dtype=np.float64),
+        )
+
+    @classmethod
+    def from_values(
+        cls, values: np.ndarray, cells: np.ndarray, n_cells: int
+    ) -> "Welford":
+        """Accumulators of the non-nan values of each of n_cells cells, with
+        two passes over values (cells holds the cell of every value)."""
+        valid = ~np.isnan(values)
+        values, cells = values[valid], cells[valid]
+        n = np.bincount(cells, minlength=n_cells)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.bincount(cells, weights=values, minlength=n_cells) / n
+        mean[n == 0] = 0
+        m2 = np.bincount(cells, weights=(values - mean[cells]) ** 2, minlength=n_cells)
+        return cls(n, mean, m2)
+
+    def merge(self, other: "Welford") -> None:
+        """Adds the values of other (in place)."""
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, self.mean + delta * other.n / n, 0)
+            m2 = np.where(
+                n > 0, self.m2 + other.m2 + delta**2 * self.n * other.n / n, 0
+            )
+        self.n, self.mean, self.m2 = n, mean, m2
+
+    def remove(self, other: "Welford") -> None:
+        """Removes the values of other, which have to be part of self (in place)."""
+        n = self.n - other.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, (self.n * self.mean - other.n * other.mean) / n, 0)
+            delta = other.mean - mean
+            m2 = np.where(
+                n > 0, self.m2 - other.m2 - delta**2 * n * other.n / self.n, 0
+            )
+        self.n, self.mean, self.m2 = n, mean, np.maximum(m2, 0)
+
+    @property
+    def sum(self) -> np.ndarray:
+        return self.n * self.mean
+
+    def means(self) -> np.ndarray:
+        """Means, nan without values."""
+        return np.where(self.n > 0, self.mean, np.nan)
+
+    def variances(self) -> np.ndarray:
+        """Sample variances, nan for fewer than 2 values."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.n > 1, self.m2 / (self.n - 1), np.nan)
+
+
+def _values_welford(values: np.ndarray) -> Welford:
+    """Accumulators (over the first axis) of the participant means in values
+    (nan where a participant has no mean)."""
+    valid = ~np.isnan(values)
+    n = valid.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(valid, values, 0).sum(axis=0) / n
+    mean = np.where(n > 0, mean, 0)
+    m2 = np.where(valid, (values - mean) ** 2, 0).sum(axis=0)
+    return Welford(n.astype(np.int64), mean, m2)
+
+
+class OnlineCurve:
+    """Welford accumulators of measure per participant and bin of width step.
+
+    Parameters
+    ----------
+    measure : str
+        Column of the loaded word data.
+    step : int
+        Width of the bins in x_column.
+    x_column : str
+        Column the rows are binned on.
+    """
+
+    def __init__(self, measure: str, step: int, x_column: str = "timestamp") -> None:
+        self.measure = measure
+        self.step = step
+        self.x_column = x_column
+        self.participants = pd.Index([], name="participantID")
+        # absolute number of the first bin
+        self.first_bin = 0
+        self.within = Welford.zeros((0, 0))
+        # rows (with or without a value of measure) per participant and bin
+        self.rows = np.zeros((0, 0), dtype=np.int64)
+        self.participant = Welford.zeros(0)
+        self.bins = Welford.zeros(0)
+        # per participant: (n rows, sum of x, sum and sum of squares of measure)
+        self.fingerprints: Dict[Any, Tuple] = dict()
+        # the sources the curve is up to date with (see load.load_online_curve)
+        self.sources: Optional[List[Tuple]] = None
+
+    def __len__(self) -> int:
+        return len(self.participants)
+
+    @property
+    def n_bins(self) -> int:
+        return self.rows.shape[1]
+
+    def _fingerprints(self, data_df: pd.DataFrame) -> Dict[Any, Tuple]:
+        values = data_df[self.measure].to_numpy(dtype=float)
+        summary_df = pd.DataFrame(
+            {
+                "n": 1,
+                "x": data_df[self.x_column].to_numpy(dtype=float),
+                "sum": values,
+                "sumsq": values**2,
+            },
+            index=data_df.index.get_level_values("participantID"),
+        )
+        # (nans are skipped, so that fingerprints compare equal)
+        summary_df = summary_df.groupby(level=0, sort=False).sum()
+        return dict(zip(summary_df.index, map(tuple, summary_df.to_numpy().tolist())))
+
+    def _resize_bins(self, first_bin: int, last_bin: int):
+        """Pads the bins to cover first_bin to last_bin (absolute)."""
+        if self.n_bins == 0:
+            self.first_bin = first_bin
+        first_bin = min(first_bin, self.first_bin)
+        last_bin = max(last_bin, self.first_bin + self.n_bins - 1)
+        before = self.first_bin - first_bin
+        after = last_bin - (self.first_bin + self.n_bins - 1)
+        if before == 0 and after == 0:
+            return
+        pad = ((0, 0), (before, after))
+        self.rows = np.pad(self.rows, pad)
+        self.within = Welford(
+            np.pad(self.within.n, pad),
+            np.pad(self.within.mean, pad),
+            np.pad(self.within.m2, pad),
+        )
+        self.bins = Welford(
+            np.pad(self.bins.n, pad[1]),
+            np.pad(self.bins.mean, pad[1]),
+            np.pad(self.bins.m2, pad[1]),
+        )
+        self.first_bin = first_bin
+
+    def _select(self, keep: np.ndarray):
+        self.participants = self.participants[keep]
+        self.rows = self.rows[keep]
+        self.within = Welford(
+            self.within.n[keep], self.within.mean[keep], self.within.m2[keep]
+        )
+        self.participant = Welford(
+            self.participant.n[keep],
+            self.participant.mean[keep],
+            self.participant.m2[keep],
+        )
+
+    def remove_participants(self, participant_ids: List[Any]):
+        """Removes participant_ids from all accumulators."""
+        remove = self.participants.isin(participant_ids)
+        if not remove.any():
+            return
+        self.bins.remove(_values_welford(self.within.means()[remove]))
+        self._select(~remove)
+        for participant_id in participant_ids:
+            self.fingerprints.pop(participant_id, None)
+
+    def add_participants(self, data_df: pd.DataFrame):
+        """Adds the rows of data_df (indexed by participantID) of participants not
+        in the curve yet."""
+        participant_ids = data_df.index.get_level_values("participantID")
+        codes, new_participants = pd.factorize(participant_ids)
+        if len(new_participants) == 0:
+            return
+        if self.participants.isin(new_participants).any():
+            raise ValueError("Participants are already part of the curve.")
+
+        x = data_df[self.x_column].to_numpy(dtype=float)
+        values = data_df[self.measure].to_numpy(dtype=float)
+        # right closed bins, like pd.cut
+        abs_bins = np.ceil(x / self.step) - 1
+        in_bins = ~np.isnan(abs_bins)
+        if in_bins.any():
+            self._resize_bins(
+                int(abs_bins[in_bins].min()), int(abs_bins[in_bins].max())
+            )
+        n_bins = self.n_bins
+        n_cells = len(new_participants) * n_bins
+        cells = (
+            codes[in_bins] * n_bins
+            + abs_bins[in_bins].astype(np.int64)
+            - self.first_bin
+        )
+        within = Welford.from_values(values[in_bins], cells, n_cells)
+        shape = (len(new_participants), n_bins)
+        within = Welford(
+            within.n.reshape(shape),
+            within.mean.reshape(shape),
+            within.m2.reshape(shape),
+        )
+        rows = np.bincount(cells, minlength=n_cells).reshape(shape)
+        participant = Welford.from_values(values, codes, len(new_participants))
+
+        self.bins.merge(_values_welford(within.means()))
+        new_participants = pd.Index(new_participants, name="participantID")
+        if len(self.participants) == 0:
+            self.participants = new_participants
+        else:
+            self.participants = self.participants.append(new_participants)
+        self.rows = np.concatenate((self.rows, rows))
+        self.within = Welford(
+            np.concatenate((self.within.n, within.n)),
+            np.concatenate((self.within.mean, within.mean)),
+            np.concatenate((self.within.m2, within.m2)),
+        )
+        self.participant = Welford(
+            np.concatenate((self.participant.n, participant.n)),
+            np.concatenate((self.participant.mean, participant.mean)),
+            np.concatenate((self.participant.m2, participant.m2)),
+        )
+
+    def update(self, data_df: pd.DataFrame) -> Tuple[int, int]:
+        """Brings the curve up to date with data_df (all rows of the condition):
+        removes participants which are not in data_df or whose rows changed, and
+        adds the new ones. Returns the number of removed and added participants.
+        """
+        fingerprints = self._fingerprints(data_df)
+        removed = [
+            participant_id
+            for participant_id, fingerprint in self.fingerprints.items()
+            if fingerprints.get(participant_id) != fingerprint
+        ]
+        self.remove_participants(removed)
+        added = [
+            participant_id
+            for participant_id in fingerprints
+            if participant_id not in self.fingerprints
+        ]
+        participant_ids = data_df.index.get_level_values("participantID")
+        self.add_participants(data_df.loc[participant_ids.isin(added)])
+        for participant_id in added:
+            self.fingerprints[participant_id] = fingerprints[participant_id]
+        return len(removed), len(added)
+
+    def participant_means(self) -> pd.Series:
+        """Mean of measure per participant."""
+        return pd.Series(
+            self.participant.means(), index=self.participants, name=self.measure
+        ).sort_index()
+
+    def bin_summary(self) -> pd.DataFrame:
+        """Mean, variance and number of the participant means per bin (indexed by
+        the absolute bin)."""
+        return pd.DataFrame(
+            {
+                "mean": self.bins.means(),
+                "variance": self.bins.variances(),
+                "n_participants": self.bins.n,
+            },
+            index=pd.RangeIndex(
+                self.first_bin, self.first_bin + self.n_bins, name="bin"
+            ),
+        )
+
+    def long(self) -> pd.DataFrame:
+        """One row per participant and bin with rows: the mean of measure, the
+        number of rows ('n_rows') and the middle of the bin in x_column."""
+        idx_participants, idx_bins = np.nonzero(self.rows > 0)
+        long_df = pd.DataFrame(
+            {
+                self.x_column: (idx_bins + self.first_bin + 0.5) * self.step,
+                self.measure: self.within.means()[idx_participants, idx_bins],
+                "n_rows": self.rows[idx_participants, idx_bins],
+            },
+            index=self.participants[idx_participants],
+        )
+        return long_df
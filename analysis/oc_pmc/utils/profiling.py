@@ -0,0 +1,410 @@
+"""Opt-in timing of analyses: loaders, aggregator phases, bootstrap loops, plots.
+
+Profiling is enabled by setting PROFILE_TRACE (environment or `.env`) to a file
+path, or by calling `enable_profiling(path)`. Every span appends one JSON line
+to that trace when it ends:
+
+    {"name": "load_wordchains", "cat": "load", "id": "812-3", "parent": "812-1",
+     "pid": 812, "tid": 812, "ts": <start in us since epoch>, "wall": <s>,
+     "cpu": <s>, "rows": 48213, "cache_hits": 0, "cache_misses": 0, "args": {}}
+
+Spans nest per thread (`parent` is the enclosing span), so the trace can be
+summarized per name with self time (`print_trace_summary`) or converted to the
+Chrome trace-event format (`export_chrome_trace`) and opened in
+chrome://tracing or https://ui.perfetto.dev as a flamegraph:
+
+    python -m oc_pmc.utils.profiling trace.jsonl --chrome trace.json
+
+With memory profiling (PROFILE_MEMORY, or `enable_profiling(path, memory=True)`)
+spans additionally record, via tracemalloc, the net allocation ("mem_delta") and
+the peak allocation above the start ("mem_peak") in bytes, and the peak resident
+set size of the process at the end of the span and its increase during the span
+("rss_peak", "rss_peak_delta", bytes). tracemalloc slows down allocation heavy
+code considerably, so wall times of a memory profile are not representative.
+
+When profiling is disabled, `span` and `profiled` return immediately.
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+import pandas as pd
+
+from oc_pmc import PROFILE_MEMORY, PROFILE_TRACE, get_logger
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None  # type: ignore
+
+log = get_logger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_trace_path: Optional[str] = None
+_trace_file: Optional[Any] = None
+_trace_pid: Optional[int] = None
+_memory = False
+_span_ids = count()
+_local = threading.local()
+
+
+def enable_profiling(path: str, memory: bool = False) -> None:
+    """Appends spans to the JSONL trace at path (from now on), with memory usage
+    if memory is True."""
+    global _trace_path, _memory
+    disable_profiling()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    _trace_path = path
+    _memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable_profiling() -> None:
+    global _trace_path, _trace_file, _memory
+    if _trace_file is not None:
+        _trace_file.close()
+    if _memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _trace_path = None
+    _trace_file = None
+    _memory = False
+
+
+def profiling_enabled() -> bool:
+    return _trace_path is not None
+
+
+def trace_path() -> Optional[str]:
+    return _trace_path
+
+
+def _write(event: Dict[str, Any]) -> None:
+    global _trace_file, _trace_pid
+    # worker processes inherit the handle of their parent, reopen in append mode
+    if _trace_file is None or _trace_pid != os.getpid():
+        _trace_file = open(_trace_path, "a", buffering=1, encoding="utf-8")  # type: ignore
+        _trace_pid = os.getpid()
+    _trace_file.write(json.dumps(event, default=str) + "\n")
+
+
+def max_rss() -> Optional[int]:
+    """Peak resident set size of the process so far in bytes."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _stack() -> List["Span"]:
+    if not hasattr(_local, "stack"):
+        _local.stack = list()
+    return _local.stack
+
+
+class Span:
+    """A timed section of code, use via `span`."""
+
+    def __init__(self, name: str, category: str, args: Dict[str, Any]):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.rows: Optional[int] = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.memory = False
+
+    def add(
+        self,
+        rows: Optional[int] = None,
+        cache_hits: int = 0,
+        cache_misses: int = 0,
+        **args,
+    ) -> None:
+        """Records rows processed (summed over calls), cache lookups and args."""
+        if rows is not None:
+            self.rows = (self.rows or 0) + rows
+        self.cache_hits += cache_hits
+        self.cache_misses += cache_misses
+        self.args.update(args)
+
+    def __enter__(self) -> "Span":
+        stack = _stack()
+        self.parent = stack[-1].id if len(stack) > 0 else None
+        self.id = f"{os.getpid()}-{next(_span_ids)}"
+        self.memory = _memory and tracemalloc.is_tracing()
+        if self.memory:
+            # the tracemalloc peak is reset for every span: keep the peak reached
+            # so far in the enclosing span
+            current, peak = tracemalloc.get_traced_memory()
+            if len(stack) > 0 and stack[-1].memory:
+                stack[-1].mem_peak = max(stack[-1].mem_peak, peak)
+            tracemalloc.reset_peak()
+            self.mem_start = current
+            self.mem_peak = current
+            self.rss_start = max_rss()
+        stack.append(self)
+        self.ts = time.time_ns() // 1000
+        self.start_cpu = time.process_time()
+        self.start_wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.process_time() - self.start_cpu
+        stack = _stack()
+        stack.pop()
+        memory: Dict[str, Any] = dict()
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            self.mem_peak = max(self.mem_peak, peak)
+            if len(stack) > 0 and stack[-1].memory:
+                stack[-1].mem_peak = max(stack[-1].mem_peak, self.mem_peak)
+            rss_peak = max_rss()
+            memory = {
+                "mem_delta": current - self.mem_start,
+                "mem_peak": self.mem_peak - self.mem_start,
+                "rss_peak": rss_peak,
+                "rss_peak_delta": (
+                    rss_peak - self.rss_start
+                    if rss_peak is not None and self.rss_start is not None
+                    else None
+                ),
+            }
+        if _trace_path is None:
+            return
+        _write(
+            {
+                "name": self.name,
+                "cat": self.category,
+                "id": self.id,
+                "parent": self.parent,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                "ts": self.ts,
+                "wall": wall,
+                "cpu": cpu,
+                "rows": self.rows,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "args": self.args,
+                **memory,
+            }
+        )
+
+
+class _NullSpan:
+    def add(self, *args, **kwargs) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, category: str = "", **args) -> Any:
+    """Context manager timing its body, e.g.
+
+    with span("bootstrap", "bootstrap", n_bootstrap=5000) as s:
+        ...
+        s.add(rows=len(data_df))
+    """
+    if _trace_path is None:
+        return _NULL_SPAN
+    return Span(name, category, args)
+
+
+def profiled(name: Optional[str] = None, category: str = "") -> Callable[[F], F]:
+    """Decorator running the function in a span (named after the function).
+    The length of returned DataFrames and Series is recorded as rows."""
+
+    def decorator(func: F) -> F:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _trace_path is None:
+                return func(*args, **kwargs)
+            with Span(span_name, category, dict()) as s:
+                result = func(*args, **kwargs)
+                if isinstance(result, (pd.DataFrame, pd.Series)):
+                    s.add(rows=len(result))
+                return result
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def record_cache(hits: int = 0, misses: int = 0) -> None:
+    """Adds cache lookups to the innermost open span."""
+    if _trace_path is None:
+        return
+    stack = _stack()
+    if len(stack) > 0:
+        stack[-1].add(cache_hits=hits, cache_misses=misses)
+
+
+def load_trace(path: Optional[str] = None) -> pd.DataFrame:
+    """Returns the spans of the JSONL trace (default: the current trace)."""
+    path = path or _trace_path
+    if path is None:
+        raise ValueError("No trace: profiling is disabled and no path was given.")
+    if _trace_file is not None:
+        _trace_file.flush()
+    return pd.read_json(path, lines=True, dtype={"id": str, "parent": str})
+
+
+def summarize_trace(
+    trace_df: pd.DataFrame, by_arg: Optional[str] = None
+) -> pd.DataFrame:
+    """Per span name: calls, wall and cpu time, self time (wall time minus the
+    wall time of child spans), rows and cache lookups, and for memory profiles
+    the largest mem_peak and rss_peak_delta. Sorted by wall time.
+
+    With by_arg, spans are further split by that span argument (e.g. 'group' of
+    the aggregator spans)."""
+    child_wall = trace_df.groupby("parent")["wall"].sum()
+    trace_df = trace_df.copy()
+    trace_df["self_wall"] = trace_df["wall"] - trace_df["id"].map(child_wall).fillna(0)
+    keys = ["cat", "name"]
+    if by_arg is not None:
+        trace_df[by_arg] = [(args or {}).get(by_arg, "") for args in trace_df["args"]]
+        keys.append(by_arg)
+    aggregations = dict(
+        calls=("wall", "size"),
+        wall=("wall", "sum"),
+        self_wall=("self_wall", "sum"),
+        cpu=("cpu", "sum"),
+        rows=("rows", "sum"),
+        cache_hits=("cache_hits", "sum"),
+        cache_misses=("cache_misses", "sum"),
+    )
+    for column in ("mem_peak", "rss_peak_delta"):
+        if column in trace_df.columns:
+            aggregations[column] = (column, "max")
+    summary_df = trace_df.groupby(keys).agg(**aggregations)
+    return summary_df.sort_values("wall", ascending=False).reset_index()
+
+
+def _megabytes(value: Any) -> str:
+    return f"{value / 2**20:,.1f}MB" if pd.notna(value) else ""
+
+
+def print_trace_summary(
+    path: Optional[str] = None,
+    top: Optional[int] = 30,
+    by_arg: Optional[str] = None,
+) -> None:
+    """Prints the summary of the trace as table (see `summarize_trace`)."""
+    from rich.table import Table
+
+    from oc_pmc import console
+
+    summary_df = summarize_trace(load_trace(path), by_arg=by_arg)
+    memory = "mem_peak" in summary_df.columns
+    table = Table(title=f"Profile: {path or _trace_path}")
+    table.add_column("span", no_wrap=True)
+    columns = ["calls", "wall", "self", "cpu", "rows", "hits", "misses"]
+    if memory:
+        columns += ["mem peak", "rss +"]
+    for column in columns:
+        table.add_column(column, justify="right")
+    for _, row in summary_df.head(top).iterrows():
+        name = f"[dim]{row['cat']}[/dim] {row['name']}"
+        if by_arg is not None and row[by_arg]:
+            name = f"{name} [dim]{row[by_arg]}[/dim]"
+        cells = [
+            name,
+            str(row["calls"]),
+            f"{row['wall']:.3f}s",
+            f"{row['self_wall']:.3f}s",
+            f"{row['cpu']:.3f}s",
+            f"{int(row['rows']):,}" if row["rows"] > 0 else "",
+            str(row["cache_hits"]) if row["cache_hits"] > 0 else "",
+            str(row["cache_misses"]) if row["cache_misses"] > 0 else "",
+        ]
+        if memory:
+            cells += [_megabytes(row["mem_peak"]), _megabytes(row["rss_peak_delta"])]
+        table.add_row(*cells)
+    console.print(table)
+
+
+def export_chrome_trace(path: str, output_path: str) -> None:
+    """Converts the JSONL trace at path to the Chrome trace-event format
+    (complete events), viewable in chrome://tracing or ui.perfetto.dev."""
+    trace_df = load_trace(path)
+    events = list()
+    for record in trace_df.to_dict(orient="records"):
+        args = dict(record["args"] or {})
+        for key in (
+            "rows",
+            "cache_hits",
+            "cache_misses",
+            "mem_delta",
+            "mem_peak",
+            "rss_peak",
+            "rss_peak_delta",
+        ):
+            if pd.notna(record.get(key)) and record[key]:
+                args[key] = int(record[key])
+        args["cpu_ms"] = round(record["cpu"] * 1000, 3)
+        events.append(
+            {
+                "name": record["name"],
+                "cat": record["cat"],
+                "ph": "X",
+                "ts": int(record["ts"]),
+                "dur": round(record["wall"] * 1e6),
+                "pid": int(record["pid"]),
+                "tid": int(record["tid"]),
+                "args": args,
+            }
+        )
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f_out:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f_out, default=str)
+    log.info(f"Saved chrome trace to {output_path}")
+
+
+if PROFILE_TRACE:
+    enable_profiling(PROFILE_TRACE, memory=PROFILE_MEMORY)
+
+
+if __name__ == "__main__":
+    args = argparse.ArgumentParser()
+    args.add_argument("trace", type=str, help="JSONL trace to summarize.")
+    args.add_argument("-t", "--top", type=int, default=30, help="Rows to print.")
+    args.add_argument(
+        "-c", "--chrome", type=str, help="Also export to this Chrome trace file."
+    )
+    args.add_argument(
+        "-b",
+        "--by",
+        type=str,
+        help="Split spans by this argument, e.g. 'group' for aggregator groups.",
+    )
+    args = args.parse_args()
+
+    print_trace_summary(args.trace, top=args.top, by_arg=args.by)
+    if args.chrome is not None:
+        export_chrome_trace(args.trace, args.chrome)
@@ -0,0 +1,104 @@
+"""Persistent cache of word ratings across runs, batch sizes and word files.
+
+Ratings are stored in a SQLite database keyed by
+    (model name, hash of the prompts, normalized word)
+so that a word rated once with a model and prompt is never sent again, no matter
+which batch size or word file it was rated with. Changing any prompt changes
+the hash and thus invalidates all cached ratings for it.
+"""
+
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from oc_pmc import CACHE_DIR, get_logger
+from oc_pmc.utils import check_make_dirs
+from oc_pmc.utils.profiling import record_cache
+
+log = get_logger(__name__)
+
+# sqlite versions < 3.32 allow at most 999 variables per statement
+MAX_VARIABLES = 900
+
+
+def prompt_hash(*prompts: str) -> str:
+    """Returns the sha256 hex digest of the prompts."""
+    sha = hashlib.sha256()
+    for prompt in prompts:
+        sha.update(prompt.encode("utf-8"))
+        sha.update(b"\0")
+    return sha.hexdigest()
+
+
+def normalize_word(word: str) -> str:
+    """Lowercases and collapses whitespace."""
+    return " ".join(word.split()).lower()
+
+
+class RatingCache:
+    """Word ratings of a single model and prompt hash."""
+
+    def __init__(
+        self,
+        model_name: str,
+        prompts_hash: str,
+        path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        if path is None:
+            path = Path(CACHE_DIR, "rated_words", "ratings.sqlite")
+        check_make_dirs(path, verbose=False)
+        self.model_name = model_name
+        self.prompts_hash = prompts_hash
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS ratings ("
+            " model TEXT NOT NULL,"
+            " prompt_hash TEXT NOT NULL,"
+            " word TEXT NOT NULL,"
+            " rating INTEGER NOT NULL,"
+            " PRIMARY KEY (model, prompt_hash, word)"
+            ")"
+        )
+        self.connection.commit()
+
+    def get(self, words: Iterable[str]) -> Dict[str, int]:
+        """Returns ratings of all cached words, keyed by the given (not normalized)
+        word."""
+        words_by_norm: Dict[str, List[str]] = dict()
+        for word in words:
+            words_by_norm.setdefault(normalize_word(word), list()).append(word)
+        norm_words = list(words_by_norm.keys())
+
+        ratings: Dict[str, int] = dict()
+        for start in range(0, len(norm_words), MAX_VARIABLES):
+            chunk = norm_words[start : start + MAX_VARIABLES]
+            rows = self.connection.execute(
+                "SELECT word, rating FROM ratings"
+                " WHERE model = ? AND prompt_hash = ?"
+                f" AND word IN ({', '.join('?' * len(chunk))})",
+                (self.model_name, self.prompts_hash, *chunk),
+            )
+            for norm_word, rating in rows:
+                for word in words_by_norm[norm_word]:
+                    ratings[word] = rating
+        n_words = sum(len(words) for words in words_by_norm.values())
+        record_cache(hits=len(ratings), misses=n_words - len(ratings))
+        return ratings
+
+    def put(self, ratings: Iterable[Tuple[str, int]]):
+        """Adds (word, rating) pairs. Words already in the cache keep their
+        first rating."""
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO ratings (model, prompt_hash, word, rating)"
+            " VALUES (?, ?, ?, ?)",
+            [
+                (self.model_name, self.prompts_hash, normalize_word(word), int(rating))
+                for word, rating in ratings
+                if normalize_word(word) != ""
+            ],
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
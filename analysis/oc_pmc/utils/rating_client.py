@@ -0,0 +1,258 @@
+"""Concurrent, rate limited requests to the OpenAI responses endpoint.
+
+`create_responses` sends all inputs concurrently and returns the responses in the
+order of the inputs. Requests are limited by:
+    - max_concurrency: requests in flight at the same time
+    - rpm: requests started within any 60s window
+    - tpm: tokens used within any 60s window (estimated from the prompt length
+      until the actual usage of the response is known)
+Failed requests (connection errors, timeouts, 408/409/429/5xx) are retried with
+exponential backoff and full jitter. Setting `base_url` allows to run against a
+local server mimicking the `/responses` endpoint instead of the OpenAI API.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import openai
+from openai.types.responses import Response
+
+from oc_pmc import get_logger
+
+log = get_logger(__name__)
+
+RETRYABLE_STATUS_CODES = (408, 409, 429, 500, 502, 503, 504)
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return sum(len(text) for text in texts) // 4 + 1
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budget over a sliding window."""
+
+    def __init__(
+        self,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        window: float = 60.0,
+    ) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        # [start time, tokens] of every request within the window
+        self.entries: Deque[List[float]] = deque()
+        self.lock = asyncio.Lock()
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        while len(self.entries) > 0 and now - self.entries[0][0] >= self.window:
+            self.entries.popleft()
+
+        wait = 0.0
+        if self.rpm is not None and len(self.entries) >= self.rpm:
+            oldest_blocking = self.entries[len(self.entries) - self.rpm]
+            wait = max(wait, oldest_blocking[0] + self.window - now)
+        if self.tpm is not None and len(self.entries) > 0:
+            excess = sum(entry[1] for entry in self.entries) + tokens - self.tpm
+            for entry in self.entries:
+                if excess <= 0:
+                    break
+                excess -= entry[1]
+                wait = max(wait, entry[0] + self.window - now)
+        return wait
+
+    async def acquire(self, tokens: int) -> List[float]:
+        """Waits until the request fits into the budget and registers it.
+
+        Returns the registered entry, its token count can be corrected once the
+        actual usage is known.
+        """
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    entry = [now, float(tokens)]
+                    self.entries.append(entry)
+                    return entry
+                await asyncio.sleep(wait)
+
+
+def is_retryable(err: Exception) -> bool:
+    if isinstance(err, openai.APIConnectionError):  # includes timeouts
+        return True
+    if isinstance(err, openai.APIStatusError):
+        return err.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def backoff_delay(
+    attempt: int,
+    backoff_base: float,
+    backoff_max: float,
+    rng: random.Random,
+    err: Optional[Exception] = None,
+) -> float:
+    """Full jitter exponential backoff, at least as long as a Retry-After header."""
+    delay = rng.uniform(0, min(backoff_max, backoff_base * 2**attempt))
+    if isinstance(err, openai.APIStatusError):
+        retry_after = err.response.headers.get("retry-after")
+        try:
+            delay = max(delay, float(retry_after))  # type: ignore
+        except (TypeError, ValueError):
+            pass
+    return delay
+
+
+async def _create_response(
+    config: Dict[str, Any],
+    client: openai.AsyncOpenAI,
+    limiter: RateLimiter,
+    semaphore: asyncio.Semaphore,
+    rng: random.Random,
+    instructions: str,
+    input_text: str,
+) -> Response:
+    max_retries = config.get("max_retries", 6)
+    estimated_tokens = estimate_tokens(instructions, input_text)
+    attempt = 0
+    while True:
+        async with semaphore:
+            entry = await limiter.acquire(estimated_tokens)
+            try:
+                response = await client.responses.create(
+                    model=config["model_name"],
+                    instructions=instructions,
+                    input=input_text,
+                    store=config.get("store", False),
+                )
+            except Exception as err:
+                if not is_retryable(err) or attempt == max_retries:
+                    raise
+                delay = backoff_delay(
+                    attempt,
+                    config.get("backoff_base", 1.0),
+                    config.get("backoff_max", 60.0),
+                    rng,
+                    err,
+                )
+                log.warning(
+                    f"Request failed ({err.__class__.__name__}),"
+                    f" retry {attempt + 1}/{max_retries} in {delay:.1f}s"
+                )
+            else:
+                if response.usage is not None:
+                    entry[1] = response.usage.total_tokens
+                return response
+        # sleep outside of semaphore to let other requests proceed
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def create_responses_async(
+    config: Dict[str, Any],
+    instructions: str,
+    inputs: List[str],
+    responses: List[Optional[Response]],
+    on_response: Optional[Callable[[int, Response], None]] = None,
+) -> List[Optional[Response]]:
+    """See `create_responses`."""
+    client = openai.AsyncOpenAI(
+        api_key=config.get("api_key"),
+        base_url=config.get("base_url"),
+        max_retries=0,  # retries are handled here
+        timeout=config.get("timeout", 600.0),
+    )
+    limiter = RateLimiter(rpm=config.get("rpm"), tpm=config.get("tpm"))
+    semaphore = asyncio.Semaphore(config.get("max_concurrency", 8))
+    rng = random.Random(config.get("seed"))
+
+    async def _run(idx: int) -> None:
+        response = await _create_response(
+            config, client, limiter, semaphore, rng, instructions, inputs[idx]
+        )
+        responses[idx] = response
+        if on_response is not None:
+            on_response(idx, response)
+
+    tasks = [
+        asyncio.ensure_future(_run(idx))
+        for idx in range(len(inputs))
+        if responses[idx] is None
+    ]
+    try:
+        if len(tasks) > 0:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()  # type: ignore
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await client.close()
+    return responses
+
+
+def create_responses(
+    config: Dict[str, Any],
+    instructions: str,
+    inputs: List[str],
+    responses: Optional[List[Optional[Response]]] = None,
+    on_response: Optional[Callable[[int, Response], None]] = None,
+) -> List[Optional[Response]]:
+    """Creates one response per input, concurrently and within rate limits.
+
+    Parameters
+    ----------
+    config : Dict
+        Config dict with fields:
+            model_name : str
+                model to use
+            api_key : str, optional
+                defaults to the OPENAI_API_KEY environment variable
+            base_url : str, optional
+                alternative endpoint (e.g. a local stub server)
+            max_concurrency : int, default=8
+                maximum requests in flight
+            rpm : int, optional
+                maximum requests per minute
+            tpm : int, optional
+                maximum tokens per minute
+            max_retries : int, default=6
+                retries per request before giving up
+            backoff_base, backoff_max : float, default=1.0, 60.0
+                backoff in seconds before retry i is uniform in
+                [0, min(backoff_max, backoff_base * 2**i)]
+            store : bool, default=False
+                passed to responses.create
+            seed : int, optional
+                seed for the backoff jitter
+    instructions : str
+        Instructions, same for all requests.
+    inputs : List[str]
+        One input per request.
+    responses : List, optional
+        List with one entry per input which is filled in place as responses
+        arrive, so responses are kept if the run is interrupted. Entries which
+        are not None are not requested again.
+    on_response : Callable, optional
+        Called with (input index, response) for every response as it arrives.
+
+    Returns
+    -------
+    List
+        Responses in the order of the inputs. If a request fails permanently,
+        all pending requests are cancelled and the error is raised.
+    """
+    if responses is None:
+        responses = [None] * len(inputs)
+    if len(responses) != len(inputs):
+        raise ValueError("responses needs one entry per input.")
+    return asyncio.run(
+        create_responses_async(config, instructions, inputs, responses, on_response)
+    )
@@ -0,0 +1,140 @@
+"""Append-only JSONL journal of raw LLM responses.
+
+Every response is written as one JSON line and fsynced as soon as it arrives, so
+a crash loses at most the response being written. Journals are opened for
+appending with `open_journal`, which first cuts a truncated last line (crash
+mid-write) back to the last complete record; lines that still cannot be decoded
+are skipped with a warning when reading. Records only contain plain data:
+    ```
+    {
+        "id": "resp_...",
+        "model": "gpt-5-mini-2025-08-07",
+        "created_at": 1700000000.0,
+        "output_text": "<w>...</w>...",
+        "usage": {"input_tokens": 1, "output_tokens": 1, "total_tokens": 2},
+    }
+    ```
+"""
+
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, Union
+
+from oc_pmc import get_logger
+
+log = get_logger(__name__)
+
+
+def response_to_record(response: Any) -> Dict[str, Any]:
+    """Returns the journal record of an `openai.types.responses.Response`."""
+    usage = None
+    if response.usage is not None:
+        usage = {
+            "input_tokens": response.usage.input_tokens,
+            "output_tokens": response.usage.output_tokens,
+            "total_tokens": response.usage.total_tokens,
+        }
+    return {
+        "id": response.id,
+        "model": response.model,
+        "created_at": response.created_at,
+        "output_text": response.output_text,
+        "usage": usage,
+    }
+
+
+def repair_journal(path: Union[str, Path]) -> int:
+    """Truncates the journal after its last newline (removing the partial record
+    of a crash mid-write), returns the number of removed bytes."""
+    if not os.path.isfile(path):
+        return 0
+    with open(path, "rb+") as f_journal:
+        size = f_journal.seek(0, os.SEEK_END)
+        keep = 0
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            f_journal.seek(start)
+            idx_newline = f_journal.read(end - start).rfind(b"\n")
+            if idx_newline >= 0:
+                keep = start + idx_newline + 1
+                break
+            end = start
+        if keep == size:
+            return 0
+        f_journal.truncate(keep)
+        f_journal.flush()
+        os.fsync(f_journal.fileno())
+    log.warning(f"Removed a truncated last record of {size - keep} bytes from {path}")
+    return size - keep
+
+
+def open_journal(path: Union[str, Path]) -> IO[str]:
+    """Opens the journal for appending, after removing a truncated last record."""
+    repair_journal(path)
+    return open(path, "a", encoding="utf-8")
+
+
+def append_journal(f_journal: IO[str], record: Dict[str, Any]):
+    """Appends record to the opened journal and forces it to disk."""
+    f_journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+    f_journal.flush()
+    os.fsync(f_journal.fileno())
+
+
+def read_journal(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Streams the records of a journal. Yields nothing if it does not exist,
+    lines which are not valid JSON (e.g. truncated) are skipped with a warning."""
+    if not os.path.isfile(path):
+        return
+    with open(path, "r", encoding="utf-8") as f_journal:
+        for line_idx, line in enumerate(f_journal):
+            if line.strip() == "":
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                log.warning(f"Skipping undecodable line {line_idx} in {path}")
+
+
+def journal_from_pickle(path_pickle: Union[str, Path], path_journal: Union[str, Path]):
+    """Converts a pickled list of responses into a journal (once)."""
+    if os.path.isfile(path_journal) or not os.path.isfile(path_pickle):
+        return
+    with open(path_pickle, "rb") as f_in:
+        responses = pickle.load(f_in)
+    with open(path_journal, "a", encoding="utf-8") as f_journal:
+        for response in responses:
+            record = response_to_record(response)
+            f_journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f_journal.flush()
+        os.fsync(f_journal.fileno())
+    log.info(
+        f"Converted {len(responses)} responses from {path_pickle} to {path_journal}"
+    )
+
+
+def journal_usage(path: Union[str, Path]) -> Dict[str, int]:
+    """Returns the number of records and the summed token usage of a journal."""
+    usage = {"n_responses": 0, "input_tokens": 0, "output_tokens": 0}
+    for record in read_journal(path):
+        usage["n_responses"] += 1
+        if record["usage"] is not None:
+            usage["input_tokens"] += record["usage"]["input_tokens"]
+            usage["output_tokens"] += record["usage"]["output_tokens"]
+    return usage
+
+
+def write_journal_reasons(path_journal: Union[str, Path], path_reasons: Path) -> int:
+    """Writes all output lines in the journal to path_reasons, returns line count."""
+    n_lines = 0
+    with path_reasons.open("w") as f_reasons:
+        for record_idx, record in enumerate(read_journal(path_journal)):
+            lines = record["output_text"].split("\n")
+            if record_idx > 0:
+                f_reasons.write("\n")
+            f_reasons.write("\n".join(lines))
+            n_lines += len(lines)
+    return n_lines
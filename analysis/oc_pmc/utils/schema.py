@@ -0,0 +1,133 @@
+"""Compact dtypes of loaded frames.
+
+With `"compact": True` in a loading config, the word, rated word and thought entry
+loaders return text and grouping columns as categoricals, downcast their numeric
+columns and skip the keystroke columns (unless `"keystroke_columns": True`).
+Which dtype a column gets is looked up in the `SCHEMAS` registry, columns not in
+the schema of a loader are left as they are.
+
+Categories are sorted, so groupby results (including `observed=False`) keep the
+order and groups of the object columns. Frames with categoricals have to be
+concatenated with `concat`, pd.concat falls back to object columns if the
+categories differ.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# raw keystroke data (lists as strings), only needed for typing analyses
+KEYSTROKE_COLUMNS = ["word_key_onsets", "word_key_chars", "word_key_codes"]
+# columns added by the aggregator and combined_configs
+GROUPING_COLUMNS = ["story", "condition", "position"]
+
+WORDCHAINS_SCHEMA: Dict[str, str] = {
+    **{column: "category" for column in GROUPING_COLUMNS},
+    "word_text": "category",
+    "word_count": "int32",
+    "word_time": "int32",
+    "timestamp": "int32",
+    "timestamp_offset": "float32",
+    "word_double_press_count": "int32",
+    "story_relatedness": "float32",
+}
+
+SCHEMAS: Dict[str, Dict[str, str]] = {
+    "wordchains": WORDCHAINS_SCHEMA,
+    "rated_wordchains": WORDCHAINS_SCHEMA,
+    "thought_entries": {
+        **WORDCHAINS_SCHEMA,
+        "current_double_press_count": "float32",
+        "time_since_last_word_start": "int32",
+    },
+}
+
+
+def register_schema(name: str, dtypes: Dict[str, str]):
+    """Adds or extends the compact dtypes of the loader schema name."""
+    SCHEMAS[name] = {**SCHEMAS.get(name, dict()), **dtypes}
+
+
+def is_compact(config: Dict[str, Any]) -> bool:
+    return bool(config.get("compact", False))
+
+
+def usecols(config: Dict[str, Any]) -> Optional[Callable[[str], bool]]:
+    """usecols for pd.read_csv: skips keystroke columns in compact mode."""
+    if not is_compact(config) or config.get("keystroke_columns", False):
+        return None
+    return lambda column: column not in KEYSTROKE_COLUMNS
+
+
+def _downcast_int(column: pd.Series, dtype: str) -> pd.Series:
+    """column as integer dtype, float32 if it has nans, unchanged if it overflows."""
+    if column.isna().any():
+        return column.astype("float32")
+    info = np.iinfo(dtype)
+    if len(column) > 0 and (column.min() < info.min or column.max() > info.max):
+        return column
+    return column.astype(dtype)
+
+
+def compact(data_df: pd.DataFrame, schema: str) -> pd.DataFrame:
+    """Returns data_df with the compact dtypes of SCHEMAS[schema] (in place)."""
+    for column, dtype in SCHEMAS[schema].items():
+        if column not in data_df.columns or data_df[column].dtype == dtype:
+            continue
+        if dtype == "category":
+            data_df[column] = categorical(data_df[column])
+        elif dtype.startswith("int"):
+            data_df[column] = _downcast_int(data_df[column], dtype)
+        else:
+            data_df[column] = data_df[column].astype(dtype)
+    return data_df
+
+
+def _sorted(values: Any) -> List:
+    try:
+        return sorted(values)
+    except TypeError:  # mixed types
+        return sorted(values, key=str)
+
+
+def categorical(values: Any, categories: Optional[Sequence] = None) -> pd.Categorical:
+    """Categorical with sorted categories (object columns with nans stay valid)."""
+    if categories is None:
+        categories = _sorted(pd.unique(pd.Series(values).dropna()))
+    return pd.Categorical(values, categories=categories)
+
+
+def concat(data_dfs: List[pd.DataFrame], **kwargs) -> pd.DataFrame:
+    """pd.concat which keeps categorical columns categorical, using the sorted union
+    of their categories."""
+    categorical_columns = {
+        column
+        for data_df in data_dfs
+        for column, dtype in data_df.dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype)
+    }
+    if len(categorical_columns) == 0:
+        return pd.concat(data_dfs, **kwargs)
+
+    unions: Dict[str, List] = dict()
+    for column in categorical_columns:
+        union = pd.Index([])
+        for data_df in data_dfs:
+            if column not in data_df.columns:
+                continue
+            values = data_df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                union = union.union(values.cat.categories, sort=False)
+            else:
+                union = union.union(pd.Index(values.dropna().unique()), sort=False)
+        unions[column] = _sorted(union)
+
+    unified_dfs = list()
+    for data_df in data_dfs:
+        data_df = data_df.copy(deep=False)
+        for column, categories in unions.items():
+            if column in data_df.columns:
+                data_df[column] = categorical(data_df[column], categories)
+        unified_dfs.append(data_df)
+    return pd.concat(unified_dfs, **kwargs)
@@ -0,0 +1,262 @@
+"""Inverted index over the sentences and sections of a story.
+
+The story file is tokenized once into `\\w+` tokens. Every lowercased token maps
+to the sorted ids of the sentences it appears in (postings), and sentences map
+to their section. A word which is a single token is therefore located in all
+sentences or sections with one dictionary lookup, giving the same result as
+searching `\\b<word>\\b` (case insensitive) in every sentence or section.
+
+Terms which are not a single token ("fishing trip", "you!") are located with an
+Aho-Corasick automaton over all such terms, which scans every sentence once
+(linear in the length of the story plus the number of matches). Results are
+kept, so positioning new terms later only scans for the new terms.
+"""
+
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from oc_pmc import DATA_DIR
+
+TOKEN_RE = re.compile(r"\w+")
+LETTERS_RE = re.compile(r"[a-zA-Z]+")
+SECTION_SEPARATOR = "***"
+
+
+def _lower_chars(text: str) -> str:
+    """Lowercases every character which stays a single character, so that
+    positions in the result match positions in text."""
+    return "".join(
+        char_lower if len(char_lower := char.lower()) == 1 else char for char in text
+    )
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton finding all occurrences of many terms in one pass.
+
+    Parameters
+    ----------
+    terms : Sequence[str]
+        Terms to search for, matched exactly (lowercase them for case
+        insensitive matching).
+    """
+
+    def __init__(self, terms: Sequence[str]) -> None:
+        self.terms = list(terms)
+        # node 0 is the root
+        self.goto: List[Dict[str, int]] = [dict()]
+        self.outputs: List[List[int]] = [list()]
+        for term_id, term in enumerate(self.terms):
+            node = 0
+            for char in term:
+                if char not in self.goto[node]:
+                    self.goto.append(dict())
+                    self.outputs.append(list())
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.outputs[node].append(term_id)
+
+        # failure links: longest proper suffix which is in the trie
+        # output links: longest proper suffix which is a term
+        self.fail = [0] * len(self.goto)
+        self.output_link = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for node in queue:  # breadth first, queue grows while iterating
+            for char, child in self.goto[node].items():
+                fail = self.fail[node]
+                while fail != 0 and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[child] = self.goto[fail].get(char, 0)
+                self.output_link[child] = (
+                    self.fail[child]
+                    if len(self.outputs[self.fail[child]]) > 0
+                    else self.output_link[self.fail[child]]
+                )
+                queue.append(child)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yields (start, term id) of every occurrence of every term in text."""
+        goto, fail, outputs, output_link = (
+            self.goto,
+            self.fail,
+            self.outputs,
+            self.output_link,
+        )
+        node = 0
+        for pos, char in enumerate(text):
+            while node != 0 and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            match_node = node if len(outputs[node]) > 0 else output_link[node]
+            while match_node != 0:
+                for term_id in outputs[match_node]:
+                    yield pos + 1 - len(self.terms[term_id]), term_id
+                match_node = output_link[match_node]
+
+
+class StoryIndex:
+    """Postings of all tokens in a story, see module docstring.
+
+    Parameters
+    ----------
+    sections : List[List[str]]
+        Sentences of each section.
+    """
+
+    def __init__(self, sections: List[List[str]]) -> None:
+        self.sections = sections
+        self.sentences = [sentence for sentences in sections for sentence in sentences]
+        self.sentence_sections = np.repeat(
+            np.arange(len(sections)), [len(sentences) for sentences in sections]
+        )
+        self.section_texts = ["\n".join(sentences) for sentences in sections]
+
+        self.sentence_lengths = np.zeros(len(self.sentences), dtype=np.int64)
+        postings: Dict[str, List[int]] = dict()
+        for sentence_id, sentence in enumerate(self.sentences):
+            tokens = TOKEN_RE.findall(sentence)
+            self.sentence_lengths[sentence_id] = len(tokens)
+            for token in tokens:
+                sentence_ids = postings.setdefault(token.lower(), list())
+                # sentences are visited in order: ids are sorted
+                if len(sentence_ids) == 0 or sentence_ids[-1] != sentence_id:
+                    sentence_ids.append(sentence_id)
+        self.postings = {
+            token: np.array(sentence_ids, dtype=np.int64)
+            for token, sentence_ids in postings.items()
+        }
+        # sorted sentence ids of every term positioned so far
+        self.term_sentence_ids: Dict[str, np.ndarray] = dict()
+
+    @classmethod
+    def from_text(cls, text: str) -> "StoryIndex":
+        """Builds the index from a story text in which sections are separated by
+        lines containing only `***`. Empty lines and sections are dropped."""
+        sections: List[List[str]] = [list()]
+        for line in text.split("\n"):
+            if line.strip() == SECTION_SEPARATOR:
+                sections.append(list())
+            elif line != "":
+                sections[-1].append(line)
+        return cls([sentences for sentences in sections if len(sentences) > 0])
+
+    @property
+    def n_sentences(self) -> int:
+        return len(self.sentences)
+
+    @property
+    def n_sections(self) -> int:
+        return len(self.sections)
+
+    def lengths(self, sentences: bool = False) -> np.ndarray:
+        """Number of `\\w+` tokens in each sentence (sentences=True) or section."""
+        if sentences:
+            return self.sentence_lengths
+        return np.bincount(
+            self.sentence_sections,
+            weights=self.sentence_lengths,
+            minlength=self.n_sections,
+        ).astype(np.int64)
+
+    def _unit_ids(self, sentence_ids: np.ndarray, sentences: bool) -> np.ndarray:
+        if sentences:
+            return sentence_ids
+        return np.unique(self.sentence_sections[sentence_ids])
+
+    def _scan(self, terms: List[str]) -> Dict[str, np.ndarray]:
+        """Returns the sorted sentence ids of each term, scanning every sentence
+        once with an automaton over all terms."""
+        automaton = AhoCorasick([_lower_chars(term) for term in terms])
+        term_sentence_ids: List[List[int]] = [list() for _ in terms]
+        for sentence_id, sentence in enumerate(self.sentences):
+            # word characters, for word boundaries (as \b in regexes)
+            is_word = [False] * (len(sentence) + 2)
+            for token_match in TOKEN_RE.finditer(sentence):
+                for pos in range(token_match.start(), token_match.end()):
+                    is_word[pos + 1] = True
+            for start, term_id in automaton.iter_matches(_lower_chars(sentence)):
+                sentence_ids = term_sentence_ids[term_id]
+                if len(sentence_ids) > 0 and sentence_ids[-1] == sentence_id:
+                    continue
+                end = start + len(terms[term_id])
+                # is_word is shifted by one: is_word[pos + 1] is character pos
+                if (
+                    is_word[start] != is_word[start + 1]
+                    and is_word[end] != is_word[end + 1]
+                ):
+                    sentence_ids.append(sentence_id)
+        return {
+            term: np.array(sentence_ids, dtype=np.int64)
+            for term, sentence_ids in zip(terms, term_sentence_ids)
+        }
+
+    def match_terms(
+        self, terms: Sequence[str], sentences: bool = False
+    ) -> Dict[str, np.ndarray]:
+        """Returns the sorted ids of sentences (sentences=True) or sections in which
+        `\\b<term>\\b` occurs (case insensitive) for every non-empty term.
+
+        Single tokens are looked up in the postings, all other terms are located
+        with one automaton scan. Terms positioned before are not scanned again.
+        """
+        new_terms = [
+            term
+            for term in dict.fromkeys(terms)
+            if term != "" and term not in self.term_sentence_ids
+        ]
+        multi_token_terms: List[str] = list()
+        for term in new_terms:
+            if TOKEN_RE.fullmatch(term) is not None:
+                self.term_sentence_ids[term] = self.postings.get(
+                    term.lower(), np.zeros(0, dtype=np.int64)
+                )
+            else:
+                multi_token_terms.append(term)
+        if len(multi_token_terms) > 0:
+            self.term_sentence_ids.update(self._scan(multi_token_terms))
+
+        return {
+            term: self._unit_ids(self.term_sentence_ids[term], sentences)
+            for term in terms
+            if term != ""
+        }
+
+    def matches(self, word: str, sentences: bool = False) -> np.ndarray:
+        """Returns the sorted ids of sentences (sentences=True) or sections in which
+        `\\b<word>\\b` occurs, case insensitive."""
+        if word == "":
+            return np.zeros(0, dtype=np.int64)
+        return self.match_terms([word], sentences=sentences)[word]
+
+    def hit_vectors(self, terms: Sequence[str], sentences: bool = False) -> np.ndarray:
+        """Returns a (n_terms, n_sentences or n_sections) bool matrix of which
+        sentences or sections contain each term."""
+        n_units = self.n_sentences if sentences else self.n_sections
+        hits = np.zeros((len(terms), n_units), dtype=bool)
+        term_ids = self.match_terms(terms, sentences=sentences)
+        for idx, term in enumerate(terms):
+            if term != "":
+                hits[idx, term_ids[term]] = True
+        return hits
+
+    def section_words(self) -> List[set[str]]:
+        """Returns the set of lowercased words (runs of letters a-z) of each
+        section."""
+        section_words: List[set[str]] = [set() for _ in range(self.n_sections)]
+        for token, sentence_ids in self.postings.items():
+            letter_words = LETTERS_RE.findall(token)
+            if len(letter_words) == 0:
+                continue
+            for section_id in np.unique(self.sentence_sections[sentence_ids]):
+                section_words[section_id].update(letter_words)
+        return section_words
+
+
+@lru_cache(maxsize=None)
+def load_story_index(story: str, story_file: str = "sectioned.txt") -> StoryIndex:
+    """Returns the (cached) StoryIndex of a story file."""
+    path_story = Path(DATA_DIR, "stories", story, story_file)
+    return StoryIndex.from_text(path_story.read_text())
@@ -0,0 +1,80 @@
+"""Batched similarity of word embeddings to theme word embeddings.
+
+All rows are L2-normalized once, after which the full word x theme similarity
+matrix is a single matrix product. Similarities of a word to the theme words are
+then aggregated per row:
+    "max" : highest similarity
+    "mean" : mean similarity
+    "top<k>" : mean of the k highest similarities (e.g. "top3")
+"""
+
+import numpy as np
+
+EPS = 1e-8
+
+
+def normalize_rows(matrix: np.ndarray, center: bool = False) -> np.ndarray:
+    """Returns rows scaled to unit length (float32 embeddings stay float32). If
+    center, rows are centered first, so that dot products are correlations
+    instead of cosine similarities.
+    """
+    matrix = np.asarray(matrix)
+    matrix = matrix.astype(np.result_type(matrix.dtype, np.float32), copy=False)
+    if center:
+        matrix = matrix - matrix.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, EPS)
+
+
+def similarity_matrix(
+    embeddings_a: np.ndarray,
+    embeddings_b: np.ndarray,
+    center: bool = False,
+) -> np.ndarray:
+    """Returns the (A, B) cosine similarity (center=False) or correlation
+    (center=True) between every row of embeddings_a and embeddings_b."""
+    if embeddings_a.shape[1] != embeddings_b.shape[1]:
+        raise ValueError("Embedding dimensions must match.")
+    return normalize_rows(embeddings_a, center) @ normalize_rows(embeddings_b, center).T
+
+
+def aggregate_similarities(similarities: np.ndarray, aggregation: str) -> np.ndarray:
+    """Aggregates a (A, B) similarity matrix to one value per row."""
+    if aggregation == "max":
+        return similarities.max(axis=1)
+    if aggregation == "mean":
+        return similarities.mean(axis=1)
+    if aggregation.startswith("top"):
+        top_k = min(int(aggregation[3:]), similarities.shape[1])
+        top_similarities = np.partition(similarities, -top_k, axis=1)[:, -top_k:]
+        return top_similarities.mean(axis=1)
+    raise ValueError(f"Invalid aggregation: {aggregation}")
+
+
+def theme_similarity(
+    word_embeddings: np.ndarray,
+    theme_embeddings: np.ndarray,
+    aggregation: str = "max",
+    center: bool = False,
+) -> np.ndarray:
+    """Returns the aggregated similarity of each word to the theme words.
+
+    Parameters
+    ----------
+    word_embeddings : np.ndarray
+        (n_words, embed_dim)
+    theme_embeddings : np.ndarray
+        (n_theme_words, embed_dim)
+    aggregation : str, default="max"
+        "max", "mean" or "top<k>"
+    center : bool, default=False
+        Use correlation instead of cosine similarity.
+
+    Returns
+    -------
+    np.ndarray
+        (n_words,)
+    """
+    return aggregate_similarities(
+        similarity_matrix(word_embeddings, theme_embeddings, center), aggregation
+    )
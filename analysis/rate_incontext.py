@@ -1,6 +1,5 @@
 import argparse
 import math
-import pickle
 import re
 import signal
 from pathlib import Path
@@ -11,7 +10,16 @@ import pandas as pd
 from dotenv import dotenv_values
 from oc_pmc import DATA_DIR, OUTPUTS_DIR, get_logger
 from oc_pmc.load import load_words
-from openai import OpenAI
+from oc_pmc.utils.rating_cache import RatingCache, prompt_hash
+from oc_pmc.utils.rating_client import create_responses
+from oc_pmc.utils.response_journal import (
+    append_journal,
+    journal_from_pickle,
+    journal_usage,
+    open_journal,
+    response_to_record,
+    write_journal_reasons,
+)
 from openai.types.responses import Response
 from tqdm import tqdm
 
@@ -26,7 +34,16 @@ def rate_incontext(
     model_name: Optional[str] = None,
     batch_size: Optional[int] = None,
     path_words_to_rate: Optional[str] = None,
+    client_config: Optional[dict] = None,
+    use_cache: bool = True,
 ):
+    """Rates story relatedness of words in batches.
+
+    client_config is passed to `create_responses` (max_concurrency, rpm, tpm,
+    base_url, ...). If use_cache, words rated before with the same model and
+    prompts (with any batch size or word file) are taken from the rating cache
+    and only the remaining words are sent.
+    """
     word_regex = re.compile(r"<word>(.*)</word>")
     rating_regex = re.compile(r"<rating>(.*)</rating>")
 
@@ -51,11 +68,15 @@ def rate_incontext(
 
     # load model
     env_file = dotenv_values(".env")
-    api_key = env_file["OPENAI_API_KEY"]
-    client = OpenAI(api_key=api_key)
     if model_name is None:
         model_name = "gpt-5-mini-2025-08-07"
         log.info(f"No model name provided, using default model: {model_name}")
+    client_config = {
+        "api_key": env_file.get("OPENAI_API_KEY"),
+        **(client_config or dict()),
+        "model_name": model_name,
+        "store": True,
+    }
     if batch_size is None:
         batch_size = 300
         log.info(f"No batch size provided, using default batch size: {batch_size}")
@@ -84,21 +105,20 @@ def rate_incontext(
     model_name_str = f"{model_name}{prompt_name_str}"
     base_dir = Path(OUTPUTS_DIR, "rated_words", "incontext", model_name_str, story)
     base_dir.mkdir(parents=True, exist_ok=True)
-    path_responses_raw = base_dir / f"responses_raw{batch_size_str}.pkl"
+    path_responses_raw = base_dir / f"responses_raw{batch_size_str}.jsonl"
     path_responses_parsed = base_dir / f"ratings{batch_size_str}.csv"
     path_failed_lines = base_dir / f"failed_lines{batch_size_str}.txt"
     path_reasons = base_dir / f"reasons{batch_size_str}.txt"
 
     # if files arleady exist, load them
-    # raw responses
-    responses_raw: list[Response] = list()
-    if path_responses_raw.exists():
-        responses_raw = pickle.load(path_responses_raw.open("rb"))
-        assert isinstance(responses_raw, list)
-        assert all(isinstance(response, Response) for response in responses_raw)
+    # raw responses (convert pickles of earlier versions)
+    journal_from_pickle(
+        base_dir / f"responses_raw{batch_size_str}.pkl", path_responses_raw
+    )
+    n_responses_raw = journal_usage(path_responses_raw)["n_responses"]
+    if n_responses_raw > 0:
         log.info(
-            f"Loaded {len(responses_raw)} preexisting"
-            f" responses from {path_responses_raw}"
+            f"Found {n_responses_raw} preexisting responses in {path_responses_raw}"
         )
 
     # parsed responses
@@ -114,6 +134,19 @@ def rate_incontext(
         log.info(f"Removed {len(rated_words)} words that are already rated")
         log.info(f"Remaining {len(words)} words to rate")
 
+    # words rated before with same model and prompts
+    rating_cache = None
+    if use_cache:
+        rating_cache = RatingCache(
+            model_name, prompt_hash(instruction_prompt, input_prompt)
+        )
+        rating_cache.put(responses_parsed)
+        cached_ratings = rating_cache.get(words)
+        responses_parsed.extend(cached_ratings.items())
+        words = [word for word in words if word not in cached_ratings]
+        log.info(f"Found {len(cached_ratings)} words in rating cache")
+        log.info(f"Remaining {len(words)} words to rate")
+
     # failed lines
     failed_lines: list[str] = list()
     if path_failed_lines.exists():
@@ -130,19 +163,43 @@ def rate_incontext(
     n_words = len(words)
     n_batches = math.ceil(n_words / batch_size)
 
+    input_batches: list[str] = list()
+    for batch_idx in range(n_batches):
+        min_idx = batch_idx * batch_size
+        max_idx = min(min_idx + batch_size, n_words)
+        words_batch = "\n".join(words[min_idx:max_idx])
+        input_batches.append(input_prompt.replace("{words}", words_batch))
+
+    # responses are filled in as they arrive, in order of input_batches
+    responses_new: list[Optional[Response]] = [None] * n_batches
+    progress = tqdm(total=n_batches, desc="Processing batches")
+    f_journal = open_journal(path_responses_raw)
+
+    def _on_response(idx: int, response: Response):
+        append_journal(f_journal, response_to_record(response))
+        progress.update()
+
     try:
-        for batch_idx in tqdm(range(n_batches), desc="Processing batches"):
-            min_idx = batch_idx * batch_size
-            max_idx = min(min_idx + batch_size, n_words)
-            words_batch = "\n".join(words[min_idx:max_idx])
-            input_batch = input_prompt.replace("{words}", words_batch)
-            response = client.responses.create(
-                model=model_name,
-                instructions=instruction_prompt,
-                input=input_batch,
-                store=True,
-            )
-            responses_raw.append(response)
+        create_responses(
+            client_config,
+            instruction_prompt,
+            input_batches,
+            responses=responses_new,
+            on_response=_on_response,
+        )
+    except KeyboardInterrupt:
+        log.critical("KeyboardInterrupt, saving data.")
+    except Exception as err:
+        log.critical(err)
+    finally:
+        progress.close()
+        f_journal.close()
+        n_responses_new = 0
+        n_responses_parsed = len(responses_parsed)
+        for response in responses_new:
+            if response is None:
+                continue
+            n_responses_new += 1
             for line in response.output_text.split("\n"):
                 try:
                     word = word_regex.search(line)
@@ -161,16 +218,14 @@ def rate_incontext(
                     log.error(f"Error parsing line: {line} - {err}")
                     continue
 
-    except KeyboardInterrupt:
-        log.critical("KeyboardInterrupt, saving data.")
-    except Exception as err:
-        log.critical(err)
-    finally:
         log.info("Saving data.")
 
-        # raw responses
-        pickle.dump(responses_raw, path_responses_raw.open("wb"))
-        log.info(f"Saved {len(responses_raw)} raw responses to {path_responses_raw}")
+        if rating_cache is not None:
+            rating_cache.put(responses_parsed[n_responses_parsed:])
+            rating_cache.close()
+
+        # raw responses are journaled as they arrive
+        log.info(f"Saved {n_responses_new} raw responses to {path_responses_raw}")
 
         # parsed responses
         # make sure they are unique
@@ -196,12 +251,8 @@ def rate_incontext(
         log.info(f"Saved {len(failed_lines)} failed lines to {path_failed_lines}")
 
         # reasons
-        reasons = list()
-        for response in responses_raw:
-            reasons.extend(response.output_text.split("\n"))
-
-        path_reasons.write_text("\n".join(reasons))
-        log.info(f"Saved {len(reasons)} rating reasons to {path_reasons}")
+        n_reasons = write_journal_reasons(path_responses_raw, path_reasons)
+        log.info(f"Saved {n_reasons} rating reasons to {path_reasons}")
 
 
 if __name__ == "__main__":
@@ -229,6 +280,29 @@ if __name__ == "__main__":
         default=None,
         help="Path to file with words to rate. If none, will rate all words.",
     )
+    args.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Do not take ratings from (or add them to) the rating cache.",
+    )
+    args.add_argument(
+        "--max_concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of requests in flight.",
+    )
+    args.add_argument(
+        "--rpm", type=int, default=None, help="Maximum requests per minute."
+    )
+    args.add_argument(
+        "--tpm", type=int, default=None, help="Maximum tokens per minute."
+    )
+    args.add_argument(
+        "--base_url",
+        type=str,
+        default=None,
+        help="Alternative API endpoint, e.g. a local stub server.",
+    )
     args = args.parse_args()
     rate_incontext(
         story=args.story,
@@ -236,4 +310,11 @@ if __name__ == "__main__":
         model_name=args.model_name,
         batch_size=args.batch_size,
         path_words_to_rate=args.path_words_to_rate,
+        use_cache=not args.no_cache,
+        client_config={
+            "max_concurrency": args.max_concurrency,
+            "rpm": args.rpm,
+            "tpm": args.tpm,
+            "base_url": args.base_url,
+        },
     )
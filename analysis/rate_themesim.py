@@ -6,7 +6,6 @@ from itertools import chain
 from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type, Union
 
 import numpy as np
-import torch
 from oc_pmc import OUTPUTS_DIR, RATEDWORDS_DIR, WORDCHAINS_DIR, get_logger
 from oc_pmc.convert.exp_to_csv import loaded_ratings_to_df
 from oc_pmc.load import load_word_list_txt, load_words
@@ -14,6 +13,7 @@ from oc_pmc.model_objects.model_glove import Glove
 from oc_pmc.model_objects.model_object import ModelObject
 from oc_pmc.utils import check_make_dirs
 from oc_pmc.utils.rate_wordchains import rate_wordchains
+from oc_pmc.utils.theme_similarity import theme_similarity
 from tqdm import tqdm
 
 LOCAL_OUTPUTS_DIR = "outputs"
@@ -36,39 +36,35 @@ class Experiment(object):
         model_object: ModelObject,
     ):
         self.model_object = model_object
-        self.cos_sim = torch.nn.CosineSimilarity(dim=1)
 
-    def _compute_similarity(
+    def _compute_similarities(
         self,
         config: Dict[str, Any],
-        word: str,
-    ) -> Union[float, None]:
-        # get embedding
-        word_embedding = self.model_object.embedding(config, word)
-
-        if word_embedding is None:
-            return None
-
-        word_embedding = torch.from_numpy(word_embedding)
-
-        # compute similarity score
-        similarities = self.cos_sim(self.theme_embeddings, word_embedding)
-
-        return torch.max(similarities).item()
+        words: List[str],
+    ) -> List[Union[float, None]]:
+        """Similarity of every word to the theme words, None for missing words."""
+        # get embeddings
+        word_embeddings, word_mask = self.model_object.embeddings(config, words)
+        similarities: List[Union[float, None]] = [None] * len(words)
+        if not word_mask.any():
+            return similarities
+
+        # compute similarity scores
+        scores = theme_similarity(
+            word_embeddings[word_mask],
+            self.theme_embeddings,
+            aggregation=config.get("theme_aggregation", "max"),
+        )
+        for idx, score in zip(np.flatnonzero(word_mask), scores):
+            similarities[idx] = float(score)
+        return similarities
 
     def get_theme_embeddings(
         self,
         config: Dict[str, Any],
         theme_words: List[str],
-    ) -> torch.Tensor:
-        theme_embeddings: List[np.ndarray] = list()
-        for theme_word in theme_words:
-            theme_embedding = self.model_object.embedding(config, theme_word)
-            if theme_embedding is None:
-                raise RuntimeError(f"Theme word not in embedding file: {theme_word}")
-            theme_embeddings.append(theme_embedding)
-
-        return torch.from_numpy(np.stack(theme_embeddings))
+    ) -> np.ndarray:
+        return self.model_object.embedding_matrix(config, theme_words)
 
     def run(
         self,
@@ -89,19 +85,12 @@ class Experiment(object):
         self.theme_embeddings = self.get_theme_embeddings(config, theme_words)
 
         # ---- compute similarities
-        desc = "(theme similarity)"
-        rating_dicts: List[Dict[str, Union[float, str, None]]] = list()
-        for word in tqdm(
-            words_to_rate,
-            desc=desc,
-            total=len(words_to_rate),
-        ):
-            rating_dicts.append(
-                {
-                    "word": word,
-                    "rating": self._compute_similarity(config, word),
-                }
-            )
+        log.info(f"Computing theme similarity of {len(words_to_rate)} words")
+        similarities = self._compute_similarities(config, words_to_rate)
+        rating_dicts: List[Dict[str, Union[float, str, None]]] = [
+            {"word": word, "rating": similarity}
+            for word, similarity in zip(words_to_rate, similarities)
+        ]
 
         return rating_dicts
 
@@ -186,6 +175,7 @@ def main():
         "corrections": True,
         "theme_word_file": "theme_words_extended.txt",  # alternative: theme_words.txt
         "n_theme_words": 19,  # int : how many theme words to use
+        "theme_aggregation": "max",  # "max", "mean" or "top<k>" over theme words
         "model_class": Glove,
         "model_name": "glove",
     }
@@ -1,9 +1,10 @@
 import argparse
 import math
-import pickle
 import re
 import shutil
 import signal
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from itertools import product
 from pathlib import Path
 from typing import List, Optional, Union, cast
@@ -14,8 +15,22 @@ from dotenv import dotenv_values
 from oc_pmc import DATA_DIR, OUTPUTS_DIR, get_logger
 from oc_pmc.load import load_story_sentences, load_story_sentences_grouped, load_words
 from oc_pmc.model_objects.model_glove import Glove
+from oc_pmc.model_objects.model_object import ModelObject
+from oc_pmc.model_objects.model_sentence_transformer import SentenceTransformerModel
 from oc_pmc.utils import check_make_dirs, get_n_sections, print_config
-from openai import OpenAI
+from oc_pmc.utils.embedding_cache import cached_encode, cached_pair_scores
+from oc_pmc.utils.rating_client import create_responses
+from oc_pmc.utils.response_journal import (
+    append_journal,
+    journal_from_pickle,
+    journal_usage,
+    open_journal,
+    read_journal,
+    response_to_record,
+    write_journal_reasons,
+)
+from oc_pmc.utils.story_index import load_story_index
+from oc_pmc.utils.theme_similarity import aggregate_similarities, similarity_matrix
 from openai.types.responses import Response
 from sentence_transformers import CrossEncoder, SentenceTransformer
 from tqdm import tqdm
@@ -87,6 +102,29 @@ def correlation(tensor_a: np.ndarray, tensor_b: np.ndarray) -> np.ndarray:
     return cov_a_b / std_a_b
 
 
+def aggregate_section_scores(
+    word_sentence_scores: np.ndarray,
+    sentences: List[str],
+    section_sentences: List[List[str]],
+    section_aggregation: str,
+) -> np.ndarray:
+    """Aggregates (n_words, n_sentences) scores to (n_words, n_sections) scores,
+    with sentences of each section looked up in sentences."""
+    sentence_idx = {sentence.strip(): idx for idx, sentence in enumerate(sentences)}
+    word_section_scores = np.empty((len(word_sentence_scores), len(section_sentences)))
+    for idx_section, section_sentences_ in enumerate(section_sentences):
+        columns = [
+            sentence_idx[sentence.strip()]
+            for sentence in section_sentences_
+            if sentence.strip() != ""
+        ]
+        # shape = (n_words, n_sentences_section)
+        word_section_scores[:, idx_section] = aggregate_similarities(
+            word_sentence_scores[:, columns], section_aggregation
+        )
+    return word_section_scores
+
+
 def rate_word_position_embeddings_example(
     model_name: Optional[str] = None,
     section_aggregation: Optional[str] = None,
@@ -121,10 +159,10 @@ def rate_word_position_embeddings_example(
     # (A) Compute word-sentence similarities without section grouping
 
     # embed words
-    word_embeddings = model.encode(words)
+    word_embeddings = cached_encode(model, model_name, words)
 
     # embed sentences
-    sentence_embeddings = model.encode(sentences)
+    sentence_embeddings = cached_encode(model, model_name, sentences)
 
     # similarity
     word_sentence_similarities = correlation(word_embeddings, sentence_embeddings)
@@ -139,36 +177,16 @@ def rate_word_position_embeddings_example(
 
     # (B) Compute word-sentence similarities with section grouping
     section_sentences = load_story_sentences_grouped(story, story_file="sectioned.txt")
-
-    embedded_sections_list: List[np.ndarray] = list()
-    for section_sentences_ in section_sentences:
-        embedded_section = model.encode(section_sentences_)
-        # shape = (n_sentences, embed_dim)
-        embedded_sections_list.append(embedded_section)
-
-    # compute score for each section
-    word_section_scores = np.empty((len(words), len(embedded_sections_list)))
-    for idx_section, section_embedding in enumerate(embedded_sections_list):
-        section_word_similarities = correlation(word_embeddings, section_embedding)
-        # shape = (n_words, n_sentences)
-        if section_aggregation == "mean":
-            word_scores = np.mean(section_word_similarities, axis=1)
-        elif section_aggregation == "max":
-            word_scores = np.max(section_word_similarities, axis=1)
-        elif section_aggregation == "top3":
-            word_scores = np.mean(
-                np.sort(section_word_similarities, axis=1)[:, -3:], axis=1
-            )
-        else:
-            raise ValueError(f"Invalid section aggregation: {section_aggregation}")
-        word_section_scores[:, idx_section] = word_scores
+    word_section_scores = aggregate_section_scores(
+        word_sentence_similarities, sentences, section_sentences, section_aggregation
+    )
 
     # output section scores
     word_section_scores_df = pd.DataFrame(
         np.round(word_section_scores, 2),
         index=words,  # type: ignore
         columns=range(
-            len(embedded_sections_list),
+            len(section_sentences),
         ),
     )
 
@@ -231,11 +249,10 @@ def rate_word_position_reranker(
     model = CrossEncoder(model_name)
 
     # (A) Compute word-sentence scores without section grouping
-    word_sentence_scores = np.empty((len(words), len(sentences)))
-    for idx_word, word in enumerate(tqdm(words, desc="Computing word-sentence scores")):
-        word_sentence_pairs = list(product([word], sentences))
-        scores = model.predict(word_sentence_pairs)
-        word_sentence_scores[idx_word] = scores
+    # every (word, sentence) pair is scored exactly once (and cached on disk)
+    word_sentence_scores = cached_pair_scores(
+        model, model_name, list(product(words, sentences))
+    ).reshape(len(words), len(sentences))
 
     # shape = (n_words, n_sentences)
     word_sentence_scores_df = pd.DataFrame(
@@ -248,32 +265,9 @@ def rate_word_position_reranker(
 
     # (B) Compute word-sentence scores with section grouping
     section_sentences = load_story_sentences_grouped(story, story_file="sectioned.txt")
-
-    word_section_scores = np.empty((len(words), len(section_sentences)))
-    for idx_section, section_sentences_ in enumerate(
-        tqdm(section_sentences, desc="Computing word-section scores")
-    ):
-        # compute score for each section
-        word_sentence_scores_section = np.empty((len(words), len(section_sentences_)))
-        # shape = (n_words, n_sentences_section)
-        for idx_word, word in enumerate(words):
-            word_sentence_pairs = list(product([word], section_sentences_))
-            scores = model.predict(word_sentence_pairs)
-            word_sentence_scores_section[idx_word] = scores
-
-        # aggregate
-        if section_aggregation == "mean":
-            word_scores_section = np.mean(word_sentence_scores_section, axis=1)
-        elif section_aggregation == "max":
-            word_scores_section = np.max(word_sentence_scores_section, axis=1)
-        elif section_aggregation.startswith("top"):
-            top_n = int(section_aggregation[3:])
-            word_scores_section = np.mean(
-                np.sort(word_sentence_scores_section, axis=1)[:, -top_n:], axis=1
-            )
-        else:
-            raise ValueError(f"Invalid section aggregation: {section_aggregation}")
-        word_section_scores[:, idx_section] = word_scores_section
+    word_section_scores = aggregate_section_scores(
+        word_sentence_scores, sentences, section_sentences, section_aggregation
+    )
 
     # output section scores
     word_section_scores_df = pd.DataFrame(
@@ -302,12 +296,13 @@ def load_section_theme_words(story: str) -> List[List[str]]:
 
 def rate_word_position_themesim(
     story: str,
+    model_name: Optional[str] = None,
     section_aggregation: Optional[str] = None,
 ):
     # for config & saving
     mode = "themesim"
-    model_class = Glove
-    model_name = "glove"
+    if model_name is None:
+        model_name = "glove"
     if section_aggregation is None:
         section_aggregation = "top3"
         log.info(
@@ -329,57 +324,41 @@ def rate_word_position_themesim(
     words = list(set([word.strip() for word in load_words(corrections=True)]))
 
     # load model
-    model = model_class(config=dict())
-
-    # compute theme word embeddings
-    section_theme_word_embeddings_list = list()
-    for section_theme_words_ in section_theme_words:
-        section_theme_word_embeddings_list.append(
-            np.stack(
-                cast(
-                    List[np.ndarray],
-                    model.embeddings(config=dict(), words=section_theme_words_),
-                ),
-                axis=0,
-            )
-        )
-    # could stack them but then cannot reuse code from other functions
+    model: ModelObject
+    if model_name == "glove":
+        model = Glove(config=dict())
+    else:
+        model = SentenceTransformerModel(config={"model_name": model_name})
 
-    # embed words
-    word_embeddings_list_with_nan = model.embeddings(config=dict(), words=words)
-    word_mask = [emb is not None for emb in word_embeddings_list_with_nan]
-    word_embeddings_list = cast(
-        List[np.ndarray],
-        [emb for emb in word_embeddings_list_with_nan if emb is not None],
+    # embed theme words of all sections at once
+    section_theme_word_embeddings = model.embedding_matrix(
+        config=dict(),
+        words=[word for words_ in section_theme_words for word in words_],
     )
-    word_embeddings = np.stack(word_embeddings_list, axis=0)
+    section_offsets = np.cumsum([0] + [len(words_) for words_ in section_theme_words])
+
+    # embed words
+    word_embeddings, word_mask = model.embeddings(config=dict(), words=words)
+    word_embeddings = word_embeddings[word_mask]
 
-    word_section_scores = np.empty(
-        (len(word_embeddings_list), len(section_theme_word_embeddings_list))
+    # shape = (n_words, n_theme_words of all sections)
+    word_theme_word_similarities = similarity_matrix(
+        word_embeddings, section_theme_word_embeddings, center=True
     )
-    for idx_section, section_embeddings in enumerate(
-        section_theme_word_embeddings_list
-    ):
-        section_word_similarities = correlation(word_embeddings, section_embeddings)
-        # shape = (n_words, n_sentences)
-        if section_aggregation == "mean":
-            word_scores = np.mean(section_word_similarities, axis=1)
-        elif section_aggregation == "max":
-            word_scores = np.max(section_word_similarities, axis=1)
-        elif section_aggregation.startswith("top"):
-            top_n = int(section_aggregation[3:])
-            word_scores = np.mean(
-                np.sort(section_word_similarities, axis=1)[:, -top_n:], axis=1
-            )
-        else:
-            raise ValueError(f"Invalid section aggregation: {section_aggregation}")
-        word_section_scores[:, idx_section] = word_scores
+    word_section_scores = np.empty((len(word_embeddings), len(section_theme_words)))
+    for idx_section in range(len(section_theme_words)):
+        word_section_scores[:, idx_section] = aggregate_similarities(
+            word_theme_word_similarities[
+                :, section_offsets[idx_section] : section_offsets[idx_section + 1]
+            ],
+            section_aggregation,
+        )
 
     word_section_scores_df = pd.DataFrame(
         np.round(word_section_scores, 2),
         index=np.array(words)[word_mask],  # type: ignore
         columns=range(
-            len(section_theme_word_embeddings_list),
+            len(section_theme_words),
         ),
     )
 
@@ -396,17 +375,19 @@ def rate_word_position_themesim(
     print(f"Saved word-section scores to {output_path}")
 
 
-def parse_incontext_response(
-    response: Response,
+def parse_incontext_lines(
+    output_text: str,
     word_regex: re.Pattern,
     section_id_regex: re.Pattern,
     section_score_regex: re.Pattern,
     alt_section_score_regex: re.Pattern,
     n_sections: int,
-    rated_words_and_sections_dct: dict[str, list],
-) -> tuple[dict[str, list], list[str]]:
+) -> tuple[list[tuple[str, int, int, str]], list[str]]:
+    """Returns (word, section_id, section_score, line) of every valid line in the
+    output of one response, and the lines that could not be parsed."""
+    ratings: list[tuple[str, int, int, str]] = list()
     failed_lines: list[str] = list()
-    for line in response.output_text.split("\n"):
+    for line in output_text.split("\n"):
         if line.strip() == "":
             continue
         word = word_regex.search(line)
@@ -435,7 +416,19 @@ def parse_incontext_response(
         except Exception:
             failed_lines.append("Invalid type: " + line)
             continue
+        ratings.append((word_str, section_id_int, section_score_int, line))
+    return ratings, failed_lines
+
 
+def merge_incontext_ratings(
+    ratings: list[tuple[str, int, int, str]],
+    n_sections: int,
+    rated_words_and_sections_dct: dict[str, list],
+) -> tuple[dict[str, list], list[str]]:
+    """Adds ratings from `parse_incontext_lines` to rated_words_and_sections_dct,
+    returns it and the lines of duplicate ratings."""
+    failed_lines: list[str] = list()
+    for word_str, section_id_int, section_score_int, line in ratings:
         if word_str not in rated_words_and_sections_dct:
             rated_words_and_sections_dct[word_str] = [-1] * n_sections
 
@@ -448,6 +441,29 @@ def parse_incontext_response(
     return rated_words_and_sections_dct, failed_lines
 
 
+def parse_incontext_response(
+    output_text: str,
+    word_regex: re.Pattern,
+    section_id_regex: re.Pattern,
+    section_score_regex: re.Pattern,
+    alt_section_score_regex: re.Pattern,
+    n_sections: int,
+    rated_words_and_sections_dct: dict[str, list],
+) -> tuple[dict[str, list], list[str]]:
+    ratings, failed_lines = parse_incontext_lines(
+        output_text=output_text,
+        word_regex=word_regex,
+        section_id_regex=section_id_regex,
+        section_score_regex=section_score_regex,
+        alt_section_score_regex=alt_section_score_regex,
+        n_sections=n_sections,
+    )
+    rated_words_and_sections_dct, failed_lines_duplicate = merge_incontext_ratings(
+        ratings, n_sections, rated_words_and_sections_dct
+    )
+    return rated_words_and_sections_dct, failed_lines + failed_lines_duplicate
+
+
 def word_position_incontext_reprocess(
     story: str,
     model_name: Optional[str] = None,
@@ -465,7 +481,7 @@ def word_position_incontext_reprocess(
     # prepare output paths
     base_dir = Path(OUTPUTS_DIR, WORD_POSITION_DIR, story, "incontext", model_name)
     base_dir.mkdir(parents=True, exist_ok=True)
-    path_responses_raw = base_dir / "responses_raw.pkl"
+    path_responses_raw = base_dir / "responses_raw.jsonl"
     path_responses_parsed = base_dir / "ratings.csv"
     path_failed_lines = base_dir / "failed_lines.txt"
     path_rating_reasons = base_dir / "rating_reasons.txt"
@@ -504,13 +520,15 @@ def word_position_incontext_reprocess(
         shutil.copy(path_rating_reasons, path_rating_reasons_backup)
         log.info(f"Backed up old rating reasons to {path_rating_reasons_backup}")
 
-    # Need raw responses
-    assert path_responses_raw.exists()
-    responses_raw: list[Response] = pickle.load(path_responses_raw.open("rb"))
-    assert isinstance(responses_raw, list)
-    assert all(isinstance(response, Response) for response in responses_raw)
+    # Need raw responses (convert pickles of earlier versions)
+    journal_from_pickle(base_dir / "responses_raw.pkl", path_responses_raw)
+    if not path_responses_raw.exists():
+        raise FileNotFoundError(f"No raw responses found at {path_responses_raw}")
+    output_texts = [
+        record["output_text"] for record in read_journal(path_responses_raw)
+    ]
     log.info(
-        f"Loaded {len(responses_raw)} preexisting responses from {path_responses_raw}"
+        f"Loaded {len(output_texts)} preexisting responses from {path_responses_raw}"
     )
 
     word_regex = re.compile(r"<w>(.*)</w>")
@@ -519,20 +537,26 @@ def word_position_incontext_reprocess(
     alt_section_score_regex = re.compile(r"</r>(.*)</r>")
     n_sections = get_n_sections(story=story, word_position_mode="not sentences :)")
 
+    # parse responses in parallel, merge in order of the journal
+    parse_func = partial(
+        parse_incontext_lines,
+        word_regex=word_regex,
+        section_id_regex=section_id_regex,
+        section_score_regex=section_score_regex,
+        alt_section_score_regex=alt_section_score_regex,
+        n_sections=n_sections,
+    )
+    with ProcessPoolExecutor() as executor:
+        parsed_responses = list(executor.map(parse_func, output_texts, chunksize=16))
+
     rated_words_and_sections_dct: dict[str, list] = dict()
     # word, section_id, section_score
     failed_lines: list[str] = list()
-    for response in responses_raw:
-        rated_words_and_sections_dct, failed_lines_batch = parse_incontext_response(
-            response=response,
-            word_regex=word_regex,
-            section_id_regex=section_id_regex,
-            section_score_regex=section_score_regex,
-            alt_section_score_regex=alt_section_score_regex,
-            n_sections=n_sections,
-            rated_words_and_sections_dct=rated_words_and_sections_dct,
+    for ratings, failed_lines_parsing in parsed_responses:
+        rated_words_and_sections_dct, failed_lines_duplicate = merge_incontext_ratings(
+            ratings, n_sections, rated_words_and_sections_dct
         )
-        failed_lines.extend(failed_lines_batch)
+        failed_lines.extend(failed_lines_parsing + failed_lines_duplicate)
 
     # save data
     log.info("Saving data.")
@@ -559,17 +583,15 @@ def word_position_incontext_reprocess(
     log.info(f"Saved {len(failed_lines)} failed lines to {path_failed_lines}")
 
     # save rating reasons
-    rating_reasons: list[str] = list()
-    for response in responses_raw:
-        rating_reasons.extend(response.output_text.split("\n"))
-    path_rating_reasons.write_text("\n".join(rating_reasons))
-    log.info(f"Saved {len(rating_reasons)} rating reasons to {path_rating_reasons}")
+    n_rating_reasons = write_journal_reasons(path_responses_raw, path_rating_reasons)
+    log.info(f"Saved {n_rating_reasons} rating reasons to {path_rating_reasons}")
 
 
 def rate_word_position_incontext(
     story: str,
     model_name: Optional[str] = None,
     batch_size: Optional[int] = None,
+    client_config: Optional[dict] = None,
 ):
     # load words
     words = list(
@@ -588,11 +610,14 @@ def rate_word_position_incontext(
 
     # load model
     env_file = dotenv_values(".env")
-    api_key = env_file["OPENAI_API_KEY"]
-    client = OpenAI(api_key=api_key)
     if model_name is None:
         model_name = "gpt-5-mini-2025-08-07"
         log.info(f"No model name provided, using default model: {model_name}")
+    client_config = {
+        "api_key": env_file.get("OPENAI_API_KEY"),
+        **(client_config or dict()),
+        "model_name": model_name,
+    }
     if batch_size is None:
         batch_size = 45
         log.info(f"No batch size provided, using default batch size: {batch_size}")
@@ -621,19 +646,16 @@ def rate_word_position_incontext(
     # prepare output paths
     base_dir = Path(OUTPUTS_DIR, WORD_POSITION_DIR, story, "incontext", model_name)
     base_dir.mkdir(parents=True, exist_ok=True)
-    path_responses_raw = base_dir / "responses_raw.pkl"
+    path_responses_raw = base_dir / "responses_raw.jsonl"
     path_responses_parsed = base_dir / "ratings.csv"
     path_failed_lines = base_dir / "failed_lines.txt"
 
-    # if files already exist, load them
-    responses_raw: list[Response] = list()
-    if path_responses_raw.exists():
-        responses_raw = pickle.load(path_responses_raw.open("rb"))
-        assert isinstance(responses_raw, list)
-        assert all(isinstance(response, Response) for response in responses_raw)
+    # if files already exist, load them (convert pickles of earlier versions)
+    journal_from_pickle(base_dir / "responses_raw.pkl", path_responses_raw)
+    n_responses_raw = journal_usage(path_responses_raw)["n_responses"]
+    if n_responses_raw > 0:
         log.info(
-            f"Loaded {len(responses_raw)} preexisting"
-            f" responses from {path_responses_raw}"
+            f"Found {n_responses_raw} preexisting responses in {path_responses_raw}"
         )
 
     rated_words_and_sections_dct: dict[str, list] = dict()
@@ -686,19 +708,42 @@ def rate_word_position_incontext(
     run_input_tokens = 0
     run_output_tokens = 0
 
+    input_batches: list[str] = list()
+    for batch_idx in range(n_batches):
+        min_idx = batch_idx * batch_size
+        max_idx = min(min_idx + batch_size, n_words)
+        words_batch = "\n".join(words[min_idx:max_idx])
+        input_batches.append(input_prompt.replace("{words}", words_batch))
+
+    # responses are filled in as they arrive, in order of input_batches
+    responses_new: list[Optional[Response]] = [None] * n_batches
+    progress = tqdm(total=n_batches, desc="Processing batches")
+    f_journal = open_journal(path_responses_raw)
+
+    def _on_response(idx: int, response: Response):
+        append_journal(f_journal, response_to_record(response))
+        progress.update()
+
     try:
-        for batch_idx in tqdm(range(n_batches), desc="Processing batches"):
-            min_idx = batch_idx * batch_size
-            max_idx = min(min_idx + batch_size, n_words)
-            words_batch = "\n".join(words[min_idx:max_idx])
-            input_batch = input_prompt.replace("{words}", words_batch)
-            response = client.responses.create(
-                model=model_name,
-                instructions=instruction_prompt,
-                input=input_batch,
-                store=False,
-            )
-            responses_raw.append(response)
+        create_responses(
+            client_config,
+            instruction_prompt,
+            input_batches,
+            responses=responses_new,
+            on_response=_on_response,
+        )
+    except KeyboardInterrupt:
+        log.critical("KeyboardInterrupt, saving data.")
+    except Exception as err:
+        log.critical(err)
+    finally:
+        progress.close()
+        f_journal.close()
+        n_responses_new = 0
+        for response in responses_new:
+            if response is None:
+                continue
+            n_responses_new += 1
 
             # log tokens
             run_input_tokens += (
@@ -708,7 +753,7 @@ def rate_word_position_incontext(
                 response.usage.output_tokens if response.usage is not None else 0
             )
             rated_words_and_sections_dct, failed_lines_batch = parse_incontext_response(
-                response=response,
+                output_text=response.output_text,
                 word_regex=word_regex,
                 section_id_regex=section_id_regex,
                 section_score_regex=section_score_regex,
@@ -718,15 +763,10 @@ def rate_word_position_incontext(
             )
             failed_lines.extend(failed_lines_batch)
 
-    except KeyboardInterrupt:
-        log.critical("KeyboardInterrupt, saving data.")
-    except Exception as err:
-        log.critical(err)
-    finally:
         # save data
         log.info("Saving data.")
-        pickle.dump(responses_raw, path_responses_raw.open("wb"))
-        log.info(f"Saved {len(responses_raw)} raw responses to {path_responses_raw}")
+        # raw responses are journaled as they arrive
+        log.info(f"Saved {n_responses_new} raw responses to {path_responses_raw}")
 
         # check for missing ratings
         words_missing_ratings: set[str] = set()
@@ -758,25 +798,18 @@ def rate_word_position_incontext(
         log.info(f"Saved {len(failed_lines)} failed lines to {path_failed_lines}")
 
         # save rating reasons
-        rating_reasons: list[str] = list()
-        for response in responses_raw:
-            rating_reasons.extend(response.output_text.split("\n"))
         path_rating_reasons = base_dir / "rating_reasons.txt"
-        path_rating_reasons.write_text("\n".join(rating_reasons))
-        log.info(f"Saved {len(rating_reasons)} rating reasons to {path_rating_reasons}")
+        n_rating_reasons = write_journal_reasons(
+            path_responses_raw, path_rating_reasons
+        )
+        log.info(f"Saved {n_rating_reasons} rating reasons to {path_rating_reasons}")
 
         # output tokens & cost
         log.info(f"Run input tokens: {run_input_tokens}")
         log.info(f"Run output tokens: {run_output_tokens}")
-        total_input_tokens = 0
-        total_output_tokens = 0
-        for response in responses_raw:
-            total_input_tokens += (
-                response.usage.input_tokens if response.usage is not None else 0
-            )
-            total_output_tokens += (
-                response.usage.output_tokens if response.usage is not None else 0
-            )
+        journal_tokens = journal_usage(path_responses_raw)
+        total_input_tokens = journal_tokens["input_tokens"]
+        total_output_tokens = journal_tokens["output_tokens"]
         log.info(f"Total input tokens: {total_input_tokens}")
         log.info(f"Total output tokens: {total_output_tokens}")
 
@@ -808,6 +841,7 @@ def rate_word_position_incontext_top2(
     story: str,
     model_name: Optional[str] = None,
     batch_size: Optional[int] = None,
+    client_config: Optional[dict] = None,
 ):
     word_regex = re.compile(r"<w>(.*)</w>")
     section1_regex = re.compile(r"<s1>(.*)</s1>")
@@ -818,11 +852,14 @@ def rate_word_position_incontext_top2(
 
     # load model
     env_file = dotenv_values(".env")
-    api_key = env_file["OPENAI_API_KEY"]
-    client = OpenAI(api_key=api_key)
     if model_name is None:
         model_name = "gpt-5-mini-2025-08-07"
         log.info(f"No model name provided, using default model: {model_name}")
+    client_config = {
+        "api_key": env_file.get("OPENAI_API_KEY"),
+        **(client_config or dict()),
+        "model_name": model_name,
+    }
     if batch_size is None:
         batch_size = 300
         log.info(f"No batch size provided, using default batch size: {batch_size}")
@@ -851,19 +888,16 @@ def rate_word_position_incontext_top2(
     # prepare output paths
     base_dir = Path(OUTPUTS_DIR, WORD_POSITION_DIR, story, "incontext_top2", model_name)
     base_dir.mkdir(parents=True, exist_ok=True)
-    path_responses_raw = base_dir / "responses_raw.pkl"
+    path_responses_raw = base_dir / "responses_raw.jsonl"
     path_responses_parsed = base_dir / "ratings.csv"
     path_failed_lines = base_dir / "failed_lines.txt"
 
-    # if files already exist, load them
-    responses_raw: list[Response] = list()
-    if path_responses_raw.exists():
-        responses_raw = pickle.load(path_responses_raw.open("rb"))
-        assert isinstance(responses_raw, list)
-        assert all(isinstance(response, Response) for response in responses_raw)
+    # if files already exist, load them (convert pickles of earlier versions)
+    journal_from_pickle(base_dir / "responses_raw.pkl", path_responses_raw)
+    n_responses_raw = journal_usage(path_responses_raw)["n_responses"]
+    if n_responses_raw > 0:
         log.info(
-            f"Loaded {len(responses_raw)} preexisting"
-            f" responses from {path_responses_raw}"
+            f"Found {n_responses_raw} preexisting responses in {path_responses_raw}"
         )
 
     responses_parsed: list[tuple[str, int, int]] = list()
@@ -893,19 +927,42 @@ def rate_word_position_incontext_top2(
     n_words = len(words)
     n_batches = math.ceil(n_words / batch_size)
 
+    input_batches: list[str] = list()
+    for batch_idx in range(n_batches):
+        min_idx = batch_idx * batch_size
+        max_idx = min(min_idx + batch_size, n_words)
+        words_batch = "\n".join(words[min_idx:max_idx])
+        input_batches.append(input_prompt.replace("{words}", words_batch))
+
+    # responses are filled in as they arrive, in order of input_batches
+    responses_new: list[Optional[Response]] = [None] * n_batches
+    progress = tqdm(total=n_batches, desc="Processing batches")
+    f_journal = open_journal(path_responses_raw)
+
+    def _on_response(idx: int, response: Response):
+        append_journal(f_journal, response_to_record(response))
+        progress.update()
+
     try:
-        for batch_idx in tqdm(range(n_batches), desc="Processing batches"):
-            min_idx = batch_idx * batch_size
-            max_idx = min(min_idx + batch_size, n_words)
-            words_batch = "\n".join(words[min_idx:max_idx])
-            input_batch = input_prompt.replace("{words}", words_batch)
-            response = client.responses.create(
-                model=model_name,
-                instructions=instruction_prompt,
-                input=input_batch,
-                store=False,
-            )
-            responses_raw.append(response)
+        create_responses(
+            client_config,
+            instruction_prompt,
+            input_batches,
+            responses=responses_new,
+            on_response=_on_response,
+        )
+    except KeyboardInterrupt:
+        log.critical("KeyboardInterrupt, saving data.")
+    except Exception as err:
+        log.critical(err)
+    finally:
+        progress.close()
+        f_journal.close()
+        n_responses_new = 0
+        for response in responses_new:
+            if response is None:
+                continue
+            n_responses_new += 1
             for line in response.output_text.split("\n"):
                 try:
                     word = word_regex.search(line)
@@ -926,15 +983,10 @@ def rate_word_position_incontext_top2(
                     log.error(f"Error parsing line: {line} - {err}")
                     continue
 
-    except KeyboardInterrupt:
-        log.critical("KeyboardInterrupt, saving data.")
-    except Exception as err:
-        log.critical(err)
-    finally:
         # save data
         log.info("Saving data.")
-        pickle.dump(responses_raw, path_responses_raw.open("wb"))
-        log.info(f"Saved {len(responses_raw)} raw responses to {path_responses_raw}")
+        # raw responses are journaled as they arrive
+        log.info(f"Saved {n_responses_new} raw responses to {path_responses_raw}")
 
         pd.DataFrame(responses_parsed, columns=["word", "section1", "section2"]).to_csv(  # type: ignore
             path_responses_parsed, index=False
@@ -947,12 +999,11 @@ def rate_word_position_incontext_top2(
         log.info(f"Saved {len(failed_lines)} failed lines to {path_failed_lines}")
 
         # save rating reasons
-        rating_reasons: list[str] = list()
-        for response in responses_raw:
-            rating_reasons.extend(response.output_text.split("\n"))
         path_rating_reasons = base_dir / "rating_reasons.txt"
-        path_rating_reasons.write_text("\n".join(rating_reasons))
-        log.info(f"Saved {len(rating_reasons)} rating reasons to {path_rating_reasons}")
+        n_rating_reasons = write_journal_reasons(
+            path_responses_raw, path_rating_reasons
+        )
+        log.info(f"Saved {n_rating_reasons} rating reasons to {path_rating_reasons}")
 
         # save count of matching sections for each word
         count_words: list[tuple[str, int]] = list()
@@ -980,16 +1031,8 @@ def rate_word_position_exact_match(
     story: str,
     sentences: bool = False,
 ):
-    # load story
-    if sentences:
-        section_texts = load_story_sentences(story, story_file="sectioned.txt")
-    else:
-        section_sentences = load_story_sentences_grouped(
-            story, story_file="sectioned.txt"
-        )
-        section_texts = [
-            "\n".join(section_sentences_) for section_sentences_ in section_sentences
-        ]
+    # index story once, then look up every word in the postings
+    story_index = load_story_index(story, story_file="sectioned.txt")
 
     # load all words
     words = load_words(config={"story": story}, corrections=True)
@@ -999,53 +1042,26 @@ def rate_word_position_exact_match(
     rated_words_first: list[tuple[str, Union[int, float]]] = list()
     rated_words_all_matches: list[tuple[str, str]] = list()
     count_words: list[tuple[str, int]] = list()
+    # sorted indices of sections (or sentences) containing each word
+    word_matches = story_index.match_terms(words, sentences=sentences)
     for word in words:
         if word == "":
             continue
-        word_re = re.compile(r"\b(" + re.escape(word) + r")\b", flags=re.IGNORECASE)
-
-        # last
-        word_section_index = -1
-        for section_idx, section_text in enumerate(section_texts):
-            match = word_re.search(section_text)
-            if match is not None:
-                word_section_index = section_idx
-
-        rated_words_last.append((word, word_section_index))
-
-        # mean & all_matches
-        word_section_indices = list()
-        for section_idx, section_text in enumerate(section_texts):
-            match = word_re.search(section_text)
-            if match is not None:
-                word_section_indices.append(section_idx)
+        word_section_indices = word_matches[word]
+
         if len(word_section_indices) == 0:
-            word_section_index = -1
-            all_matches = ""
+            rated_words_last.append((word, -1))
+            rated_words_mean.append((word, -1))
+            rated_words_first.append((word, -1))
+            rated_words_all_matches.append((word, ""))
         else:
-            word_section_index = np.mean(word_section_indices).item()
-            all_matches = ",".join(map(str, word_section_indices))
-        rated_words_mean.append((word, word_section_index))
-        rated_words_all_matches.append((word, all_matches))
-
-        # first
-        word_section_index = -1
-        for section_idx, section_text in enumerate(section_texts):
-            match = word_re.search(section_text)
-            if match is not None:
-                word_section_index = section_idx
-                break
-
-        rated_words_first.append((word, word_section_index))
-
-        # I know it's not efficient, but readability/lower complexity wins
-        # count number of sections matching word
-        count_sections = 0
-        for section_text in section_texts:
-            match = word_re.search(section_text)
-            if match is not None:
-                count_sections += 1
-        count_words.append((word, count_sections))
+            rated_words_last.append((word, int(word_section_indices[-1])))
+            rated_words_mean.append((word, np.mean(word_section_indices).item()))
+            rated_words_first.append((word, int(word_section_indices[0])))
+            rated_words_all_matches.append(
+                (word, ",".join(map(str, word_section_indices)))
+            )
+        count_words.append((word, len(word_section_indices)))
 
     # save ratings
     if sentences:
@@ -1097,6 +1113,7 @@ def rate_word_position(
     model_name: Optional[str] = None,
     batch_size: int = 300,
     reprocess_raw_responses: bool = False,
+    client_config: Optional[dict] = None,
 ):
     # save & print config
     if method == "embeddings":
@@ -1129,6 +1146,7 @@ def rate_word_position(
     elif method == "themesim":
         rate_word_position_themesim(
             story=story,
+            model_name=model_name,
             section_aggregation=section_aggregation,
         )
     elif method == "incontext":
@@ -1143,12 +1161,14 @@ def rate_word_position(
                 story=story,
                 model_name=model_name,
                 batch_size=batch_size,
+                client_config=client_config,
             )
     elif method == "incontext_top2":
         rate_word_position_incontext_top2(
             story=story,
             model_name=model_name,
             batch_size=batch_size,
+            client_config=client_config,
         )
     elif method.startswith("exact_match"):
         sentences = False
@@ -1187,7 +1207,8 @@ if __name__ == "__main__":
         default=None,
         help=(
             "Which model to use for rating word position"
-            " [Optional for embeddings, reranker, incontext, incontext_top2]."
+            " [Optional for embeddings, reranker, themesim, incontext,"
+            " incontext_top2]."
         ),
     )
     args.add_argument(
@@ -1226,6 +1247,30 @@ if __name__ == "__main__":
             " E.g. if the parser had a bug."
         ),
     )
+    args.add_argument(
+        "--max_concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of requests in flight. [incontext, incontext_top2]",
+    )
+    args.add_argument(
+        "--rpm",
+        type=int,
+        default=None,
+        help="Maximum requests per minute. [incontext, incontext_top2]",
+    )
+    args.add_argument(
+        "--tpm",
+        type=int,
+        default=None,
+        help="Maximum tokens per minute. [incontext, incontext_top2]",
+    )
+    args.add_argument(
+        "--base_url",
+        type=str,
+        default=None,
+        help="Alternative API endpoint, e.g. a local stub server.",
+    )
     args = args.parse_args()
     rate_word_position(
         method=args.method,
@@ -1234,4 +1279,10 @@ if __name__ == "__main__":
         section_aggregation=args.section_aggregation,
         batch_size=args.batch_size,
         reprocess_raw_responses=args.reprocess_raw_responses,
+        client_config={
+            "max_concurrency": args.max_concurrency,
+            "rpm": args.rpm,
+            "tpm": args.tpm,
+            "base_url": args.base_url,
+        },
     )
@@ -0,0 +1,217 @@
+"""Local stub of the OpenAI `/responses` endpoint, to run the raters offline.
+
+Every input line that looks like a word (non-empty, shorter than 30 characters,
+without commas, like the word cleanup of rate_incontext.py) gets a line
+`<word>...</word> <rating>...</rating>` with a deterministic rating in
+[1, --max_rating], other lines (the prompt template) are ignored. The stub can
+misbehave like the API to exercise the retries and rate limits of
+`oc_pmc.utils.rating_client`:
+    - --rpm: requests beyond this many within 60s get a 429 with Retry-After
+    - --fail_rate: share of requests failing with a random 429, 500 or 503
+    - --latency: seconds before every response
+Counts of the returned status codes are logged on exit (Ctrl+C).
+
+    uv run analysis/stub_responses_server.py --port 8765 --rpm 30 --fail_rate 0.2
+    OPENAI_API_KEY=stub uv run analysis/rate_incontext.py -w words.txt \\
+        --base_url http://127.0.0.1:8765/v1 --rpm 30
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, Optional
+
+from oc_pmc import get_logger
+
+log = get_logger(__name__)
+
+FAILURE_STATUS_CODES = (429, 500, 503)
+
+
+def stub_rating(word: str, max_rating: int) -> int:
+    """Deterministic rating of word in [1, max_rating]."""
+    digest = hashlib.sha256(word.encode("utf-8")).digest()
+    return digest[0] % max_rating + 1
+
+
+def stub_output_text(input_text: str, max_rating: int) -> str:
+    lines = list()
+    for line in input_text.split("\n"):
+        word = line.strip()
+        if word == "" or len(word) >= 30 or "," in word:
+            continue
+        lines.append(
+            f"<word>{word}</word> <rating>{stub_rating(word, max_rating)}</rating>"
+        )
+    return "\n".join(lines)
+
+
+def stub_response(body: Dict[str, Any], max_rating: int) -> Dict[str, Any]:
+    """A completed `Response` object for the request body."""
+    input_text = body.get("input", "")
+    if not isinstance(input_text, str):  # list of input items
+        input_text = "\n".join(
+            str(item.get("content", ""))
+            for item in input_text
+            if isinstance(item, dict)
+        )
+    output_text = stub_output_text(input_text, max_rating)
+    input_tokens = (len(body.get("instructions") or "") + len(input_text)) // 4 + 1
+    output_tokens = len(output_text) // 4 + 1
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": time.time(),
+        "status": "completed",
+        "model": body.get("model", "stub"),
+        "instructions": body.get("instructions"),
+        "output": [
+            {
+                "type": "message",
+                "id": f"msg_{uuid.uuid4().hex}",
+                "role": "assistant",
+                "status": "completed",
+                "content": [
+                    {"type": "output_text", "text": output_text, "annotations": []}
+                ],
+            }
+        ],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "store": body.get("store", False),
+        "usage": {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": output_tokens,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + output_tokens,
+        },
+    }
+
+
+class StubState:
+    """Settings and counters shared by the request handlers."""
+
+    def __init__(
+        self,
+        rpm: Optional[int],
+        fail_rate: float,
+        retry_after: float,
+        latency: float,
+        max_rating: int,
+        seed: Optional[int],
+    ) -> None:
+        self.rpm = rpm
+        self.fail_rate = fail_rate
+        self.retry_after = retry_after
+        self.latency = latency
+        self.max_rating = max_rating
+        self.rng = random.Random(seed)
+        self.starts: Deque[float] = deque()
+        self.status_counts: Counter = Counter()
+        self.lock = threading.Lock()
+
+    def failure(self) -> Optional[int]:
+        """Status code of a simulated failure of the next request, or None."""
+        with self.lock:
+            now = time.monotonic()
+            while len(self.starts) > 0 and now - self.starts[0] >= 60:
+                self.starts.popleft()
+            if self.rpm is not None and len(self.starts) >= self.rpm:
+                return 429
+            self.starts.append(now)
+            if self.rng.random() < self.fail_rate:
+                return self.rng.choice(FAILURE_STATUS_CODES)
+        return None
+
+
+def make_handler(state: StubState) -> type:
+    class StubHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload: Dict[str, Any], headers=None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or dict()).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+            with state.lock:
+                state.status_counts[status] += 1
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if not self.path.rstrip("/").endswith("/responses"):
+                self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+                return
+            if state.latency > 0:
+                time.sleep(state.latency)
+            status = state.failure()
+            if status is not None:
+                headers = None
+                if status == 429:
+                    headers = {"Retry-After": f"{state.retry_after:g}"}
+                self._send(
+                    status,
+                    {"error": {"message": "stub failure", "type": "stub"}},
+                    headers,
+                )
+                return
+            self._send(200, stub_response(body, state.max_rating))
+
+        def log_message(self, format: str, *args: Any):
+            log.debug(format % args)
+
+    return StubHandler
+
+
+if __name__ == "__main__":
+    args = argparse.ArgumentParser()
+    args.add_argument("--host", type=str, default="127.0.0.1")
+    args.add_argument("--port", type=int, default=8765)
+    args.add_argument(
+        "--rpm", type=int, default=None, help="Requests per minute before 429s."
+    )
+    args.add_argument(
+        "--fail_rate",
+        type=float,
+        default=0.0,
+        help="Share of requests failing with 429, 500 or 503.",
+    )
+    args.add_argument(
+        "--retry_after",
+        type=float,
+        default=1.0,
+        help="Retry-After header of 429s in seconds.",
+    )
+    args.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds before every response."
+    )
+    args.add_argument("--max_rating", type=int, default=7)
+    args.add_argument("--seed", type=int, default=None)
+    args = args.parse_args()
+
+    state = StubState(
+        rpm=args.rpm,
+        fail_rate=args.fail_rate,
+        retry_after=args.retry_after,
+        latency=args.latency,
+        max_rating=args.max_rating,
+        seed=args.seed,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    log.info(f"Stub responses endpoint at http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        log.info(f"Returned status codes: {dict(state.status_counts)}")
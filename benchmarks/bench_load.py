@@ -0,0 +1,71 @@
+"""Benchmarks of loading and filtering participant data."""
+
+from oc_pmc.load import (
+    filter_participants,
+    load_questionnaire,
+    load_rated_wordchains,
+    load_thought_entries,
+    load_time_spr,
+    load_wordchains,
+)
+from oc_pmc.utils.aggregator import aggregator
+
+from .fixtures import CONDITIONS, RATINGS, STORY, FixtureBenchmark, load_config
+
+
+class LoadWordchains(FixtureBenchmark):
+    def time_load_wordchains(self, scale: int):
+        load_wordchains(load_config())
+
+    def time_load_wordchains_no_filter(self, scale: int):
+        load_wordchains({**load_config(), "filter": False})
+
+
+class LoadOther(FixtureBenchmark):
+    def time_load_questionnaire(self, scale: int):
+        load_questionnaire(load_config())
+
+    def time_load_rated_wordchains(self, scale: int):
+        load_rated_wordchains({**load_config(), "ratings": RATINGS})
+
+    def time_load_thought_entries(self, scale: int):
+        load_thought_entries(load_config())
+
+    def time_load_time_spr(self, scale: int):
+        load_time_spr(load_config())
+
+
+class FilterParticipants(FixtureBenchmark):
+    def setup(self, scale: int):
+        super().setup(scale)
+        self.words_df = load_wordchains({**load_config(), "filter": False})
+
+    def time_filter_participants(self, scale: int):
+        # filter_participants inserts into the exclude list: new config every call
+        filter_participants(
+            {**load_config(), "exclude": [("gte", "timestamp", 180000)]},
+            self.words_df,
+        )
+
+
+class Aggregator(FixtureBenchmark):
+    def time_aggregator(self, scale: int):
+        aggregator(
+            {
+                "load_spec": (
+                    "story",
+                    {
+                        STORY: (
+                            "condition",
+                            {
+                                condition: ("position", {"post": ("filter", {})})
+                                for condition in CONDITIONS
+                            },
+                        )
+                    },
+                ),
+                "aggregate_on": "story",
+            },
+            load_func=load_wordchains,
+            call_func=lambda config, data_df: len(data_df),
+        )
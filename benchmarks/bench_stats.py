@@ -0,0 +1,89 @@
+"""Benchmarks of the bootstrap and permutation hot paths."""
+
+import pandas as pd
+from oc_pmc.load import load_wordchains
+from oc_pmc.plot.by_time_shifted import func_plot_by_time
+from oc_pmc.stat.difference_bin_means import func_difference_bin_means
+from oc_pmc.utils.bootstrap import bootstrap_with_groups
+
+from .fixtures import CONDITIONS, FixtureBenchmark, load_config
+
+N_BOOTSTRAP = 100
+
+
+def load_conditions_df() -> pd.DataFrame:
+    """Rated words of all conditions, with the columns the aggregator adds."""
+    data_dfs = list()
+    for condition in CONDITIONS:
+        config = load_config(condition)
+        data_df = load_wordchains(config)
+        for column in ("position", "condition", "story"):
+            data_df.insert(0, column, config[column])
+        data_dfs.append(data_df)
+    return pd.concat(data_dfs, axis=0)
+
+
+def sample_condition_means(data_df: pd.DataFrame) -> pd.Series:
+    return (
+        data_df.groupby("condition")
+        .sample(frac=1, replace=True)
+        .groupby("condition")["story_relatedness"]
+        .mean()
+    )
+
+
+class BootstrapWithGroups(FixtureBenchmark):
+    def setup(self, scale: int):
+        super().setup(scale)
+        self.participant_df = (
+            load_conditions_df()
+            .groupby(["participantID", "condition"])["story_relatedness"]
+            .mean()
+            .reset_index("condition")
+        )
+
+    def time_bootstrap_with_groups(self, scale: int):
+        bootstrap_with_groups(
+            {"n_bootstrap": N_BOOTSTRAP, "ci": 0.95, "bootstrap_tqdm_disable": True},
+            self.participant_df,
+            sample_condition_means,
+        )
+
+
+class PlotByTime(FixtureBenchmark):
+    def setup(self, scale: int):
+        super().setup(scale)
+        self.data_df = load_conditions_df()
+
+    def time_func_plot_by_time(self, scale: int):
+        func_plot_by_time(
+            {
+                "column": "story_relatedness",
+                "step": 30000,
+                "color": "condition",
+                "bootstrap": True,
+                "n_bootstrap": N_BOOTSTRAP,
+                "bootstrap_tqdm_disable": True,
+                "ci": 0.95,
+            },
+            self.data_df.copy(),
+        )
+
+
+class DifferenceBinMeans(FixtureBenchmark):
+    def setup(self, scale: int):
+        super().setup(scale)
+        self.data_df = load_conditions_df()
+
+    def time_func_difference_bin_means(self, scale: int):
+        func_difference_bin_means(
+            {
+                "column": "story_relatedness",
+                "step": 30000,
+                "comparison_dct": {"condition": list(CONDITIONS)},
+                "n_bootstrap": N_BOOTSTRAP,
+                "bootstrap_tqdm_disable": True,
+                "verbose": False,
+            },
+            self.data_df.copy(),
+        )
@@ -0,0 +1,104 @@
+"""Synthetic data directories for the benchmarks.
+
+A fixture is a directory containing a `data` tree generated by
+`oc_pmc.simulate.data_dir.simulate_data_dir` (time_words, double_press,
+time_spr, questionnaires, rated_words, corrections) for the conditions in
+CONDITIONS. At scale 1 every condition has as many participants as the real
+data, scale 10 and 100 multiply that count. Fixtures are generated once per
+(scale, seed) into CACHE_DIR/benchmarks and reused by later runs.
+
+Paths in oc_pmc are relative to the working directory (DATA_DIR = "data"), so
+benchmarks `chdir` into the fixture directory before calling the loaders.
+"""
+
+import os
+import shutil
+from pathlib import Path
+from typing import Dict
+
+from oc_pmc import CACHE_DIR, DATA_DIR, get_logger
+from oc_pmc.simulate.data_dir import simulate_data_dir
+
+log = get_logger(__name__)
+
+SCALES = [1, 10, 100]
+STORY = "carver_original"
+# participants per condition at scale 1 (post free association of the real data)
+CONDITIONS: Dict[str, int] = {
+    "button_press": 229,
+    "word_scrambled": 80,
+}
+# effect size (Cohen's d) of every condition on story relatedness
+CONDITIONS_EFFECT: Dict[str, float] = {
+    "button_press": 0.0,
+    "word_scrambled": -0.5,
+}
+# ratings config of the simulated word ratings (see simulate_data_dir)
+RATINGS = {
+    "approach": "simulated",
+    "model": "moment",
+    "story": STORY,
+    "file": "all.csv",
+}
+FIXTURE_VERSION = 2
+# resolved on import, benchmarks change the working directory
+FIXTURES_DIR = Path(CACHE_DIR, "benchmarks").resolve()
+
+
+def fixture_dir(scale: int, seed: int = 42) -> Path:
+    return FIXTURES_DIR / f"v{FIXTURE_VERSION}_x{scale}_seed{seed}"
+
+
+def write_fixture(path: Path, scale: int, seed: int = 42):
+    """Writes the data tree of a fixture into path/DATA_DIR."""
+    simulate_data_dir(
+        {
+            "output_dir": str(Path(path, DATA_DIR)),
+            "story": STORY,
+            "conditions": CONDITIONS_EFFECT,
+            "n_participants": {
+                condition: n_participants * scale
+                for condition, n_participants in CONDITIONS.items()
+            },
+            "ratings": {key: RATINGS[key] for key in ("approach", "model")},
+            "seed": seed,
+        }
+    )
+
+
+def ensure_fixture(scale: int, seed: int = 42) -> Path:
+    """Returns the fixture directory for scale, generating it if necessary."""
+    if os.path.isabs(DATA_DIR):
+        raise ValueError(
+            f"Benchmarks need a relative DATA_DIR, but it is set to {DATA_DIR}."
+        )
+    path = fixture_dir(scale, seed)
+    if path.is_dir():
+        return path
+    log.info(f"Generating benchmark fixture at scale {scale}x: {path}")
+    path_tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    shutil.rmtree(path_tmp, ignore_errors=True)
+    write_fixture(path_tmp, scale, seed)
+    os.replace(path_tmp, path)
+    return path
+
+
+class FixtureBenchmark:
+    """Base class of benchmarks running inside a fixture directory. Follows the
+    asv conventions: `params` are the scales, `setup` and `teardown` run around
+    every measurement."""
+
+    params = SCALES
+    param_names = ["scale"]
+    timeout = 600
+
+    def setup(self, scale: int):
+        self.cwd = os.getcwd()
+        os.chdir(ensure_fixture(scale))
+
+    def teardown(self, scale: int):
+        os.chdir(self.cwd)
+
+
+def load_config(condition: str = "button_press") -> Dict:
+    return {"story": STORY, "condition": condition, "position": "post"}
@@ -0,0 +1,200 @@
+"""Runs the benchmarks and stores the results as JSON.
+
+The benchmark modules (`bench_*.py`) follow the asv conventions (classes with
+`params`, `setup`, `teardown` and `time_*` methods), so they can also be run
+with asv. This runner needs no further dependencies and works offline:
+
+    # from the repository root
+    python -m benchmarks.run --scales 1 10
+    python -m benchmarks.run --baseline benchmarks/results/<earlier run>.json
+
+Every benchmark is run `--repeat` times per scale (after `setup`), results
+(all times, min, median) are written to benchmarks/results/<date>_<commit>.json.
+With `--baseline`, medians are compared to an earlier results file and the run
+fails if any benchmark got slower than `--threshold` times the baseline.
+"""
+
+import argparse
+import importlib
+import inspect
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from rich.console import Console
+from rich.table import Table
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+console = Console()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=BENCHMARKS_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def discover(pattern: Optional[str] = None) -> List[Tuple[str, type, str]]:
+    """Returns (name, class, method name) of all benchmarks whose name
+    (`module.Class.method`) matches the regex pattern."""
+    benchmarks = list()
+    for path_module in sorted(BENCHMARKS_DIR.glob("bench_*.py")):
+        module = importlib.import_module(f"{__package__}.{path_module.stem}")
+        for class_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            for method_name in sorted(dir(cls)):
+                if not method_name.startswith("time_"):
+                    continue
+                name = f"{path_module.stem}.{class_name}.{method_name}"
+                if pattern is None or re.search(pattern, name):
+                    benchmarks.append((name, cls, method_name))
+    return benchmarks
+
+
+def run_benchmark(
+    cls: type, method_name: str, param: Any, repeat: int
+) -> Dict[str, Any]:
+    """Times `repeat` calls of the benchmark method, setup runs once before."""
+    benchmark = cls()
+    times: List[float] = list()
+    benchmark.setup(param)
+    try:
+        method = getattr(benchmark, method_name)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            method(param)
+            times.append(time.perf_counter() - start)
+    finally:
+        benchmark.teardown(param)
+    return {
+        "times": times,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, Dict]],
+    baseline: Dict[str, Dict[str, Dict]],
+    threshold: float,
+) -> bool:
+    """Prints median times against the baseline, returns whether no benchmark
+    got slower than threshold * baseline."""
+    table = Table(title="Benchmarks vs baseline (median)")
+    for column in ("benchmark", "scale", "baseline", "now", "ratio"):
+        table.add_column(column, justify="left" if column == "benchmark" else "right")
+    passed = True
+    for name, param_results in results.items():
+        for param, result in param_results.items():
+            base = baseline.get(name, {}).get(param)
+            if base is None:
+                table.add_row(name, param, "-", f"{result['median']:.3f}s", "-")
+                continue
+            ratio = result["median"] / base["median"]
+            style = None
+            if ratio > threshold:
+                style = "red"
+                passed = False
+            elif ratio < 1 / threshold:
+                style = "green"
+            table.add_row(
+                name,
+                param,
+                f"{base['median']:.3f}s",
+                f"{result['median']:.3f}s",
+                f"{ratio:.2f}x",
+                style=style,
+            )
+    console.print(table)
+    return passed
+
+
+if __name__ == "__main__":
+    args = argparse.ArgumentParser()
+    args.add_argument(
+        "-b", "--bench", type=str, help="Regex selecting benchmarks to run."
+    )
+    args.add_argument(
+        "-s",
+        "--scales",
+        type=int,
+        nargs="+",
+        help="Scales to run (default: all params of the benchmark).",
+    )
+    args.add_argument(
+        "-r", "--repeat", type=int, default=3, help="Measurements per benchmark."
+    )
+    args.add_argument("-o", "--output", type=str, help="Path of the results file.")
+    args.add_argument("--baseline", type=str, help="Results file to compare to.")
+    args.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Fail if a benchmark is slower than threshold * baseline.",
+    )
+    args = args.parse_args()
+
+    if __package__ in (None, ""):
+        sys.exit("Run as module from the repository root: python -m benchmarks.run")
+
+    # no progress bars in the measurements (read by tqdm on import)
+    os.environ.setdefault("TQDM_DISABLE", "1")
+    commit = git_commit()
+    results: Dict[str, Dict[str, Dict]] = dict()
+    for name, cls, method_name in discover(args.bench):
+        for param in cls.params:
+            if args.scales is not None and param not in args.scales:
+                continue
+            console.print(f"{name} [{param}]", end=" ")
+            result = run_benchmark(cls, method_name, param, args.repeat)
+            results.setdefault(name, dict())[str(param)] = result
+            console.print(f"{result['median']:.3f}s")
+
+    output = {
+        "metadata": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    path_output = (
+        Path(args.output)
+        if args.output is not None
+        else RESULTS_DIR
+        / f"{datetime.now():%Y%m%d-%H%M%S}_{(commit or 'nocommit')[:8]}.json"
+    )
+    path_output.parent.mkdir(parents=True, exist_ok=True)
+    path_output.write_text(json.dumps(output, indent=2))
+    console.print(f"Saved results to {path_output}")
+
+    if args.baseline is not None:
+        baseline = json.loads(Path(args.baseline).read_text())["results"]
+        if not compare(results, baseline, args.threshold):
+            sys.exit(1)